@@ -1,7 +1,6 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from utils.pages_util import read_ACC_df, build_dataframe_section, dicionario_acc
+from utils import spans
+from utils.pages_util import build_dataframe_section, dicionario_acc
 
 st.set_page_config(
     page_title="PISI3 - 2024.1 - Júlia",
@@ -21,7 +20,8 @@ def build_header():
 
 def build_body():
     dicionario_acc()
-    df = read_ACC_df()
-    build_dataframe_section(df)
+    build_dataframe_section('ACC_INTAKES_OUTCOMES')
 
-build_page()
\ No newline at end of file
+spans.page_start('Home')
+build_page()
+spans.page_end()
\ No newline at end of file
@@ -0,0 +1,79 @@
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+
+from utils.clustering import DTYPE, RANDOM_STATE, clustering_columns
+from utils.data_utils import dataset_path
+
+# Pico de memória (RSS) do pipeline de clusterização da página: versão antiga x versão atual.
+# Cada versão roda em um processo novo, para que os picos não se misturem.
+#   python -m benchmarks.bench_clustering_memory --k 3
+
+DATASETS = {'scaled': 'scaled_ACC_INTAKES_OUTCOMES', 'normalized': 'normalized_ACC_INTAKES_OUTCOMES'}
+ORIGINAL_COLUMNS = ['time_in_shelter_days', 'age_upon_outcome_(years)']
+
+def before(suffix, k):
+    # Como a página fazia: os dois datasets inteiros, KMeans sobre o DataFrame (float64), coluna 'cluster'
+    # adicionada ao DataFrame, duas leituras extras e um rename que copia o DataFrame
+    datasets = {name: pd.read_parquet(dataset_path(df_name)) for name, df_name in DATASETS.items()}
+    data = datasets[suffix]
+    features = clustering_columns(suffix)
+    data['cluster'] = KMeans(n_clusters=k, random_state=RANDOM_STATE).fit_predict(data[features])
+    for col in ORIGINAL_COLUMNS:
+        data[f'{col}_original'] = pd.read_parquet(dataset_path(DATASETS[suffix]), columns=[col])[col]
+    data = data.rename(columns={'animal_type_Bir': 'Pássaro'})
+    return data['cluster'].to_numpy()
+
+def after(suffix, k):
+    # Como a página faz agora: só as colunas usadas do dataset selecionado, matriz float32 contígua
+    # e rótulos anexados pelo índice
+    features = clustering_columns(suffix)
+    data = pd.read_parquet(dataset_path(DATASETS[suffix]), columns=features + ORIGINAL_COLUMNS)
+    X = np.ascontiguousarray(data[features].to_numpy(dtype=DTYPE))
+    labels = KMeans(n_clusters=k, random_state=RANDOM_STATE).fit_predict(X)
+    clustered = pd.DataFrame({'cluster': labels}, index=data.index)
+    return clustered['cluster'].to_numpy()
+
+PIPELINES = {'antes': before, 'depois': after}
+
+def peak_rss_mb():
+    # ru_maxrss é em KiB no Linux e em bytes no macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def _run(name, suffix, k, queue):
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    PIPELINES[name](suffix, k)
+    queue.put((time.perf_counter() - start, baseline, peak_rss_mb()))
+
+def measure(name, suffix, k):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_run, args=(name, suffix, k, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compara o pico de memória da clusterização antes e depois da matriz float32.')
+    parser.add_argument('--dataset', choices=list(DATASETS), default='scaled')
+    parser.add_argument('--k', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'pipeline':>10} {'tempo (s)':>10} {'RSS inicial (MB)':>17} {'pico RSS (MB)':>14} {'acréscimo (MB)':>15}")
+    results = {}
+    for name in PIPELINES:
+        elapsed, baseline, peak = measure(name, args.dataset, args.k)
+        results[name] = peak - baseline
+        print(f"{name:>10} {elapsed:>10.2f} {baseline:>17.1f} {peak:>14.1f} {peak - baseline:>15.1f}")
+    print(f"Redução do acréscimo de memória: {results['antes'] / max(results['depois'], 1e-9):.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+from utils.normalization import gender
+
+# Micro-benchmark da classificação de gênero: lambda por linha (código antigo das páginas) x utils.normalization
+#   python -m benchmarks.bench_normalization --sizes 100000 1000000 10000000
+
+SEX_VALUES = ['Neutered Male', 'Spayed Female', 'Intact Male  ', 'Intact Female', 'Unknown      ']
+
+def apply_lambda(series):
+    return series.apply(
+        lambda x: 'Fêmea' if 'female' in x.lower() else ('Macho' if 'male' in x.lower() else 'Desconhecido')
+    )
+
+def sample(n, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.Series(np.array(SEX_VALUES, dtype=object)[rng.integers(0, len(SEX_VALUES), n)])
+
+def timed(func, series, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(series)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compara a normalização de sexo por apply/lambda com a versão por categorias.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'linhas':>12} {'apply (linhas/s)':>18} {'texto->categorias (linhas/s)':>30} {'categórico (linhas/s)':>23} {'ganho':>8}")
+    for n in args.sizes:
+        text = sample(n)
+        categorical = text.astype('category')
+        # O apply/lambda recebe a coluna em texto, como as páginas liam antes
+        t_apply = timed(apply_lambda, text, args.repeat)
+        # Coluna em texto: inclui o custo de categorizar
+        t_text = timed(gender, text, args.repeat)
+        # Coluna já categórica, como é lida agora por read_df
+        t_cat = timed(gender, categorical, args.repeat)
+        print(f"{n:>12} {n / t_apply:>18,.0f} {n / t_text:>30,.0f} {n / t_cat:>23,.0f} {t_apply / t_cat:>7.0f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import scipy.sparse as sp
+from imblearn.over_sampling import SMOTE
+from sklearn.model_selection import train_test_split
+
+from utils.classification import OTHERS_COLUMNS, RANDOM_STATE, TARGET_COLUMNS, TEST_SIZE, class_codes, make_estimator, target
+from utils.data_utils import dataset_path
+
+# Tempo de ajuste e pico de memória (RSS) dos classificadores com as colunas one-hot entregues como colunas
+# booleanas de um DataFrame (formato atual) ou como matriz esparsa CSR. Cada combinação roda em um processo novo.
+#   python -m benchmarks.bench_sparse_handoff --algorithms "Random Forest,XGBoost"
+
+DATASET = 'scaled_ACC_INTAKES_OUTCOMES'
+NUMERIC_COLUMNS = [
+    'dob_year_scaled',
+    'age_upon_intake_(years)_scaled',
+    'intake_year_scaled',
+    'age_upon_outcome_(years)_scaled',
+    'outcome_year_scaled',
+    'time_in_shelter_days_scaled',
+]
+ONE_HOT_PREFIXES = ('sex_upon_', 'outcome_weekday_', 'intake_weekday_', 'animal_type_', 'intake_condition_', 'intake_type_', 'color_')
+
+def compact(X_train, y_train):
+    # Formato atual: o SMOTE devolve as colunas one-hot como booleanas (1 byte, valores 0/1)
+    return SMOTE(random_state=RANDOM_STATE).fit_resample(X_train, y_train)
+
+def sparse(X_train, y_train):
+    # CSR float32: só os valores não nulos das colunas one-hot (e das numéricas) são guardados
+    X = sp.csr_matrix(X_train.to_numpy(dtype=np.float32))
+    return SMOTE(random_state=RANDOM_STATE).fit_resample(X, y_train)
+
+FORMATS = {'compacto': compact, 'csr': sparse}
+
+def nbytes(X):
+    if sp.issparse(X):
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return int(X.memory_usage(index=False).sum())
+
+def peak_rss_mb():
+    # ru_maxrss é em KiB no Linux e em bytes no macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def _run(fmt, algorithm, columns, queue):
+    df = pd.read_parquet(dataset_path(DATASET), columns=columns + [col for col in TARGET_COLUMNS + OTHERS_COLUMNS if col != 'outcome_type_Others'])
+    y = target(df)
+    X_train, _, y_train, _ = train_test_split(df[columns], y, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y)
+    baseline = peak_rss_mb()
+    X, y = FORMATS[fmt](X_train, class_codes(y_train))
+    estimator = make_estimator(algorithm)
+    start = time.perf_counter()
+    estimator.fit(X, y)
+    queue.put((time.perf_counter() - start, nbytes(X), peak_rss_mb() - baseline))
+
+def measure(fmt, algorithm, columns):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_run, args=(fmt, algorithm, columns, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compara o formato das colunas one-hot entregue aos classificadores.')
+    # O SVM leva vários minutos por ajuste com todas as linhas; fica de fora por padrão
+    parser.add_argument('--algorithms', default='Random Forest,XGBoost')
+    args = parser.parse_args(argv)
+
+    # Todas as características da página de classificação
+    one_hot = [col for col in pq.read_schema(dataset_path(DATASET)).names if col.startswith(ONE_HOT_PREFIXES)]
+    columns = NUMERIC_COLUMNS + one_hot + ['is_mix_breed']
+
+    print(f"{'algoritmo':>14} {'formato':>9} {'ajuste (s)':>11} {'matriz (MB)':>12} {'acréscimo RSS (MB)':>19}")
+    for algorithm in args.algorithms.split(','):
+        for fmt in FORMATS:
+            elapsed, size, rss = measure(fmt, algorithm, columns)
+            print(f"{algorithm:>14} {fmt:>9} {elapsed:>11.2f} {size / 1e6:>12.1f} {rss:>19.1f}")
+
+if __name__ == '__main__':
+    main()
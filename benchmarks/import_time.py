@@ -0,0 +1,112 @@
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Relatório de inicialização do Home.py e de cada página: tempo de importação por pacote, somado a partir do
+# -X importtime do Python. Cada página roda em um processo novo (com o AppTest do Streamlit); o que o próprio
+# Streamlit importa fica de fora, pois no servidor já está carregado antes da primeira página.
+#   python -m benchmarks.import_time
+#   python -m benchmarks.import_time pages/classificacao_padronizado.py --top 15 --json importacoes.json
+
+MARKER = '-- início da página --'
+TIMEOUT_SECONDS = 600
+
+# Código do processo filho: importa o Streamlit, marca o início da página no stderr e a executa
+CHILD = f'''
+import sys
+import streamlit
+from streamlit.testing.v1 import AppTest
+sys.stderr.write({MARKER!r} + "\\n")
+sys.stderr.flush()
+app = AppTest.from_file(sys.argv[1], default_timeout={TIMEOUT_SECONDS})
+app.run()
+if app.exception:
+    sys.stderr.write("erro: " + app.exception[0].value + "\\n")
+'''
+
+def default_scripts():
+    return ['Home.py'] + sorted(glob.glob(os.path.join('pages', '*.py')))
+
+def parse(stderr):
+    # Linhas "import time: próprio | acumulado | módulo" depois da marca, com a profundidade dada pela indentação
+    entries = []
+    started = False
+    errors = []
+    for line in stderr.splitlines():
+        if line == MARKER:
+            started = True
+        elif started and line.startswith('import time:'):
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            # Cabeçalho ("self [us] | cumulative | imported package")
+            if not self_us.strip().isdigit():
+                continue
+            depth = (len(name) - len(name.lstrip())) // 2
+            entries.append({'module': name.strip(), 'self_us': int(self_us), 'cumulative_us': int(cumulative_us),
+                            'depth': depth})
+        elif started and line.startswith('erro: '):
+            errors.append(line[len('erro: '):])
+    return entries, errors
+
+def aggregate(entries):
+    # Por pacote (primeiro nome do módulo): soma do tempo próprio dos módulos e tempo acumulado das importações
+    # feitas de fora do pacote, que inclui as dependências carregadas por ele pela primeira vez
+    packages = {}
+    # O -X importtime imprime cada módulo depois dos que ele importou; na ordem inversa, o pai vem antes
+    stack = []
+    for entry in reversed(entries):
+        while stack and stack[-1][0] >= entry['depth']:
+            stack.pop()
+        package = entry['module'].split('.')[0]
+        parent = stack[-1][1] if stack else None
+        stack.append((entry['depth'], package))
+        totals = packages.setdefault(package, {'modules': 0, 'self_ms': 0.0, 'cumulative_ms': 0.0})
+        totals['modules'] += 1
+        totals['self_ms'] += entry['self_us'] / 1000
+        if parent != package:
+            totals['cumulative_ms'] += entry['cumulative_us'] / 1000
+    return dict(sorted(packages.items(), key=lambda item: -item[1]['cumulative_ms']))
+
+def measure(script):
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD, script],
+                             capture_output=True, text=True, timeout=TIMEOUT_SECONDS + 60)
+    elapsed = time.perf_counter() - start
+    entries, errors = parse(process.stderr)
+    return {
+        'script': script,
+        'import_ms': sum(entry['cumulative_us'] for entry in entries if entry['depth'] == 0) / 1000,
+        'modules': len(entries),
+        'seconds': elapsed,
+        'errors': errors,
+        'packages': aggregate(entries),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Tempo de importação por pacote na inicialização de cada página.')
+    parser.add_argument('scripts', nargs='*', help='páginas (padrão: Home.py e pages/*.py)')
+    parser.add_argument('--top', type=int, default=10, help='pacotes exibidos por página')
+    parser.add_argument('--json', help='grava o relatório completo neste arquivo')
+    args = parser.parse_args(argv)
+
+    results = []
+    for script in args.scripts or default_scripts():
+        result = measure(script)
+        results.append(result)
+        print(f"\n{script}: {result['import_ms']:.0f} ms importando {result['modules']} módulos "
+              f"(execução total {result['seconds']:.1f}s)")
+        for error in result['errors']:
+            print(f'  erro na página: {error}')
+        print(f"  {'pacote':<24} {'módulos':>8} {'próprio (ms)':>13} {'acumulado (ms)':>15}")
+        for package, totals in list(result['packages'].items())[:args.top]:
+            print(f"  {package:<24} {totals['modules']:>8} {totals['self_ms']:>13.1f} {totals['cumulative_ms']:>15.1f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlparse
+import numpy as np
+import pandas as pd
+
+from utils.data_utils import dataset_path
+from utils.features import SOURCE
+
+# Teste de carga do serviço de previsão (utils/service.py): clientes simultâneos enviam registros do dataset de
+# origem e são medidas as latências (p50/p99) e as requisições por segundo.
+#   python -m utils.service --algorithms "Random Forest" &
+#   python -m benchmarks.load_test_service --concurrency 16 --requests 2000
+
+URL = 'http://127.0.0.1:8502'
+
+def _client(url, algorithm, records, latencies, errors):
+    # Uma conexão persistente por cliente
+    address = urlparse(url)
+    connection = http.client.HTTPConnection(address.hostname, address.port)
+    for record in records:
+        body = json.dumps({'algorithm': algorithm, 'record': record})
+        start = time.perf_counter()
+        connection.request('POST', '/predict', body, {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status != 200:
+            errors.append(response.status)
+    connection.close()
+
+def run(url, algorithm, concurrency, requests):
+    address = urlparse(url)
+    connection = http.client.HTTPConnection(address.hostname, address.port)
+    connection.request('GET', '/info')
+    info = json.loads(connection.getresponse().read())
+    connection.close()
+    algorithm = algorithm or next(iter(info))
+    fields = info[algorithm]['fields']
+
+    # Registros reais, convertidos para tipos do JSON
+    sample = pd.read_parquet(dataset_path(SOURCE), columns=fields).sample(requests, replace=True, random_state=0)
+    records = json.loads(sample.to_json(orient='records'))
+
+    latencies, errors = [], []
+    threads = [threading.Thread(target=_client, args=(url, algorithm, records[i::concurrency], latencies, errors))
+               for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    return {
+        'algorithm': algorithm,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'rps': len(latencies) / elapsed,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Teste de carga do serviço de previsão.')
+    parser.add_argument('--url', default=URL)
+    parser.add_argument('--algorithm', help='modelo carregado no serviço (padrão: o primeiro)')
+    parser.add_argument('--concurrency', type=int, default=16, help='clientes simultâneos')
+    parser.add_argument('--requests', type=int, default=2000, help='total de requisições')
+    args = parser.parse_args(argv)
+
+    result = run(args.url, args.algorithm, args.concurrency, args.requests)
+    print(f"{result['algorithm']}: {result['requests']} requisições ({result['errors']} erros), "
+          f"p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms, {result['rps']:.0f} req/s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+import argparse
+import gc
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from utils import synthetic
+from utils.classification import FEATURE_GROUPS, balanced_split, selected_columns, train_model
+from utils.clustering import calculate_elbow, cluster_result, clustering_columns, feature_matrix
+from utils.cube import build_cube, read_cube
+from utils.data_utils import atomic_write, cache_path, clear_cache, dataset_path, read_df
+from utils.eda import intake_conditions, monthly_series, population_pyramid, type_distribution
+from utils.features import load_state
+from utils.silhouette import silhouette_curve, silhouette_estimate, silhouette_exact
+from utils.timeseries import monthly_index
+
+# Suíte de benchmarks, fora do Streamlit: leitura dos dados, transformações das páginas de EDA, Método do Cotovelo
+# e silhueta da clusterização, e SMOTE e treino da página de classificação, em várias escalas do dataset. Cada
+# medida roda em um processo novo, com um diretório de cache em disco vazio, e registra o tempo (total e de CPU) e
+# o pico de memória acima do início da medida. Os resultados são gravados em JSON e podem ser comparados com uma
+# execução anterior: a suíte falha (código de saída 1) se alguma medida piorar além do limite.
+#   python -m benchmarks.suite
+#   python -m benchmarks.suite --benchmarks read_df,elbow --scales 1 8 --output antes.json
+#   python -m benchmarks.suite --baseline antes.json --threshold 0.25
+#   python -m benchmarks.suite --synthetic --scales 10 100
+
+SOURCE = 'ACC_INTAKES_OUTCOMES'
+SCALED = 'scaled_ACC_INTAKES_OUTCOMES'
+DATASETS = [SOURCE, SCALED]
+# Escalas em relação ao número de linhas dos datasets em data/ (abaixo de 1, as classes raras ficam com poucos
+# registros para o SMOTE)
+SCALES = [1, 2, 4]
+RESULTS_DIR = os.path.join('benchmarks', 'results')
+THRESHOLD = 0.25
+# Diferenças menores que estas são tratadas como ruído, mesmo acima do limite relativo
+MIN_SECONDS = 0.05
+MIN_PEAK_MB = 16
+SAMPLE_SECONDS = 0.005
+CHUNK_ROWS = 256 * 1024
+RANDOM_STATE = 42
+
+# Valores padrão das páginas
+AGE_GROUP_COLUMN = 'age_upon_intake_age_group'
+SILHOUETTE_K = 4
+CLASSIFICATION_GROUPS = ["Ano de nascimento", "Idade no momento de entrada"]
+ALGORITHM = 'Random Forest'
+
+# Cada benchmark faz sua preparação (fora da medida) e devolve a função medida
+def _read_df():
+    return lambda: read_df(SOURCE)
+
+def _cube():
+    return lambda: build_cube(dataset_path(SOURCE))
+
+def _eda(pipeline):
+    def prepare():
+        # O cubo já está em disco, como nas páginas; a medida inclui a leitura do arquivo
+        read_cube(SOURCE)
+        clear_cache()
+        return pipeline
+    return prepare
+
+def _grafico4():
+    index = monthly_index(SOURCE)
+    return monthly_series(index, index['years'].tolist(), 'outcomes_by_intake_year')
+
+def _clustering_data():
+    features = clustering_columns('scaled')
+    return read_df(SCALED, columns=features), features
+
+def _elbow():
+    data, features = _clustering_data()
+    # Os KMeans rodam em processos do joblib, cuja memória fica fora do pico medido
+    return lambda: calculate_elbow(SCALED, data, features)
+
+def _silhouette(estimate):
+    def prepare():
+        data, features = _clustering_data()
+        labels = cluster_result(SCALED, data, features, SILHOUETTE_K)['labels']
+        X = feature_matrix(SCALED, data, features)
+
+        def run():
+            # Cálculo da silhueta e curvas por cluster do grafico_silhueta da página (sem montar a figura)
+            silhouette = estimate(X, labels)
+            return [silhouette_curve(values, size) for values, size in zip(silhouette['values'], silhouette['sizes'])]
+
+        return run
+    return prepare
+
+def _classification_columns():
+    return selected_columns(FEATURE_GROUPS, CLASSIFICATION_GROUPS)
+
+def _smote():
+    columns = _classification_columns()
+    return lambda: balanced_split(SCALED, columns)
+
+def _fit():
+    columns = _classification_columns()
+    balanced_split(SCALED, columns)
+    return lambda: train_model(SCALED, columns, ALGORITHM)
+
+BENCHMARKS = {
+    'read_df': _read_df,
+    'cube': _cube,
+    'grafico1': _eda(lambda: population_pyramid(SOURCE, AGE_GROUP_COLUMN)),
+    'grafico2': _eda(lambda: type_distribution(SOURCE, 'outcome_type')),
+    'grafico3': _eda(lambda: intake_conditions(SOURCE)),
+    'grafico4': _eda(_grafico4),
+    'elbow': _elbow,
+    'silhueta': _silhouette(silhouette_estimate),
+    'silhueta_exata': _silhouette(silhouette_exact),
+    'smote': _smote,
+    'treino': _fit,
+}
+# A silhueta exata é quadrática no número de linhas: só roda quando pedida
+DEFAULT_BENCHMARKS = [name for name in BENCHMARKS if name != 'silhueta_exata']
+
+def _rss():
+    # Memória residente atual (Linux); em outros sistemas, o pico do processo até agora
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+def measure(run):
+    # Tempo e pico de memória de run(), com a memória amostrada em uma thread durante a execução
+    gc.collect()
+    baseline = _rss()
+    peak = [baseline]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(SAMPLE_SECONDS):
+            peak[0] = max(peak[0], _rss())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start, start_cpu = time.perf_counter(), time.process_time()
+    run()
+    seconds, cpu_seconds = time.perf_counter() - start, time.process_time() - start_cpu
+    done.set()
+    sampler.join()
+    return {
+        'seconds': seconds,
+        'cpu_seconds': cpu_seconds,
+        'peak_mb': (max(peak[0], _rss()) - baseline) / 1024 ** 2,
+    }
+
+def scaled_copy(df_name, scale):
+    # Dataset com `scale` vezes o número de linhas do original, por amostragem com reposição (na ordem original),
+    # gravado em blocos; refeito apenas se o original mudar
+    source_path = dataset_path(df_name)
+    path = cache_path('benchmarks', f'x{scale:g}', 'data', f'{df_name}.parquet')
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source_path):
+        return path
+    with atomic_write(path) as tmp_path:
+        if scale == 1:
+            shutil.copyfile(source_path, tmp_path)
+        else:
+            table = pq.read_table(source_path)
+            rows = max(1, round(table.num_rows * scale))
+            indices = np.sort(np.random.default_rng(RANDOM_STATE).integers(0, table.num_rows, rows))
+            with pq.ParquetWriter(tmp_path, table.schema) as writer:
+                for start in range(0, rows, CHUNK_ROWS):
+                    writer.write_table(table.take(indices[start:start + CHUNK_ROWS]))
+    return path
+
+def synthetic_copy(scale):
+    # Datasets gerados por utils.synthetic com `scale` vezes o número de linhas do original (o de origem e os
+    # derivados); refeitos apenas se o original mudar
+    source_path = dataset_path(SOURCE)
+    workdir = os.path.dirname(cache_path('benchmarks', f'sintetico-x{scale:g}', 'data'))
+    paths = [os.path.join(workdir, 'data', f'{df_name}.parquet') for df_name in DATASETS]
+    if not all(os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source_path) for path in paths):
+        rows = max(1, round(pq.ParquetFile(source_path).metadata.num_rows * scale))
+        synthetic.write(synthetic.fit(pd.read_parquet(source_path)), rows, workdir, load_state())
+    return paths
+
+def prepare(scale, synthetic_data=False):
+    # Diretório de trabalho da escala, com os datasets em data/
+    paths = synthetic_copy(scale) if synthetic_data else [scaled_copy(df_name, scale) for df_name in DATASETS]
+    return os.path.dirname(os.path.dirname(paths[0])), {
+        df_name: pq.ParquetFile(path).metadata.num_rows for df_name, path in zip(DATASETS, paths)}
+
+def run_child(name, workdir):
+    # Processo novo (sem caches em memória) no diretório da escala, com um cache em disco vazio
+    cache_dir = os.path.join(os.path.abspath(workdir), '.cache')
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, CACHE_DIR=cache_dir,
+               PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    process = subprocess.run([sys.executable, '-m', 'benchmarks.suite', '--child', name],
+                             cwd=workdir, env=env, capture_output=True, text=True)
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    if process.returncode != 0:
+        return {'error': process.stderr.strip().splitlines()[-1] if process.stderr.strip() else f'código {process.returncode}'}
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+def run(benchmarks=DEFAULT_BENCHMARKS, scales=SCALES, repeat=1, synthetic_data=False, report=print):
+    results = []
+    for scale in scales:
+        workdir, rows = prepare(scale, synthetic_data)
+        for name in benchmarks:
+            runs = [run_child(name, workdir) for _ in range(repeat)]
+            errors = [result['error'] for result in runs if 'error' in result]
+            result = {'benchmark': name, 'scale': scale, 'rows': rows}
+            if errors:
+                result['error'] = errors[0]
+            else:
+                # Melhor de `repeat` execuções
+                result.update({metric: min(r[metric] for r in runs) for metric in ('seconds', 'cpu_seconds', 'peak_mb')})
+            results.append(result)
+            report(result)
+    return {
+        'created_at': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'cpus': os.cpu_count(),
+        'repeat': repeat,
+        'synthetic': synthetic_data,
+        'results': results,
+    }
+
+def compare(current, baseline, threshold=THRESHOLD):
+    # Medidas que pioraram mais que `threshold` (relativo) em relação à execução de referência
+    previous = {(result['benchmark'], result['scale']): result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        old = previous.get((result['benchmark'], result['scale']))
+        if old is None or 'error' in result or 'error' in old:
+            continue
+        for metric, floor in (('seconds', MIN_SECONDS), ('peak_mb', MIN_PEAK_MB)):
+            if result[metric] > old[metric] * (1 + threshold) and result[metric] - old[metric] > floor:
+                regressions.append({'benchmark': result['benchmark'], 'scale': result['scale'], 'metric': metric,
+                                    'baseline': old[metric], 'current': result[metric]})
+    return regressions
+
+def _print_result(result):
+    label = f"{result['benchmark']:<15} x{result['scale']:<6g}"
+    if 'error' in result:
+        print(f"{label} erro: {result['error']}", flush=True)
+        return
+    print(f"{label} {result['seconds']:>9.3f}s {result['cpu_seconds']:>9.3f}s CPU {result['peak_mb']:>9.1f} MB", flush=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks de leitura, EDA, clusterização e classificação em várias escalas.')
+    parser.add_argument('--benchmarks', default=','.join(DEFAULT_BENCHMARKS),
+                        help=f"separados por vírgula, entre: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--scales', type=float, nargs='+', default=SCALES, help='múltiplos do número de linhas dos datasets')
+    parser.add_argument('--synthetic', action='store_true',
+                        help='usa datasets gerados por utils.synthetic em vez de reamostrar os originais')
+    parser.add_argument('--repeat', type=int, default=1, help='execuções por medida (vale a melhor)')
+    parser.add_argument('--output', help=f'arquivo JSON dos resultados (padrão: {RESULTS_DIR}/<data>.json)')
+    parser.add_argument('--baseline', help='JSON de uma execução anterior, para comparação')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='piora relativa tolerada (0.25 = 25%%)')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        # Processo filho: uma medida, impressa como JSON na última linha
+        print(json.dumps(measure(BENCHMARKS[args.child]())))
+        return
+
+    benchmarks = args.benchmarks.split(',')
+    unknown = [name for name in benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f'benchmarks desconhecidos: {unknown}')
+
+    print(f"{'benchmark':<15} {'escala':<7} {'tempo':>10} {'CPU':>13} {'pico de memória':>15}")
+    results = run(benchmarks, args.scales, args.repeat, args.synthetic, report=_print_result)
+    output = args.output or os.path.join(RESULTS_DIR, f"{pd.Timestamp.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with atomic_write(output) as tmp_path:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f'Resultados gravados em {output}')
+
+    failed = any('error' in result for result in results['results'])
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"Regressão: {regression['benchmark']} x{regression['scale']:g} {regression['metric']} "
+                  f"{regression['baseline']:.3f} -> {regression['current']:.3f}")
+        if not regressions:
+            print(f'Nenhuma regressão acima de {args.threshold:.0%} em relação a {args.baseline}')
+        failed = failed or bool(regressions)
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
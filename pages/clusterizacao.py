@@ -1,11 +1,13 @@
 import streamlit as st
 import pandas as pd
-from utils.data_utils import read_df
-from sklearn.cluster import KMeans
+from utils import spans
+from utils.data_utils import cached, read_df
+from utils.clustering import calculate_elbow, cluster_result, clustering_columns, feature_matrix, result_path
+from utils.distributions import summarize_by_group
+from utils.silhouette import silhouette_curve, silhouette_estimate, silhouette_exact
 import plotly.express as px
 import numpy as np
 import plotly.graph_objs as go
-from sklearn.metrics import silhouette_samples, silhouette_score
 
 st.set_page_config(page_title="Clusterização", layout="wide")
 
@@ -14,6 +16,12 @@ color_scale = ['#3498db', '#e74c3c', '#2ecc71', '#9b59b6',
                '#f1c40f', '#1abc9c', '#e67e22', '#34495e', 
                '#ff6b6b', '#48dbfb']
 
+# Colunas com os valores originais (sem normalização/padronização), exibidas nos gráficos por cluster
+ORIGINAL_COLUMNS = ['time_in_shelter_days', 'age_upon_outcome_(years)']
+
+# Acima deste número de registros, a silhueta é estimada por amostragem por padrão
+EXACT_SILHOUETTE_MAX_ROWS = 20000
+
 def main():
     st.write('<h1>Clusterização (<i>clustering</i>)</h1>', unsafe_allow_html=True)
     st.write('''Para a geração de grupos, foi usado o método K-means, que separa o <i>dataset</i> em <i>k</i> grupos distintos.
@@ -24,108 +32,13 @@ def main():
 
     st.write('----')
     
-    # Carregar os dados normalizados e padronizados
+    # Datasets normalizado e padronizado
     normalized_data_name = 'normalized_ACC_INTAKES_OUTCOMES'
     scaled_data_name = 'scaled_ACC_INTAKES_OUTCOMES'
-    data_normalized = read_df(normalized_data_name, extension='parquet')
-    data_scaled = read_df(scaled_data_name, extension='parquet')
 
     # Colunas a serem utilizadas para a clusterização
-    cluster_features_norm = [
-        "age_upon_intake_(years)_normalized",
-        "age_upon_outcome_(years)_normalized",
-        "time_in_shelter_days_normalized",
-        "outcome_type_Adoption       ",
-        "outcome_type_Died           ",
-        "outcome_type_Euthanasia     ",
-        "outcome_type_Missing        ",
-        "outcome_type_Return to Owner",
-        "outcome_type_Transfer       ",
-        "sex_upon_outcome_Intact Female",
-        "sex_upon_outcome_Intact Male  ",
-        "sex_upon_outcome_Neutered Male",
-        "sex_upon_outcome_Spayed Female",
-        "sex_upon_outcome_Unknown      ",
-        "animal_type_Bir",
-        "animal_type_Cat",
-        "animal_type_Dog",
-        "animal_type_Oth",
-        "intake_condition_Aged   ",
-        "intake_condition_Feral  ",
-        "intake_condition_Injured",
-        "intake_condition_Normal ",
-        "intake_condition_Nursing",
-        "intake_condition_Other  ",
-        "intake_condition_Pregnan",
-        "intake_condition_Sick   ",
-        "sex_upon_intake_Intact Female",
-        "sex_upon_intake_Intact Male  ",
-        "sex_upon_intake_Neutered Male",
-        "sex_upon_intake_Spayed Female",
-        "sex_upon_intake_Unknown      ",
-        "is_mix_breed",
-        "color_Black",
-        "color_Brown/Chocolate",
-        "color_Gray/Blue",
-        "color_Other_Colors",
-        "color_Patterned",
-        "color_Red/Orange",
-        "color_White",
-        "color_Yellow/Gold/Cream"
-        ]
-
-    cluster_features_scaled = [
-        "age_upon_intake_(years)_scaled",
-        "age_upon_outcome_(years)_scaled",
-        "time_in_shelter_days_scaled",
-        "outcome_type_Adoption       ",
-        "outcome_type_Died           ",
-        "outcome_type_Euthanasia     ",
-        "outcome_type_Missing        ",
-        "outcome_type_Return to Owner",
-        "outcome_type_Transfer       ",
-        "sex_upon_outcome_Intact Female",
-        "sex_upon_outcome_Intact Male  ",
-        "sex_upon_outcome_Neutered Male",
-        "sex_upon_outcome_Spayed Female",
-        "sex_upon_outcome_Unknown      ",
-        "animal_type_Bir",
-        "animal_type_Cat",
-        "animal_type_Dog",
-        "animal_type_Oth",
-        "intake_condition_Aged   ",
-        "intake_condition_Feral  ",
-        "intake_condition_Injured",
-        "intake_condition_Normal ",
-        "intake_condition_Nursing",
-        "intake_condition_Other  ",
-        "intake_condition_Pregnan",
-        "intake_condition_Sick   ",
-        "sex_upon_intake_Intact Female",
-        "sex_upon_intake_Intact Male  ",
-        "sex_upon_intake_Neutered Male",
-        "sex_upon_intake_Spayed Female",
-        "sex_upon_intake_Unknown      ",
-        "is_mix_breed",
-        "color_Black",
-        "color_Brown/Chocolate",
-        "color_Gray/Blue",
-        "color_Other_Colors",
-        "color_Patterned",
-        "color_Red/Orange",
-        "color_White",
-        "color_Yellow/Gold/Cream"    
-    ]
-
-    # Função para calcular o Elbow
-    def calculate_elbow(data, features):
-        sse = []
-        k_values = range(1, 11)  # Testar de 1 a 10 clusters
-        for k in k_values:
-            kmeans = KMeans(n_clusters=k, random_state=42)
-            kmeans.fit(data[features])
-            sse.append(kmeans.inertia_)
-        return k_values, sse
+    cluster_features_norm = clustering_columns('normalized')
+    cluster_features_scaled = clustering_columns('scaled')
 
     # Selecionar o dataset e o número de clusters
     dataset_option = st.selectbox('Selecione o dataset para clusterização:', 
@@ -133,64 +46,60 @@ def main():
 
     # Ajustar as colunas de acordo com a seleção do dataset
     if dataset_option == 'Dataset Padronizado':
-        selected_data = data_scaled
+        selected_data_name = scaled_data_name
         cluster_features = cluster_features_scaled
     else:
-        selected_data = data_normalized
+        selected_data_name = normalized_data_name
         cluster_features = cluster_features_norm
 
+    # Uma única leitura, só do dataset selecionado e só das colunas usadas na página
+    selected_data = read_df(selected_data_name, columns=cluster_features + ORIGINAL_COLUMNS)
+
     # Calcular o Elbow para os dados padronizados e normalizados
     st.markdown("<h2>Método Elbow</h2>", unsafe_allow_html=True)
 
-    k_values, sse = calculate_elbow(selected_data, cluster_features)
+    minibatch = st.checkbox('Usar MiniBatchKMeans (mais rápido em bases grandes, resultado aproximado)', value=False)
+
+    # Os valores de k são ajustados em paralelo e o resultado fica salvo em disco para as próximas execuções
+    k_values, sse = calculate_elbow(selected_data_name, selected_data, cluster_features, minibatch=minibatch)
 
     # Criar o gráfico de Elbow
     fig_elbow = px.line(x=k_values, y=sse, markers=True, title=f'Método Elbow para {dataset_option}',
                         labels={'x': 'Número de Clusters', 'y': 'Soma dos quadrados das distâncias'})
 
-    st.plotly_chart(fig_elbow)
+    with spans.span('plotly_chart'):
+        st.plotly_chart(fig_elbow)
 
     st.write('----')
 
 
     #Gráfico de Silhueta
-    def grafico_silhueta(df, n_clusters=4):
-        # Ajustar o KMeans ao DataFrame df
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        cluster_labels = kmeans.fit_predict(df)
-
-        # Calcular a pontuação média de Silhouette
-        silhouette_avg = silhouette_score(df, cluster_labels)
-
-        # Calcular as pontuações de Silhouette para cada ponto
-        sample_silhouette_values = silhouette_samples(df, cluster_labels)
-
+    def grafico_silhueta(silhouette):
         y_lower = 10
         silhouette_data = []
 
-        for i in range(n_clusters):
-            # Agregar as pontuações de silhouette para o cluster i e ordenar
-            ith_cluster_silhouette_values = sample_silhouette_values[cluster_labels == i]
-            ith_cluster_silhouette_values.sort()
-
-            size_cluster_i = ith_cluster_silhouette_values.shape[0]
-            y_upper = y_lower + size_cluster_i
+        for i, (values, size) in enumerate(zip(silhouette['values'], silhouette['sizes'])):
+            # Curva ordenada das pontuações do cluster i, reduzida a poucos pontos por cluster
+            x, y = silhouette_curve(values, size)
+            y_upper = y_lower + size
 
             color = px.colors.qualitative.Plotly[i % len(px.colors.qualitative.Plotly)]
 
             # Adicionar dados ao gráfico
             silhouette_data.append(go.Scatter(
-                x=ith_cluster_silhouette_values,
-                y=np.arange(y_lower, y_upper),
+                x=x,
+                y=y_lower + y,
                 mode='lines',
                 fill='tozerox',
                 fillcolor=color,
                 line=dict(color=color),
-                name=f'Cluster {i}'
+                name=f'Cluster {silhouette["clusters"][i]}'
             ))
 
             y_lower = y_upper + 10
 
+        silhouette_avg = silhouette['average']
+
         # Linha vertical para a pontuação média de silhouette de todos os valores
         silhouette_data.append(go.Scatter(
             x=[silhouette_avg, silhouette_avg],
@@ -211,65 +120,109 @@ def main():
         fig = go.Figure(data=silhouette_data, layout=layout)
 
         # Exibir o gráfico no Streamlit
-        st.plotly_chart(fig)
-        st.write(f"Pontuação Média de Silhouette: {silhouette_avg:.4f}")
+        with spans.span('plotly_chart'):
+            st.plotly_chart(fig)
+        low, high = silhouette['ci']
+        if low == high:
+            st.write(f"Pontuação Média de Silhouette: {silhouette_avg:.4f}")
+        else:
+            st.write(f"Pontuação Média de Silhouette (estimada com {silhouette['evaluated']} pontos): "
+                     f"{silhouette_avg:.4f} (IC 95%: {low:.4f} a {high:.4f})")
 
     # Slider do gráfico de Silhueta
     st.markdown("<h2>Gráfico de Silhueta</h2>", unsafe_allow_html=True)
     num_clusters_silhueta = st.slider('Número de Clusters para o Gráfico de Silhueta:', 2, 10, 4)
-    grafico_silhueta(selected_data[cluster_features], n_clusters=num_clusters_silhueta)
+    silhouette_modes = ['Amostragem estratificada (rápido)', 'Exato (todos os pontos)']
+    silhouette_mode = st.radio('Cálculo da Silhueta:', silhouette_modes,
+                               index=0 if len(selected_data) > EXACT_SILHOUETTE_MAX_ROWS else 1, horizontal=True)
 
+    # Rótulos do KMeans já ajustado na varredura do Método do Cotovelo
+    silhouette_labels = cluster_result(selected_data_name, selected_data, cluster_features, num_clusters_silhueta, minibatch)['labels']
 
-    st.write('----')
+    def calcular_silhueta():
+        X = feature_matrix(selected_data_name, selected_data, cluster_features)
+        if silhouette_mode == silhouette_modes[0]:
+            return silhouette_estimate(X, silhouette_labels)
+        return silhouette_exact(X, silhouette_labels)
+
+    # Guardada no cache compartilhado, junto aos rótulos de onde foi calculada
+    silhouette = cached(result_path(selected_data_name, cluster_features, num_clusters_silhueta, minibatch),
+                        calcular_silhueta, 'silhouette', silhouette_mode)
+    grafico_silhueta(silhouette)
 
-    # Função para clusterização
-    def clusterize_data(data, features, num_clusters=3):
-        kmeans = KMeans(n_clusters=num_clusters, random_state=42)
-        clusters = kmeans.fit_predict(data[features])
-        data['cluster'] = clusters
-        return data
 
-    # Aplicar a clusterização
+    st.write('----')
+
+    # Aplicar a clusterização (resultado já calculado na varredura do Método do Cotovelo)
     num_clusters = st.slider('Número de Clusters:', 2, 10, 3)
-    data_clustered = clusterize_data(selected_data, cluster_features, num_clusters)
+    clusters = cluster_result(selected_data_name, selected_data, cluster_features, num_clusters, minibatch)
+
+    # Somas das colunas por cluster (as colunas one-hot viram contagens), calculadas junto com o ajuste
+    cluster_sums = clusters['sums'].reset_index()
+
+    # Resumos das distribuições por cluster (quantis, densidade e pontos discrepantes), calculados no servidor:
+    # o gráfico recebe um número fixo de pontos por cluster, independentemente do número de registros
+    def resumo_por_cluster(column):
+        return cached(result_path(selected_data_name, cluster_features, num_clusters, minibatch),
+                      lambda: summarize_by_group(selected_data[column].to_numpy(), clusters['labels'], num_clusters),
+                      'distribution', column)
+
+    def pontos_discrepantes(cluster, box, color):
+        return go.Scatter(x=np.full(len(box['outliers']), cluster), y=box['outliers'], mode='markers',
+                          marker=dict(color=color, size=4), showlegend=False, hoverinfo='y')
+
+    def caixa(cluster, box, color, **kwargs):
+        return go.Box(x=[cluster], q1=[box['q1']], median=[box['median']], q3=[box['q3']], mean=[box['mean']],
+                      lowerfence=[box['lowerfence']], upperfence=[box['upperfence']],
+                      marker_color=color, name=str(cluster), boxpoints=False, **kwargs)
 
     ################## AQUI ##################
 
     # Adicionar gráfico de boxplot para tempo no abrigo por cluster
     st.markdown("<h2>Distribuição do Tempo no Abrigo por Cluster</h2>", unsafe_allow_html=True)
-    
-    # Para garantir que os valores originais de 'time_in_shelter_days' sejam usados no boxplot:
-    original_time_in_shelter = read_df(scaled_data_name if dataset_option == 'Dataset Padronizado' else normalized_data_name, extension='parquet')['time_in_shelter_days']
 
-    data_clustered['time_in_shelter_days_original'] = original_time_in_shelter
+    # Gráfico de boxplot a partir dos quartis de cada cluster
+    fig_boxplot = go.Figure()
+    for cluster, summary in enumerate(resumo_por_cluster('time_in_shelter_days')):
+        box = summary['box']
+        if box is None:
+            continue
+        color = color_scale[cluster % len(color_scale)]
+        fig_boxplot.add_trace(caixa(cluster, box, color))
+        fig_boxplot.add_trace(pontos_discrepantes(cluster, box, color))
 
-    # Gráfico de boxplot
-    fig_boxplot = px.box(data_clustered, x='cluster', y='time_in_shelter_days_original', 
-                         color='cluster', color_discrete_sequence=color_scale[:num_clusters],
-                         labels={'cluster': 'Cluster', 'time_in_shelter_days_original': 'Tempo no Abrigo (dias)'})
-    
-    fig_boxplot.update_layout(showlegend=False)
+    fig_boxplot.update_layout(showlegend=False, xaxis=dict(title='Cluster', tickmode='array', tickvals=list(range(num_clusters))),
+                              yaxis=dict(title='Tempo no Abrigo (dias)'))
 
-    st.plotly_chart(fig_boxplot)
+    with spans.span('plotly_chart'):
+        st.plotly_chart(fig_boxplot)
 
     st.write('----')
 
     # Adicionar gráfico de Violin Plot para idade por cluster
     st.markdown("<h2>Distribuição da idade no momento de saída do Abrigo por Cluster</h2>", unsafe_allow_html=True)
-    
-    # Para garantir que os valores originais de 'age_upon_outcome_(years)' sejam usados no Violin Plot:
-    original_age_upon_outcome = read_df(scaled_data_name if dataset_option == 'Dataset Padronizado' else normalized_data_name, extension='parquet')['age_upon_outcome_(years)']
 
-    data_clustered['age_upon_outcome_(years)_original'] = original_age_upon_outcome
+    # Violin Plot a partir da densidade (KDE) de cada cluster, com a caixa dos quartis por dentro
+    fig_violin = go.Figure()
+    for cluster, summary in enumerate(resumo_por_cluster('age_upon_outcome_(years)')):
+        box = summary['box']
+        if box is None:
+            continue
+        grid, density = summary['kde']
+        half_width = 0.4 * density / density.max()
+        color = color_scale[cluster % len(color_scale)]
+        fig_violin.add_trace(go.Scatter(x=np.concatenate([cluster - half_width, (cluster + half_width)[::-1]]),
+                                        y=np.concatenate([grid, grid[::-1]]),
+                                        mode='lines', fill='toself', line=dict(color=color, width=1),
+                                        name=str(cluster), hoverinfo='skip'))
+        fig_violin.add_trace(caixa(cluster, box, color, width=0.08, fillcolor='white'))
+        fig_violin.add_trace(pontos_discrepantes(cluster, box, color))
 
-    # Criar o Violin Plot
-    fig_violin = px.violin(data_clustered, x='cluster', y='age_upon_outcome_(years)_original', 
-                           color='cluster', color_discrete_sequence=color_scale[:num_clusters],
-                           box=True, points='all', labels={'cluster': 'Cluster', 'age_upon_outcome_(years)_original': 'Idade (anos)'})
-    
-    fig_violin.update_layout(showlegend=False)
+    fig_violin.update_layout(showlegend=False, xaxis=dict(title='Cluster', tickmode='array', tickvals=list(range(num_clusters))),
+                             yaxis=dict(title='Idade (anos)'))
 
-    st.plotly_chart(fig_violin)
+    with spans.span('plotly_chart'):
+        st.plotly_chart(fig_violin)
 
 
 
@@ -299,7 +252,7 @@ def main():
     }
 
     # Criar o dataframe para o gráfico de barras empilhadas
-    outcome_data = data_clustered.groupby('cluster')[outcome_columns].sum().reset_index()
+    outcome_data = cluster_sums[['cluster'] + outcome_columns]
 
     # Renomear as colunas de acordo com as legendas desejadas
     outcome_data = outcome_data.rename(columns=outcome_labels)
@@ -317,7 +270,8 @@ def main():
                              labels={'cluster': 'Cluster', 'Quantidade': 'Quantidade'},
                              title='Distribuição dos Tipos de Saída por Cluster')
 
-    st.plotly_chart(fig_stacked_bar)
+    with spans.span('plotly_chart'):
+        st.plotly_chart(fig_stacked_bar)
 
     st.write('----')
 
@@ -348,7 +302,7 @@ def main():
     }
 
     # Criar o dataframe para o gráfico de barras empilhadas
-    intake_condition_data = data_clustered.groupby('cluster')[intake_condition_columns].sum().reset_index()
+    intake_condition_data = cluster_sums[['cluster'] + intake_condition_columns]
 
     # Renomear as colunas de acordo com as legendas desejadas
     intake_condition_data = intake_condition_data.rename(columns=intake_condition_labels)
@@ -371,7 +325,8 @@ def main():
     title='Distribuição das Condições de Saúde na Entrada por Cluster'
 )
 
-    st.plotly_chart(fig_intake_condition_stacked_bar)
+    with spans.span('plotly_chart'):
+        st.plotly_chart(fig_intake_condition_stacked_bar)
 
     st.write('----')
 
@@ -391,10 +346,8 @@ def main():
         'animal_type_Oth': 'Outros tipos de animais'
     }
 
-    data_clustered = data_clustered.rename(columns=column_rename_mapping)
-
     # Criar o dataframe para o gráfico de barras empilhadas
-    animal_data = data_clustered.groupby('cluster')[list(column_rename_mapping.values())].sum().reset_index()
+    animal_data = cluster_sums[['cluster'] + animal_columns].rename(columns=column_rename_mapping)
 
     # Converter o dataframe para um formato longo para facilitar o uso com Plotly
     animal_data_melted = animal_data.melt(id_vars='cluster', 
@@ -409,7 +362,8 @@ def main():
                                      labels={'cluster': 'Cluster', 'Quantidade': 'Quantidade'},
                                      title='Distribuição dos Tipos de Animais por Cluster')
 
-    st.plotly_chart(fig_stacked_bar_animals)
+    with spans.span('plotly_chart'):
+        st.plotly_chart(fig_stacked_bar_animals)
 
     st.write('----')
 
@@ -417,10 +371,10 @@ def main():
     st.markdown("<h2>Distribuição de Raça Pura ou Misturada por Cluster</h2>", unsafe_allow_html=True)
 
     # Criar o dataframe para o gráfico de barras empilhadas
-    breed_data = data_clustered.groupby(['cluster', 'is_mix_breed']).size().unstack(fill_value=0)
-
-    # Renomear as colunas para exibição mais clara
-    breed_data = breed_data.rename(columns={0: 'Raça Pura', 1: 'Raça Misturada'})
+    breed_data = pd.DataFrame({
+        'Raça Pura': clusters['sizes'] - cluster_sums['is_mix_breed'].to_numpy(),
+        'Raça Misturada': cluster_sums['is_mix_breed'].to_numpy(),
+    }, index=pd.Index(cluster_sums['cluster'], name='cluster'))
 
     # Converter o dataframe para um formato longo para facilitar o uso com Plotly
     breed_data_melted = breed_data.reset_index().melt(id_vars='cluster', 
@@ -435,9 +389,12 @@ def main():
                                     labels={'cluster': 'Cluster', 'Quantidade': 'Quantidade'},
                                     title='Distribuição de Raça Pura ou Misturada por Cluster')
 
-    st.plotly_chart(fig_stacked_bar_breeds)
+    with spans.span('plotly_chart'):
+        st.plotly_chart(fig_stacked_bar_breeds)
 
 if __name__ == "__main__":
+    spans.page_start('clusterizacao')
     main()
+    spans.page_end()
 
 
@@ -1,18 +1,16 @@
 import streamlit as st
 import pandas as pd
-from utils.data_utils import read_df
+from utils import spans
+from utils.data_utils import read_columns
 
 st.set_page_config(page_title="Visualizar Colunas dos Datasets", layout="wide")
 
 def main():
     st.title("Visualização de Colunas dos Datasets")
 
-    # Carregar os dados normalizados e padronizados
+    # Ler apenas o esquema (rodapé do Parquet) dos datasets normalizado e padronizado
     normalized_data_name = 'normalized_ACC_INTAKES_OUTCOMES'
     scaled_data_name = 'scaled_ACC_INTAKES_OUTCOMES'
-    
-    data_normalized = read_df(normalized_data_name, extension='parquet')
-    data_scaled = read_df(scaled_data_name, extension='parquet')
 
     # Dropdown para selecionar qual dataset visualizar
     dataset_option = st.selectbox('Selecione o dataset para visualizar as colunas:',
@@ -20,10 +18,12 @@ def main():
 
     if dataset_option == 'Dataset Padronizado':
         st.write(f"**Colunas do Dataset Padronizado ({scaled_data_name}):**")
-        st.write(data_scaled.columns.tolist())
+        st.write(read_columns(scaled_data_name))
     else:
         st.write(f"**Colunas do Dataset Normalizado ({normalized_data_name}):**")
-        st.write(data_normalized.columns.tolist())
+        st.write(read_columns(normalized_data_name))
 
 if __name__ == "__main__":
+    spans.page_start('colunas')
     main()
+    spans.page_end()
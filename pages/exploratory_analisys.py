@@ -1,7 +1,11 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from utils.data_utils import read_df
+from utils import spans
+from utils.eda import intake_conditions, outcome_sex_distribution, population_pyramid
+from utils.timeseries import MONTHS, monthly_index, year_row
+
+spans.page_start('exploratory_analisys')
 
 st.write('<h1>Análises Explorátorias</h1>', unsafe_allow_html=True)
 
@@ -17,30 +21,8 @@ if age_group_column == "Grupo de idade no momento de entrada":
 else:
     age_group_col = 'age_upon_outcome_age_group'
 
-df = read_df('ACC_INTAKES_OUTCOMES')
-
-df_pyramid = df[['sex_upon_intake', age_group_col]].copy()
-df_pyramid['sex_upon_intake'] = df_pyramid['sex_upon_intake'].apply(lambda x: 'Fêmea' if 'female' in x.lower() else ('Macho' if 'male' in x.lower() else 'Desconhecido'))
-df_pyramid = df_pyramid[df_pyramid['sex_upon_intake'].isin(['Fêmea', 'Macho', 'Desconhecido'])]
-
-
-age_group_order = [
-    '(-0.025, 2.5',
-    '(2.5, 5.0]  ',
-    '(5.0, 7.5]  ',
-    '(7.5, 10.0] ',
-    '(10.0, 12.5]',
-    '(12.5, 15.0]',
-    '(15.0, 17.5]',
-    '(17.5, 20.0]',
-    '(20.0, 22.5]',
-    '(22.5, 25.0]'
-]
-
-df_pyramid[age_group_col] = pd.Categorical(df_pyramid[age_group_col], categories=age_group_order, ordered=True)
-
-
-df_pyramid_grouped = df_pyramid.groupby([age_group_col, 'sex_upon_intake'], observed=False).size().reset_index(name='count')
+# Contagens por faixa etária e gênero, a partir do cubo de contagens (as mesmas do grafico1)
+df_pyramid_grouped = population_pyramid('ACC_INTAKES_OUTCOMES', age_group_col)
 
 
 df_pyramid_grouped = df_pyramid_grouped.pivot(index=age_group_col, columns='sex_upon_intake', values='count').fillna(0)
@@ -60,37 +42,12 @@ fig = px.bar(df_pyramid_grouped,
 fig.update_layout(barmode='overlay')
 
 
-st.plotly_chart(fig)
+with spans.span('plotly_chart'):
+    st.plotly_chart(fig)
 st.write('----')
 
 
-df_bubble = df[['sex_upon_outcome', 'animal_type', 'outcome_type']].copy()
-
-
-df_bubble['sex_upon_outcome'] = df_bubble['sex_upon_outcome'].apply(
-    lambda x: 'Fêmea' if 'female' in x.lower() else ('Macho' if 'male' in x.lower() else 'Desconhecido')
-)
-
-
-df_bubble['animal_type'] = df_bubble['animal_type'].replace({
-    'Bir': 'Pássaro',
-    'Cat': 'Gato',
-    'Dog': 'Cachorro',
-    'Oth': 'Outros'
-})
-
-
-df_bubble['outcome_type'] = df_bubble['outcome_type'].replace({
-    'Adoption       ': 'Adoção',
-    'Died           ': 'Morto',
-    'Euthanasia     ': 'Eutanásia',
-    'Missing        ': 'Desaparecido',
-    'Return to Owner': 'Devolvido ao tutor(a)',
-    'Transfer       ': 'Transferido'
-})
-
-
-df_bubble_grouped = df_bubble.groupby(['outcome_type', 'sex_upon_outcome', 'animal_type']).size().reset_index(name='count')
+df_bubble_grouped = outcome_sex_distribution('ACC_INTAKES_OUTCOMES')
 
 
 fig_bubble = px.scatter(df_bubble_grouped,
@@ -115,34 +72,13 @@ fig_bubble.update_layout(
 )
 
 # Exibir o gráfico de bolhas 
-st.plotly_chart(fig_bubble)
+with spans.span('plotly_chart'):
+    st.plotly_chart(fig_bubble)
 
 st.write('----')
 
-df_bar = df[['animal_type', 'intake_condition']].copy()
-
-
-df_bar['animal_type'] = df_bar['animal_type'].replace({
-    'Bir': 'Pássaro',
-    'Cat': 'Gato',
-    'Dog': 'Cachorro',
-    'Oth': 'Outros'
-})
-
-
-df_bar['intake_condition'] = df_bar['intake_condition'].replace({
-    'Aged   ': 'Idoso',
-    'Feral  ': 'Feroz',
-    'Injured': 'Machucado',
-    'Normal ': 'Normal',
-    'Nursing': 'Amamentando',
-    'Other  ': 'Outros',
-    'Pregnan': 'Grávida',
-    'Sick   ': 'Doente'
-})
-
-
-df_bar_grouped = df_bar.groupby(['animal_type', 'intake_condition']).size().reset_index(name='count')
+# Contagens por tipo de animal e condição de entrada (as mesmas do grafico3)
+df_bar_grouped = intake_conditions('ACC_INTAKES_OUTCOMES')
 
 
 fig_bar = px.bar(df_bar_grouped,
@@ -169,39 +105,38 @@ fig_bar.update_layout(
 )
 
 
-st.plotly_chart(fig_bar)
+with spans.span('plotly_chart'):
+    st.plotly_chart(fig_bar)
 
 st.write('----')
 
-selected_year = st.slider(
-    "Selecione o ano para iteragir com o gráfico abaixo",
-    min_value=2013,
-    max_value=2018,
-    value=2013
-)
-
-df_rose = df[df['intake_year'] == selected_year][['outcome_month', 'intake_month']].copy()
-
-month_map = {
-    1: 'Jan', 2: 'Fev', 3: 'Mar', 4: 'Abr', 5: 'Mai', 6: 'Jun',
-    7: 'Jul', 8: 'Ago', 9: 'Set', 10: 'Out', 11: 'Nov', 12: 'Dez'
-}
-df_rose['outcome_month'] = df_rose['outcome_month'].map(month_map)
-df_rose['intake_month'] = df_rose['intake_month'].map(month_map)
-
-df_rose_grouped = df_rose.melt(var_name='Movimentação', value_name='Month')
-
-df_rose_grouped['Movimentação'] = df_rose_grouped['Movimentação'].replace({
-    'intake_month': 'Entrada',
-    'outcome_month': 'Saída'
-})
+index = monthly_index('ACC_INTAKES_OUTCOMES')
+years = index['years'].tolist()
+
+# Ano inicial: 2013, se estiver nos dados (outros datasets podem não ter esse ano); o slider exige dois anos ou mais
+if len(years) > 1:
+    selected_year = st.slider(
+        "Selecione o ano para iteragir com o gráfico abaixo",
+        min_value=years[0],
+        max_value=years[-1],
+        value=2013 if 2013 in years else years[-1]
+    )
+else:
+    selected_year = years[0]
 
-df_rose_grouped = df_rose_grouped.groupby(['Movimentação', 'Month']).size().reset_index(name='count')
+# Entradas e saídas (dos animais que entraram no ano) por mês, a partir do índice mensal
+df_rose_grouped = pd.concat([
+    pd.DataFrame({'Movimentação': 'Entrada', 'Month': MONTHS,
+                  'count': index['intakes'][year_row(index, selected_year)]}),
+    pd.DataFrame({'Movimentação': 'Saída', 'Month': MONTHS,
+                  'count': index['outcomes_by_intake_year'][year_row(index, selected_year)]}),
+], ignore_index=True)
+df_rose_grouped = df_rose_grouped[df_rose_grouped['count'] > 0]
 
 fig_rose = px.bar_polar(df_rose_grouped, r='count', theta='Month', color='Movimentação',
                         title=f'Entradas e Saídas por Mês no Ano {selected_year}',
                         color_discrete_map={'Entrada': 'lightblue', 'Saída': 'lightpink'},
-                        category_orders={'Month': ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']})
+                        category_orders={'Month': MONTHS})
 
 fig_rose.update_layout(
     polar=dict(radialaxis=dict(visible=True)),
@@ -209,4 +144,7 @@ fig_rose.update_layout(
 )
 
 # Exibir o gráfico Nightingale Rose Chart
-st.plotly_chart(fig_rose)
+with spans.span('plotly_chart'):
+    st.plotly_chart(fig_rose)
+
+spans.page_end()
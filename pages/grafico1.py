@@ -1,12 +1,12 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from utils.data_utils import read_df
+from utils import spans
+from utils.eda import population_pyramid
 
-st.write('<h1>Distribuição populacional por Idade e Gênero</h1>', unsafe_allow_html=True)
+spans.page_start('grafico1')
 
-# Carregar dataset
-df = read_df('ACC_INTAKES_OUTCOMES')
+st.write('<h1>Distribuição populacional por Idade e Gênero</h1>', unsafe_allow_html=True)
 
 age_group_column = st.selectbox(
     "Escolha o grupo de idades para exibição:",
@@ -18,37 +18,8 @@ if age_group_column == "Grupo de idade no momento de entrada":
 else:
     age_group_col = 'age_upon_outcome_age_group'
 
-df_pyramid = df[['sex_upon_intake', age_group_col]].copy()
-df_pyramid['sex_upon_intake'] = df_pyramid['sex_upon_intake'].apply(
-    lambda x: 'Fêmea' if 'female' in x.lower() else ('Macho' if 'male' in x.lower() else 'Desconhecido')
-)
-df_pyramid = df_pyramid[df_pyramid['sex_upon_intake'].isin(['Fêmea', 'Macho', 'Desconhecido'])]
-
-age_group_order = [
-    '(-0.025, 2.5', '(2.5, 5.0]  ', '(5.0, 7.5]  ', '(7.5, 10.0] ', '(10.0, 12.5]',
-    '(12.5, 15.0]', '(15.0, 17.5]', '(17.5, 20.0]', '(20.0, 22.5]', '(22.5, 25.0]'
-]
-
-# Mapeamento dos rótulos para exibição no gráfico
-age_group_labels = {
-    '(-0.025, 2.5': '0 - 2.5',
-    '(2.5, 5.0]  ': '2.5 - 5.0',
-    '(5.0, 7.5]  ': '5.0 - 7.5',
-    '(7.5, 10.0] ': '7.5 - 10.0',
-    '(10.0, 12.5]': '10.0 - 12.5',
-    '(12.5, 15.0]': '12.5 - 15.0',
-    '(15.0, 17.5]': '15.0 - 17.5',
-    '(17.5, 20.0]': '17.5 - 20.0',
-    '(20.0, 22.5]': '20.0 - 22.5',
-    '(22.5, 25.0]': '22.5 - 25.0'
-}
-
-df_pyramid[age_group_col] = pd.Categorical(df_pyramid[age_group_col], categories=age_group_order, ordered=True)
-
-df_pyramid_grouped = df_pyramid.groupby([age_group_col, 'sex_upon_intake'], observed=False).size().reset_index(name='count')
-
-# Substituir os rótulos no DataFrame para exibição correta no gráfico
-df_pyramid_grouped[age_group_col] = df_pyramid_grouped[age_group_col].replace(age_group_labels)
+# Contagens por faixa etária e gênero, a partir do cubo de contagens
+df_pyramid_grouped = population_pyramid('ACC_INTAKES_OUTCOMES', age_group_col)
 
 # Dropdown para selecionar o gênero
 selected_gender = st.selectbox(
@@ -71,4 +42,7 @@ fig = px.bar(df_pyramid_grouped,
 
 fig.update_layout(barmode='group', xaxis_title="Faixa Etária", yaxis_title="Contagem", legend_title="Gênero")
 
-st.plotly_chart(fig)
+with spans.span('plotly_chart'):
+    st.plotly_chart(fig)
+
+spans.page_end()
@@ -1,25 +1,12 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from utils.data_utils import read_df
+from utils import spans
+from utils.eda import type_distribution
 
-st.write('<h1>Distribuição por Tipo de Entrada/Saída e Tipo de Animal</h1>', unsafe_allow_html=True)
-
-# Carregar dataset
-df = read_df('ACC_INTAKES_OUTCOMES')
+spans.page_start('grafico2')
 
-# Modificar valores para exibição mais amigável
-df['animal_type'] = df['animal_type'].replace({
-    'Bir': 'Pássaro', 'Cat': 'Gato', 'Dog': 'Cachorro', 'Oth': 'Outros'
-})
-df['outcome_type'] = df['outcome_type'].replace({
-    'Adoption       ': 'Adoção', 'Died           ': 'Morto', 'Euthanasia     ': 'Eutanásia',
-    'Missing        ': 'Desaparecido', 'Return to Owner': 'Devolvido ao tutor(a)', 'Transfer       ': 'Transferido'
-})
-df['intake_type'] = df['intake_type'].replace({
-    'Euthanasia Request': 'Pedido de Eutanásia', 'Owner Surrender   ': 'Entrega Voluntária',
-    'Public Assist     ': 'Assistência Pública', 'Stray             ': 'Animal de Rua', 'Wildlife          ': 'Vida Selvagem'
-})
+st.write('<h1>Distribuição por Tipo de Entrada/Saída e Tipo de Animal</h1>', unsafe_allow_html=True)
 
 # Dropdown para escolher exibição por tipo de entrada ou saída
 option = st.selectbox(
@@ -35,14 +22,15 @@ animal_filter = st.selectbox(
 
 # Condicional para ajustar o agrupamento com base na escolha
 if option == 'Tipo de Saída':
-    df_grouped = df.groupby(['outcome_type', 'animal_type']).size().reset_index(name='count')
     x_axis = 'outcome_type'
     x_title = 'Tipo de Saída'
 else:
-    df_grouped = df.groupby(['intake_type', 'animal_type']).size().reset_index(name='count')
     x_axis = 'intake_type'
     x_title = 'Tipo de Entrada'
 
+# Contagens com rótulos de exibição, a partir do cubo de contagens
+df_grouped = type_distribution('ACC_INTAKES_OUTCOMES', x_axis)
+
 # Aplicar filtro de tipo de animal, se selecionado
 if animal_filter != 'Todos':
     df_grouped = df_grouped[df_grouped['animal_type'] == animal_filter]
@@ -67,4 +55,7 @@ fig_bar.update_layout(
 )
 
 # Exibir gráfico
-st.plotly_chart(fig_bar)
+with spans.span('plotly_chart'):
+    st.plotly_chart(fig_bar)
+
+spans.page_end()
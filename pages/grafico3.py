@@ -1,22 +1,15 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from utils.data_utils import read_df
+from utils import spans
+from utils.eda import intake_conditions
 
-st.write('<h1>Distribuição de Condições de Entrada por Tipo de Animal</h1>', unsafe_allow_html=True)
+spans.page_start('grafico3')
 
-# Carregar dataset
-df = read_df('ACC_INTAKES_OUTCOMES')
+st.write('<h1>Distribuição de Condições de Entrada por Tipo de Animal</h1>', unsafe_allow_html=True)
 
-df_bar = df[['animal_type', 'intake_condition']].copy()
-df_bar['animal_type'] = df_bar['animal_type'].replace({
-    'Bir': 'Pássaro', 'Cat': 'Gato', 'Dog': 'Cachorro', 'Oth': 'Outros'
-})
-df_bar['intake_condition'] = df_bar['intake_condition'].replace({
-    'Aged   ': 'Idoso', 'Feral  ': 'Feroz', 'Injured': 'Machucado', 'Normal ': 'Normal',
-    'Nursing': 'Amamentando', 'Other  ': 'Outros', 'Pregnan': 'Grávida', 'Sick   ': 'Doente'
-})
-df_bar_grouped = df_bar.groupby(['animal_type', 'intake_condition']).size().reset_index(name='count')
+# Contagens por tipo de animal e condição de entrada, a partir do cubo de contagens
+df_bar_grouped = intake_conditions('ACC_INTAKES_OUTCOMES')
 
 fig_bar = px.bar(df_bar_grouped,
                  x='animal_type',
@@ -32,4 +25,7 @@ fig_bar.update_layout(
     xaxis=dict(title='Tipo de Animal'),
     yaxis=dict(title='Contagem')
 )
-st.plotly_chart(fig_bar)
+with spans.span('plotly_chart'):
+    st.plotly_chart(fig_bar)
+
+spans.page_end()
@@ -1,63 +1,60 @@
 import streamlit as st
-import pandas as pd
+import plotly.express as px
 import plotly.graph_objects as go
-from utils.data_utils import read_df
+from utils import spans
+from utils.eda import monthly_series
+from utils.timeseries import MONTHS, monthly_index
+
+spans.page_start('grafico4')
 
 st.write('<h1>Entradas e Saídas por de acordo com os meses do ano</h1>', unsafe_allow_html=True)
 
-# Carregar dataset
-df = read_df('ACC_INTAKES_OUTCOMES')
+# Carregar o índice mensal (matrizes ano x mês pré-calculadas)
+index = monthly_index('ACC_INTAKES_OUTCOMES')
+years = index['years'].tolist()
 
 # Seleção de anos múltiplos
 selected_years = st.multiselect(
     "Selecione os anos para exibir no gráfico",
-    options=df['intake_year'].unique(),
-    default=[2013]
+    options=years,
+    default=[2013] if 2013 in years else years[:1]
 )
 
-# Mapeamento de meses
-month_map = {
-    1: 'Jan', 2: 'Fev', 3: 'Mar', 4: 'Abr', 5: 'Mai', 6: 'Jun',
-    7: 'Jul', 8: 'Ago', 9: 'Set', 10: 'Out', 11: 'Nov', 12: 'Dez'
-}
-
-# Cartela de cores para cada ano
-color_map = {
-    2013: {'entrada': 'blue', 'saida': 'red'},
-    2014: {'entrada': 'green', 'saida': 'orange'},
-    2015: {'entrada': 'purple', 'saida': 'pink'},
-    2016: {'entrada': 'cyan', 'saida': 'magenta'},
-    2017: {'entrada': 'yellow', 'saida': 'brown'},
-    2018: {'entrada': 'teal', 'saida': 'gold'}
-}
-
-# Processamento dos dados
-df_radar = df[df['intake_year'].isin(selected_years)][['intake_year', 'outcome_month', 'intake_month']].copy()
-df_radar['outcome_month'] = df_radar['outcome_month'].map(month_map)
-df_radar['intake_month'] = df_radar['intake_month'].map(month_map)
+# Referência das saídas: ano de entrada do animal (comportamento original) ou ano em que a saída ocorreu
+outcome_reference = st.radio(
+    "Contar as saídas pelo:",
+    ['Ano de entrada do animal', 'Ano da saída'],
+    horizontal=True
+)
+outcomes_key = 'outcomes_by_intake_year' if outcome_reference == 'Ano de entrada do animal' else 'outcomes'
 
-# Agrupamento dos dados
-df_radar_grouped = df_radar.groupby(['intake_year', 'intake_month', 'outcome_month']).size().reset_index(name='count')
+# Cartela de cores para cada ano (pares entrada/saída, repetidos ciclicamente para anos novos)
+color_pairs = [
+    ('blue', 'red'), ('green', 'orange'), ('purple', 'pink'),
+    ('cyan', 'magenta'), ('yellow', 'brown'), ('teal', 'gold')
+]
+palette = px.colors.qualitative.Dark24
+color_map = {}
+for i, year in enumerate(years):
+    if i < len(color_pairs):
+        entrada, saida = color_pairs[i]
+    else:
+        entrada, saida = palette[(2 * i) % len(palette)], palette[(2 * i + 1) % len(palette)]
+    color_map[year] = {'entrada': entrada, 'saida': saida}
 
 # Preparação do gráfico radar
-categories = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+categories = MONTHS
 
 fig_radar = go.Figure()
 
 # Variável para armazenar o valor máximo para definir o range adequado
 max_value = 0
 
-for year in selected_years:
-    # Filtrar os dados para o ano
-    df_year = df_radar_grouped[df_radar_grouped['intake_year'] == year]
-    
-    # Somar entradas e saídas por mês
-    entradas = [df_year[df_year['intake_month'] == month]['count'].sum() for month in categories]
-    saidas = [df_year[df_year['outcome_month'] == month]['count'].sum() for month in categories]
-    
+# Entradas e saídas por mês do ano: uma linha de cada matriz
+for year, entradas, saidas in monthly_series(index, selected_years, outcomes_key):
     # Encontrar o valor máximo para ajustar o range do gráfico
     max_value = max(max_value, max(entradas + saidas))
-    
+
     # Adicionar a linha de Entrada ao gráfico com a cor associada ao ano
     fig_radar.add_trace(go.Scatterpolar(
         r=entradas,
@@ -65,7 +62,7 @@ for year in selected_years:
         name=f'Entradas {year}',
         line=dict(color=color_map[year]['entrada'])
     ))
-    
+
     # Adicionar a linha de Saída ao gráfico com a cor associada ao ano
     fig_radar.add_trace(go.Scatterpolar(
         r=saidas,
@@ -84,4 +81,7 @@ fig_radar.update_layout(
 )
 
 # Exibir gráfico
-st.plotly_chart(fig_radar)
+with spans.span('plotly_chart'):
+    st.plotly_chart(fig_radar)
+
+spans.page_end()
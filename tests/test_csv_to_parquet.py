@@ -0,0 +1,61 @@
+import io
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from utils.csv_to_parquet import DICTIONARY_TYPE, csv_to_parquet, print_report, sniff_csv
+
+HEADER = 'animal_id_intake;animal_type;intake_datetime;intake_year;age_upon_intake_(years)'
+ROWS = [
+    'A5;Dog  ;03/02/2014 10:00;2014;1.5',
+    'A1;Cat;15/01/2013 08:30;2013;0.5',
+    'A9;Dog;20/05/2015 09:00;dois mil;3.0',         # ano inválido
+    'A4;Bird;2014-02-01 12:00;2014;2.0',             # data em ISO 8601
+    'A7;Cat;;2016;4.0',                              # sem data: vai para o fim
+    'A8;Dog;01/01/2013 00:00;2013',                  # coluna faltando
+    'A2;Other;15/01/2013 07:00;2013;',               # idade vazia: valor ausente
+    'A3;Dog;10/12/2013 18:45;2013;1.0;extra',        # coluna sobrando
+    'A6;Cat  ;03/02/2014 09:59;2014;0.25',
+]
+
+@pytest.mark.parametrize('block_size', [128, 16 * 1024 * 1024])
+def test_ingest_semicolon_csv_with_bad_rows(tmp_path, block_size):
+    csv_path = tmp_path / 'entradas.csv'
+    csv_path.write_text('\n'.join([HEADER] + ROWS) + '\n', encoding='utf-8')
+    parquet_path = tmp_path / 'entradas.parquet'
+    assert sniff_csv(str(csv_path))[0] == ';'
+
+    report = csv_to_parquet(str(csv_path), str(parquet_path), block_size=block_size, row_group_size=2)
+
+    assert report['rows_read'] == 9
+    assert report['rows_written'] == 6
+    assert report['rejected'] == {
+        'esperadas 5 colunas, encontradas 4': 1,
+        'esperadas 5 colunas, encontradas 6': 1,
+        "valor inválido em 'intake_year'": 1,
+    }
+    assert report['examples']["valor inválido em 'intake_year'"] == [(None, 'dois mil')]
+    assert [text for _, text in report['examples']['esperadas 5 colunas, encontradas 4']] == [ROWS[5]]
+
+    # Ordenado por intake_datetime, com as linhas sem data no fim; row groups de 2 linhas
+    assert pq.ParquetFile(parquet_path).metadata.num_row_groups == 3
+    df = pd.read_parquet(parquet_path)
+    assert df['animal_id_intake'].tolist() == ['A2', 'A1', 'A4', 'A6', 'A5', 'A7']
+    assert df['intake_year'].tolist() == [2013, 2013, 2014, 2014, 2014, 2016]
+    assert pd.isna(df['age_upon_intake_(years)'].iloc[0])
+
+    # Coluna categórica gravada como dicionário, sem os espaços de preenchimento
+    assert pq.read_schema(parquet_path).field('animal_type').type == DICTIONARY_TYPE
+    assert sorted(df['animal_type'].cat.categories) == ['Bird', 'Cat', 'Dog', 'Other']
+
+    assert not [p.name for p in tmp_path.iterdir() if p.name.startswith('.')]
+
+def test_print_report(tmp_path):
+    csv_path = tmp_path / 'entradas.csv'
+    csv_path.write_text('\n'.join([HEADER] + ROWS) + '\n', encoding='utf-8')
+    out = io.StringIO()
+    print_report(csv_to_parquet(str(csv_path), str(tmp_path / 'entradas.parquet')), file=out)
+    out = out.getvalue()
+    assert 'Linhas lidas: 9' in out
+    assert 'Linhas rejeitadas: 3' in out
+    assert f'linha 7: {ROWS[5]}' in out
+    assert 'valor: dois mil' in out
@@ -0,0 +1,103 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from utils import data_utils
+from utils.data_utils import cache_info, cached, clear_cache, set_cache_budget
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    budget = data_utils.CACHE_MAX_BYTES
+    clear_cache()
+    yield
+    set_cache_budget(budget)
+    clear_cache()
+
+def write_frame(path, value):
+    frame = pd.DataFrame({'x': np.full(1000, value, dtype='float64')})
+    frame.to_parquet(path)
+    return str(path)
+
+def counting_loader(path, calls):
+    def loader():
+        calls.append(path)
+        return pd.read_parquet(path)
+    return loader
+
+def test_lru_eviction(tmp_path):
+    paths = [write_frame(tmp_path / f'{i}.parquet', i) for i in range(3)]
+    calls = []
+    nbytes = data_utils._nbytes(pd.read_parquet(paths[0]))
+    # Cabem duas entradas
+    set_cache_budget(2 * nbytes)
+    cached(paths[0], counting_loader(paths[0], calls))
+    cached(paths[1], counting_loader(paths[1], calls))
+    # Usa a primeira de novo: a segunda passa a ser a usada há mais tempo
+    cached(paths[0], counting_loader(paths[0], calls))
+    cached(paths[2], counting_loader(paths[2], calls))
+    assert cache_info()['entries'] == 2
+    assert cache_info()['bytes'] <= 2 * nbytes
+
+    cached(paths[0], counting_loader(paths[0], calls))
+    cached(paths[1], counting_loader(paths[1], calls))
+    assert calls == [paths[0], paths[1], paths[2], paths[1]]
+
+def test_entry_larger_than_budget_is_not_kept(tmp_path):
+    path = write_frame(tmp_path / 'big.parquet', 1)
+    set_cache_budget(10)
+    assert cached(path, lambda: pd.read_parquet(path))['x'].iloc[0] == 1
+    assert cache_info() == {'entries': 0, 'bytes': 0, 'max_bytes': 10}
+
+def test_rewritten_file_is_reloaded(tmp_path):
+    path = write_frame(tmp_path / 'data.parquet', 1)
+    calls = []
+    assert cached(path, counting_loader(path, calls))['x'].iloc[0] == 1
+    assert cached(path, counting_loader(path, calls))['x'].iloc[0] == 1
+    assert len(calls) == 1
+
+    # Mesmo tamanho, mtime diferente
+    write_frame(path, 2)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert cached(path, counting_loader(path, calls))['x'].iloc[0] == 2
+    # A versão antiga sai do cache
+    assert cache_info()['entries'] == 1
+
+    # Tamanho diferente, mesmo mtime
+    mtime = os.stat(path).st_mtime_ns
+    pd.DataFrame({'x': np.arange(2000.0)}).to_parquet(path)
+    os.utime(path, ns=(mtime, mtime))
+    assert len(cached(path, counting_loader(path, calls))) == 2000
+    assert len(calls) == 3
+
+def test_variants_are_cached_separately(tmp_path):
+    path = write_frame(tmp_path / 'data.parquet', 1)
+    assert cached(path, lambda: 'a', 'a') == 'a'
+    assert cached(path, lambda: 'b', 'b') == 'b'
+    assert cached(path, lambda: 'outro', 'a') == 'a'
+
+def test_cached_frames_are_read_only(tmp_path):
+    path = str(tmp_path / 'data.parquet')
+    pd.DataFrame({
+        'x': np.arange(5.0),
+        'n': np.arange(5),
+        'c': pd.Categorical(list('abcab')),
+        's': list('vwxyz'),
+    }).to_parquet(path)
+    frame = cached(path, lambda: pd.read_parquet(path))
+
+    with pytest.raises(ValueError, match='read-only'):
+        frame.loc[0, 'x'] = 10.0
+    with pytest.raises(ValueError, match='read-only'):
+        frame.iloc[0, 1] = 10
+    with pytest.raises(ValueError, match='read-only'):
+        frame['x'].to_numpy()[0] = 10.0
+    with pytest.raises(ValueError, match='read-only'):
+        frame['c'].array.codes[0] = 1
+    assert cached(path, lambda: None)['x'].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+    # Cópias e operações que criam novas colunas continuam livres
+    copy = frame.copy()
+    copy.loc[0, 'x'] = 10.0
+    assert copy['x'].iloc[0] == 10.0
+    assert frame.assign(x=frame['x'] + 1)['x'].iloc[0] == 1.0
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+from utils.distributions import GRID_POINTS, kde, summarize_by_group
+
+@pytest.mark.parametrize('values', [[0.0], [0.0, 1.0], [0.0, 1.0, 5.0], [3.0, 3.0, 3.0, 3.0]])
+def test_kde_small_groups(values):
+    grid, density = kde(np.array(values))
+    assert len(grid) == len(density) == GRID_POINTS
+    assert np.all(np.isfinite(density)) and np.all(density >= 0)
+    # Grade limitada a 2 larguras de banda além dos extremos: quase toda a massa fica dentro dela
+    assert 0.9 < np.trapz(density, grid) <= 1.0
+
+def test_kde_matches_gaussian_kde():
+    values = np.random.default_rng(0).normal(size=5000)
+    grid, density = kde(values)
+    bandwidth = grid[-1] - values.max()  # 2 larguras de banda
+    exact = np.exp(-0.5 * ((grid[:, None] - values) / (bandwidth / 2)) ** 2).sum(axis=1)
+    exact /= len(values) * (bandwidth / 2) * np.sqrt(2 * np.pi)
+    assert np.abs(density - exact).max() < 0.01
+
+def test_summarize_clusters_with_few_points():
+    values = np.array([0.0, 1.0, 2.0, 2.0, 2.0, 7.0])
+    groups = np.array([0, 0, 1, 1, 1, 2])
+    summaries = summarize_by_group(values, groups, 3)
+    assert [summary['box']['count'] for summary in summaries] == [2, 3, 1]
+    assert all(len(summary['kde'][0]) == GRID_POINTS for summary in summaries)
@@ -0,0 +1,85 @@
+import json
+import os
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from utils import features
+from utils.data_utils import dataset_path
+from utils.features import OUTPUTS, SOURCE, STATE_PATH
+
+SAMPLE_ROWS = 3000
+NEW_ROWS = 200
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # Dataset de origem pequeno, com os derivados construídos a partir dele; as novas linhas vêm do fim do original
+    source = pd.read_parquet(dataset_path(SOURCE))
+    os.makedirs(tmp_path / 'data')
+    source.head(SAMPLE_ROWS).to_parquet(tmp_path / 'data' / f'{SOURCE}.parquet', index=False)
+    source.tail(NEW_ROWS).to_parquet(tmp_path / 'novas.parquet', index=False)
+    monkeypatch.chdir(tmp_path)
+    features.build()
+    return tmp_path
+
+def num_rows(name):
+    return pq.ParquetFile(dataset_path(name)).metadata.num_rows
+
+def files():
+    names = [SOURCE, *OUTPUTS.values()]
+    return {name: open(dataset_path(name), 'rb').read() for name in names}, open(STATE_PATH, 'rb').read()
+
+def test_append_records_row_counts(workdir):
+    state = features.load_state()
+    assert state['rows'] == {name: num_rows(name) for name in [SOURCE, *OUTPUTS.values()]}
+
+    added, kept = features.append('novas.parquet')
+    state = features.load_state()
+    assert added == NEW_ROWS
+    assert state['next_index'] == SAMPLE_ROWS + NEW_ROWS
+    assert state['rows'][SOURCE] == num_rows(SOURCE) == SAMPLE_ROWS + NEW_ROWS
+    for name in OUTPUTS.values():
+        assert state['rows'][name] == num_rows(name)
+    assert not [name for name in os.listdir('data') if name.endswith('.tmp')]
+
+def test_failed_append_changes_nothing(workdir, monkeypatch):
+    before = files()
+    write = features._append
+    calls = []
+
+    def failing(path, df, tmp_path):
+        # Falha na gravação do terceiro arquivo, depois de dois já gravados nos temporários
+        calls.append(path)
+        if len(calls) == 3:
+            raise OSError('disco cheio')
+        write(path, df, tmp_path)
+
+    monkeypatch.setattr(features, '_append', failing)
+    with pytest.raises(OSError):
+        features.append('novas.parquet')
+    assert files() == before
+    assert not [name for name in os.listdir('data') if name.endswith('.tmp')]
+
+def test_append_rebuilds_after_interrupted_write(workdir, capsys):
+    # Origem e derivados gravados, mas o estado não (interrupção antes da renomeação do estado)
+    stale = open(STATE_PATH, encoding='utf-8').read()
+    features.append('novas.parquet')
+    with open(STATE_PATH, 'w', encoding='utf-8') as f:
+        f.write(stale)
+
+    features.append('novas.parquet')
+    assert 'reconstruindo' in capsys.readouterr().out
+    state = features.load_state()
+    assert state['rows'][SOURCE] == num_rows(SOURCE) == SAMPLE_ROWS + 2 * NEW_ROWS
+    for name in OUTPUTS.values():
+        assert state['rows'][name] == num_rows(name)
+    # Os derivados são consistentes com a origem: o índice continua a partir das linhas existentes
+    assert state['next_index'] == SAMPLE_ROWS + 2 * NEW_ROWS
+
+def test_state_without_row_counts_is_not_checked(workdir):
+    state = features.load_state()
+    del state['rows']
+    with open(STATE_PATH, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    assert features._mismatched(features.load_state(), SOURCE) == []
+    features.append('novas.parquet')
+    assert features.load_state()['rows'][SOURCE] == SAMPLE_ROWS + NEW_ROWS
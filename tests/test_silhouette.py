@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from sklearn.datasets import make_blobs
+from sklearn.metrics import silhouette_samples, silhouette_score
+from utils.silhouette import silhouette_estimate, silhouette_exact, silhouette_values
+
+def blobs(n, centers=4, seed=0):
+    return make_blobs(n_samples=n, centers=centers, n_features=3, cluster_std=2.0, random_state=seed)
+
+@pytest.mark.parametrize('rows_per_chunk', [None, 1, 7])
+def test_values_match_sklearn(rows_per_chunk):
+    X, labels = blobs(300)
+    # Um cluster com um único ponto (silhueta 0) e rótulos não contíguos
+    labels = np.where(labels == 3, 10, labels)
+    labels[0] = 5
+    chunk_bytes = 8 * len(X) * rows_per_chunk if rows_per_chunk else 64 * 1024 * 1024
+    values = silhouette_values(X, labels, chunk_bytes=chunk_bytes)
+    np.testing.assert_allclose(values, silhouette_samples(X, labels), atol=1e-12)
+    assert values[0] == 0
+
+def test_values_of_selected_rows():
+    X, labels = blobs(200)
+    rows = np.array([5, 150, 0, 199])
+    values = silhouette_values(X, labels, rows=rows, chunk_bytes=8 * len(X) * 3)
+    np.testing.assert_allclose(values, silhouette_samples(X, labels)[rows], atol=1e-12)
+
+def test_exact_matches_sklearn_score():
+    X, labels = blobs(500)
+    labels = np.array(['a', 'b', 'c', 'd'])[labels]
+    result = silhouette_exact(X, labels, chunk_bytes=8 * len(X) * 16)
+    assert result['average'] == pytest.approx(silhouette_score(X, labels), abs=1e-12)
+    assert result['evaluated'] == 500
+    assert list(result['clusters']) == ['a', 'b', 'c', 'd']
+    assert result['sizes'].sum() == 500
+    assert sum(len(v) for v in result['values']) == 500
+
+def test_estimate_interval_covers_exact():
+    X, labels = blobs(4000, centers=5)
+    exact = silhouette_score(X, labels)
+    result = silhouette_estimate(X, labels, sample_size=400, chunk_bytes=8 * len(X) * 50, random_state=42)
+    low, high = result['ci']
+    assert low <= exact <= high
+    assert high - low < 0.1
+    assert result['evaluated'] == pytest.approx(400, abs=5)
+
+def test_estimate_of_whole_population_is_exact():
+    # Amostra do tamanho da população: correção para população finita zera a margem
+    X, labels = blobs(300)
+    result = silhouette_estimate(X, labels, sample_size=300)
+    assert result['average'] == pytest.approx(silhouette_score(X, labels), abs=1e-12)
+    assert result['ci'][0] == pytest.approx(result['ci'][1])
@@ -0,0 +1,33 @@
+import os
+import pandas as pd
+import pyarrow.parquet as pq
+from utils import synthetic
+from utils.csv_to_parquet import csv_to_parquet
+from utils.data_utils import dataset_path
+from utils.features import SOURCE
+
+SAMPLE_ROWS = 3000
+
+def test_generate_from_ingested_source(tmp_path, monkeypatch):
+    # Dataset de origem gerado pela própria ingestão (colunas categóricas como dicionários, sem preenchimento)
+    rows = pd.read_parquet(dataset_path(SOURCE)).head(SAMPLE_ROWS)
+    csv_path = tmp_path / 'source.csv'
+    rows.to_csv(csv_path, index=False)
+    os.makedirs(tmp_path / 'data')
+    csv_to_parquet(str(csv_path), str(tmp_path / 'data' / f'{SOURCE}.parquet'))
+
+    monkeypatch.chdir(tmp_path)
+    raw = pd.read_parquet(dataset_path(SOURCE))
+    assert isinstance(raw['animal_type'].dtype, pd.CategoricalDtype)
+
+    model = synthetic.fit(raw)
+    counts = synthetic.write(model, 1000, 'sinteticos', batch_size=400)
+    assert counts == {SOURCE: 1000}
+
+    path = os.path.join('sinteticos', 'data', f'{SOURCE}.parquet')
+    assert pq.read_schema(path).remove_metadata().equals(model['schema'])
+    generated = pd.read_parquet(path)
+    for col in raw.columns:
+        assert str(generated[col].dtype) == str(raw[col].dtype), col
+    assert set(generated['animal_type'].unique()) <= set(raw['animal_type'].cat.categories)
+    assert generated['animal_id_intake'].is_unique
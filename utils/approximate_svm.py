@@ -0,0 +1,30 @@
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.kernel_approximation import Nystroem
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import make_pipeline
+
+# Fica fora de utils/classification.py para que o scikit-learn só seja importado quando este algoritmo for usado
+
+class ApproximateSVC(ClassifierMixin, BaseEstimator):
+    # SVM com kernel RBF aproximado: mapeamento de Nystroem sobre n_components linhas de referência seguido de um
+    # SVM linear (SGD, perda hinge). O custo do treino cresce linearmente com o número de linhas, enquanto o do SVC
+    # exato cresce de forma quadrática a cúbica; mais componentes aproximam melhor o kernel, com treino mais lento
+    def __init__(self, n_components=300, random_state=None):
+        self.n_components = n_components
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        # Mesma largura do kernel que o SVC usa por padrão (gamma='scale')
+        variance = X.var()
+        gamma = 1.0 / (X.shape[1] * variance) if variance > 0 else 1.0
+        self.pipeline_ = make_pipeline(
+            Nystroem(gamma=gamma, n_components=min(self.n_components, len(X)), random_state=self.random_state),
+            SGDClassifier(loss='hinge', random_state=self.random_state),
+        ).fit(X, y)
+        self.classes_ = self.pipeline_.classes_
+        return self
+
+    def predict(self, X):
+        return self.pipeline_.predict(np.asarray(X, dtype=np.float64))
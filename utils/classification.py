@@ -0,0 +1,218 @@
+import hashlib
+import importlib
+import json
+import os
+import time
+import joblib
+import pandas as pd
+from utils.data_utils import atomic_write, cache_path, cached, dataset_fingerprint, read_df
+from utils.spans import span, traced
+
+# Treino e avaliação dos modelos de classificação, com cache em disco (joblib) do conjunto balanceado pelo SMOTE,
+# do modelo ajustado e do relatório. As entradas são identificadas pela impressão digital do dataset, pelos grupos
+# de características selecionados e pelo algoritmo com seus parâmetros.
+
+RANDOM_STATE = 42
+TEST_SIZE = 0.3
+
+# Algoritmo: (caminho da classe, parâmetros). As bibliotecas (scikit-learn, XGBoost) só são importadas quando um
+# modelo é de fato treinado: uma página que apenas exibe relatórios do cache não paga o custo da importação
+ALGORITHMS = {
+    'Random Forest': ('sklearn.ensemble.RandomForestClassifier', {'random_state': RANDOM_STATE}),
+    'SVM': ('sklearn.svm.SVC', {'random_state': RANDOM_STATE}),
+    'SVM aproximado (rápido)': ('utils.approximate_svm.ApproximateSVC', {'n_components': 300, 'random_state': RANDOM_STATE}),
+    'SVM aproximado (preciso)': ('utils.approximate_svm.ApproximateSVC', {'n_components': 1000, 'random_state': RANDOM_STATE}),
+    'XGBoost': ('xgboost.XGBClassifier', {'random_state': RANDOM_STATE}),
+}
+
+# Algoritmo exato comparado com cada versão aproximada
+EXACT_ALGORITHMS = {
+    'SVM aproximado (rápido)': 'SVM',
+    'SVM aproximado (preciso)': 'SVM',
+}
+
+# "Missing" e "Return to Owner" são combinados na classe "Outro"
+OTHERS_COLUMNS = ['outcome_type_Missing        ', 'outcome_type_Return to Owner']
+TARGET_COLUMNS = [
+    'outcome_type_Adoption       ',
+    'outcome_type_Euthanasia     ',
+    'outcome_type_Transfer       ',
+    'outcome_type_Others',
+    'outcome_type_Died           ',
+]
+
+# Mapeamento das colunas para labels legíveis
+LABEL_MAPPING = {
+    'outcome_type_Adoption       ': 'Adotado',
+    'outcome_type_Euthanasia     ': 'Eutanásia',
+    'outcome_type_Died           ': 'Morto',
+    'outcome_type_Others': 'Outro',
+    'outcome_type_Transfer       ': 'Transferido',
+}
+
+# Grupos de características da página de classificação: nome exibido -> colunas do dataset padronizado
+FEATURE_GROUPS = {
+    "Ano de nascimento": ["dob_year_scaled"],
+    "Idade no momento de entrada": ["age_upon_intake_(years)_scaled"],
+    "Ano de entrada": ["intake_year_scaled"],
+    "Idade no momento de saída": ["age_upon_outcome_(years)_scaled"],
+    "Ano de saída": ["outcome_year_scaled"],
+    "Dias no abrigo": ["time_in_shelter_days_scaled"],
+    "Sexo do animal na saída": ["sex_upon_outcome_Intact Female", "sex_upon_outcome_Intact Male  ", 
+                                "sex_upon_outcome_Neutered Male", "sex_upon_outcome_Spayed Female", 
+                                "sex_upon_outcome_Unknown      "],
+    "Dia da semana na saída": ["outcome_weekday_Friday   ", "outcome_weekday_Monday   ", 
+                               "outcome_weekday_Saturday ", "outcome_weekday_Sunday   ", 
+                               "outcome_weekday_Thursday ", "outcome_weekday_Tuesday  ", 
+                               "outcome_weekday_Wednesday"],
+    "Tipo de animal": ["animal_type_Bir", "animal_type_Cat", "animal_type_Dog", "animal_type_Oth"],
+    "Condição de saúde no momento da entrada": ["intake_condition_Aged   ", "intake_condition_Feral  ", 
+                                                "intake_condition_Injured", "intake_condition_Normal ", 
+                                                "intake_condition_Nursing", "intake_condition_Other  ", 
+                                                "intake_condition_Pregnan", "intake_condition_Sick   "],
+    "Tipo de entrada do animal": ["intake_type_Euthanasia Request", "intake_type_Owner Surrender   ", 
+                                  "intake_type_Public Assist     ", "intake_type_Stray             ", 
+                                  "intake_type_Wildlife          "],
+    "Sexo do animal na entrada": ["sex_upon_intake_Intact Female", "sex_upon_intake_Intact Male  ", 
+                                  "sex_upon_intake_Neutered Male", "sex_upon_intake_Spayed Female", 
+                                  "sex_upon_intake_Unknown      "],
+    "Dia da semana na entrada": ["intake_weekday_Friday   ", "intake_weekday_Monday   ", 
+                                 "intake_weekday_Saturday ", "intake_weekday_Sunday   ", 
+                                 "intake_weekday_Thursday ", "intake_weekday_Tuesday  ", 
+                                 "intake_weekday_Wednesday"],
+    "Raça Pura/Misturado": ["is_mix_breed"],
+    "Cor": ["color_Black", "color_Brown/Chocolate", "color_Gray/Blue", "color_Other_Colors", 
+            "color_Patterned", "color_Red/Orange", "color_White", "color_Yellow/Gold/Cream"]
+}
+
+def make_estimator(algorithm):
+    # Instância (não ajustada) do algoritmo com seus parâmetros
+    path, params = ALGORITHMS[algorithm]
+    module, name = path.rsplit('.', 1)
+    return getattr(importlib.import_module(module), name)(**params)
+
+def selected_columns(feature_groups, selected):
+    # Colunas na ordem em que os grupos foram definidos, e não na ordem de seleção: a mesma seleção
+    # (em qualquer ordem) gera sempre o mesmo modelo
+    columns = []
+    for group, group_columns in feature_groups.items():
+        if group in selected:
+            columns.extend(group_columns)
+    return columns
+
+def target(df):
+    # Colunas one-hot das classes, com "Missing" e "Return to Owner" combinados (OR) em "outcome_type_Others"
+    y = df[[col for col in TARGET_COLUMNS if col != 'outcome_type_Others']].copy()
+    y['outcome_type_Others'] = df[OTHERS_COLUMNS[0]] | df[OTHERS_COLUMNS[1]]
+    return y[TARGET_COLUMNS]
+
+def class_codes(y):
+    # Classe de cada registro (índice em TARGET_COLUMNS)
+    return y.idxmax(axis=1).map({col: i for i, col in enumerate(TARGET_COLUMNS)})
+
+def class_labels(y):
+    return pd.Series(y).map(dict(enumerate(TARGET_COLUMNS))).map(LABEL_MAPPING)
+
+@traced
+def split(df_name, columns):
+    # Divisão treino/teste estratificada, com a classe de cada registro (índice em TARGET_COLUMNS)
+    df = read_df(df_name, columns=columns + [col for col in TARGET_COLUMNS + OTHERS_COLUMNS if col != 'outcome_type_Others'])
+    # As colunas one-hot ficam booleanas (1 byte; no Parquet, 1 bit) e o SMOTE as devolve assim, com valores 0/1.
+    # Uma matriz esparsa (CSR) não compensa com ~27% de valores não nulos: o ajuste fica mais lento em todos os
+    # algoritmos (ver benchmarks/bench_sparse_handoff.py)
+    from sklearn.model_selection import train_test_split
+    X = df[columns]
+    y = target(df)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y)
+    return X_train, X_test, class_codes(y_train), class_codes(y_test)
+
+@traced
+def balanced_split(df_name, columns):
+    # Divisão treino/teste e SMOTE no treino; compartilhada por todos os algoritmos
+    path = _cache_file('split', df_name, columns)
+
+    def build():
+        from imblearn.over_sampling import SMOTE
+        X_train, X_test, y_train, y_test = split(df_name, columns)
+        with span('SMOTE'):
+            X_train_balanced, y_train_balanced = SMOTE(random_state=RANDOM_STATE).fit_resample(X_train, y_train)
+        return {
+            'X_train': X_train_balanced,
+            'y_train': y_train_balanced,
+            'X_test': X_test,
+            'y_test': y_test,
+        }
+
+    return _load_or_build(path, build)
+
+@traced
+def train_model(df_name, columns, algorithm):
+    path = _cache_file('model', df_name, columns, algorithm)
+
+    def build():
+        split = balanced_split(df_name, columns)
+        estimator = make_estimator(algorithm)
+        start = time.perf_counter()
+        with span(f'fit {algorithm}'):
+            model = estimator.fit(split['X_train'], split['y_train'])
+        # Tempo de ajuste, usado na comparação entre as versões exata e aproximada
+        model.fit_seconds_ = time.perf_counter() - start
+        return model
+
+    return _load_or_build(path, build)
+
+@traced
+def evaluate(df_name, columns, algorithm):
+    # Relatório exibido pela página; num acerto de cache não é preciso carregar o modelo nem os dados
+    path = _cache_file('report', df_name, columns, algorithm)
+
+    def build():
+        from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+        split = balanced_split(df_name, columns)
+        model = train_model(df_name, columns, algorithm)
+        y_test_pred = model.predict(split['X_test'])
+        y_test_labels = class_labels(split['y_test'].to_numpy())
+        y_test_pred_labels = class_labels(y_test_pred)
+        label_values = list(LABEL_MAPPING.values())
+
+        importances = None
+        if hasattr(model, 'feature_importances_'):
+            importances = pd.DataFrame({'Feature': columns, 'Importance': model.feature_importances_})
+            importances = importances.sort_values(by='Importance', ascending=False)
+
+        return {
+            'train_accuracy': accuracy_score(split['y_train'], model.predict(split['X_train'])),
+            'test_accuracy': accuracy_score(split['y_test'], y_test_pred),
+            'classification_report': pd.DataFrame(classification_report(
+                y_test_labels, y_test_pred_labels, target_names=label_values, output_dict=True)).T,
+            'confusion_matrix': pd.DataFrame(
+                confusion_matrix(y_test_labels, y_test_pred_labels),
+                index=label_values,
+                columns=[f'Previsto: {label}' for label in label_values]
+            ),
+            'feature_importances': importances,
+            'fit_seconds': getattr(model, 'fit_seconds_', None),
+        }
+
+    return _load_or_build(path, build)
+
+def is_evaluated(df_name, columns, algorithm):
+    # Relatório já calculado (evaluate não precisa treinar)
+    return os.path.exists(_cache_file('report', df_name, columns, algorithm))
+
+def _cache_file(kind, df_name, columns, algorithm=None):
+    key = {'dataset': dataset_fingerprint(df_name), 'columns': list(columns), 'random_state': RANDOM_STATE}
+    if algorithm is not None:
+        # Caminho completo da classe: classes de mesmo nome em módulos diferentes não compartilham o cache
+        key['algorithm'] = list(ALGORITHMS[algorithm])
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()
+    return cache_path('classification', f'{kind}-{digest}.joblib')
+
+def _load_or_build(path, build):
+    # Construído e gravado em disco apenas na primeira vez; depois, carregado uma vez por processo (cache compartilhado)
+    if not os.path.exists(path):
+        value = build()
+        with atomic_write(path) as tmp_path:
+            joblib.dump(value, tmp_path, compress=3)
+        return cached(path, lambda: value, 'joblib')
+    return cached(path, lambda: joblib.load(path), 'joblib')
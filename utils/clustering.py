@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import joblib
+import numpy as np
+from joblib import Parallel, delayed
+from utils.data_utils import atomic_write, cache_path, cached, dataset_fingerprint, dataset_path
+from utils.spans import traced
+
+# Repositório dos resultados de clusterização, identificados por (dataset, colunas, k). Cada KMeans é ajustado uma
+# única vez por versão do dataset e o resultado (rótulos, centróides, inércia e estatísticas por cluster) fica salvo
+# em disco. Todas as seções da página leem daqui: a varredura do Método do Cotovelo (em paralelo, um processo por k),
+# a silhueta e os gráficos por cluster.
+
+K_VALUES = range(1, 11)
+RANDOM_STATE = 42
+MINIBATCH_SIZE = 4096
+# float32 reduz pela metade a memória da matriz (e das cópias feitas pelo KMeans) sem perda relevante de precisão
+DTYPE = np.float32
+
+# Colunas one-hot usadas na clusterização, comuns aos datasets padronizado e normalizado
+ONE_HOT_FEATURES = [
+    'outcome_type_Adoption       ',
+    'outcome_type_Died           ',
+    'outcome_type_Euthanasia     ',
+    'outcome_type_Missing        ',
+    'outcome_type_Return to Owner',
+    'outcome_type_Transfer       ',
+    'sex_upon_outcome_Intact Female',
+    'sex_upon_outcome_Intact Male  ',
+    'sex_upon_outcome_Neutered Male',
+    'sex_upon_outcome_Spayed Female',
+    'sex_upon_outcome_Unknown      ',
+    'animal_type_Bir',
+    'animal_type_Cat',
+    'animal_type_Dog',
+    'animal_type_Oth',
+    'intake_condition_Aged   ',
+    'intake_condition_Feral  ',
+    'intake_condition_Injured',
+    'intake_condition_Normal ',
+    'intake_condition_Nursing',
+    'intake_condition_Other  ',
+    'intake_condition_Pregnan',
+    'intake_condition_Sick   ',
+    'sex_upon_intake_Intact Female',
+    'sex_upon_intake_Intact Male  ',
+    'sex_upon_intake_Neutered Male',
+    'sex_upon_intake_Spayed Female',
+    'sex_upon_intake_Unknown      ',
+    'is_mix_breed',
+    'color_Black',
+    'color_Brown/Chocolate',
+    'color_Gray/Blue',
+    'color_Other_Colors',
+    'color_Patterned',
+    'color_Red/Orange',
+    'color_White',
+    'color_Yellow/Gold/Cream',
+]
+
+# Incrementar quando o conteúdo salvo mudar, para descartar os resultados antigos
+STORE_VERSION = 2
+
+def clustering_columns(suffix):
+    # Colunas de clusterização do dataset com o sufixo dado ('scaled' ou 'normalized')
+    return [
+        f'age_upon_intake_(years)_{suffix}',
+        f'age_upon_outcome_(years)_{suffix}',
+        f'time_in_shelter_days_{suffix}',
+    ] + ONE_HOT_FEATURES
+
+def make_model(k, minibatch=False):
+    # Importado só no ajuste: com os resultados já no repositório, a página não carrega o scikit-learn
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    if minibatch:
+        # Para dados grandes: ajusta em lotes, com custo por iteração independente do número de linhas
+        return MiniBatchKMeans(n_clusters=k, random_state=RANDOM_STATE, batch_size=MINIBATCH_SIZE, n_init=3)
+    return KMeans(n_clusters=k, random_state=RANDOM_STATE)
+
+@traced
+def feature_matrix(df_name, data, features):
+    # Matriz contígua das colunas de clusterização, montada uma vez por versão do dataset (cache compartilhado)
+    return cached(dataset_path(df_name),
+                  lambda: np.ascontiguousarray(data[features].to_numpy(dtype=DTYPE)),
+                  'feature_matrix', tuple(features))
+
+@traced
+def fit_clusters(df_name, data, features, k_values, minibatch=False, n_jobs=-1):
+    # Ajusta (em paralelo) apenas os valores de k que ainda não estão no repositório
+    directory = _result_dir(df_name, features, minibatch)
+    missing = [k for k in k_values if not os.path.exists(_result_path(directory, k))]
+    if not missing:
+        return
+    X = feature_matrix(df_name, data, features)
+    # O backend loky limita as threads de cada processo, evitando que os KMeans disputem os núcleos
+    fits = Parallel(n_jobs=n_jobs, backend='loky')(delayed(_fit)(X, k, minibatch) for k in missing)
+    for k, (inertia, labels, centroids) in zip(missing, fits):
+        # Estatísticas por cluster sobre as colunas originais (as colunas booleanas viram contagens)
+        sums = data[features].groupby(labels).sum()
+        sums.index.name = 'cluster'
+        result = {
+            'k': k,
+            'inertia': float(inertia),
+            'labels': labels,
+            'centroids': centroids,
+            'sizes': np.bincount(labels, minlength=k),
+            'sums': sums,
+        }
+        with atomic_write(_result_path(directory, k)) as tmp_path:
+            joblib.dump(result, tmp_path)
+
+@traced
+def cluster_result(df_name, data, features, k, minibatch=False):
+    directory = _result_dir(df_name, features, minibatch)
+    path = _result_path(directory, k)
+    if not os.path.exists(path):
+        fit_clusters(df_name, data, features, [k], minibatch=minibatch)
+    # Carregado do disco uma vez por processo (cache compartilhado)
+    return cached(path, lambda: joblib.load(path), 'clusters')
+
+@traced
+def calculate_elbow(df_name, data, features, k_values=K_VALUES, minibatch=False, n_jobs=-1):
+    k_values = list(k_values)
+    fit_clusters(df_name, data, features, k_values, minibatch=minibatch, n_jobs=n_jobs)
+    sse = [cluster_result(df_name, data, features, k, minibatch)['inertia'] for k in k_values]
+    return k_values, sse
+
+def result_path(df_name, features, k, minibatch=False):
+    return _result_path(_result_dir(df_name, features, minibatch), k)
+
+def _fit(X, k, minibatch):
+    model = make_model(k, minibatch).fit(X)
+    return model.inertia_, model.labels_.astype(np.int16), model.cluster_centers_
+
+def _result_dir(df_name, features, minibatch):
+    key = json.dumps({
+        'dataset': dataset_fingerprint(df_name),
+        'features': list(features),
+        'minibatch': minibatch,
+        'random_state': RANDOM_STATE,
+        'dtype': np.dtype(DTYPE).name,
+        'version': STORE_VERSION,
+    })
+    return os.path.dirname(cache_path('clustering', hashlib.sha1(key.encode()).hexdigest(), ''))
+
+def _result_path(directory, k):
+    return os.path.join(directory, f'k{k}.joblib')
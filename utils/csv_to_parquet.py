@@ -1,13 +1,212 @@
+import argparse
+import csv
+import io
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+from collections import Counter
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+from utils.labels import CATEGORICAL_COLUMNS
 
+# Conversão de CSV para Parquet em fluxo (streaming), com memória limitada:
+#   python -m utils.csv_to_parquet data/ACC_INTAKES_OUTCOMES.csv data/ACC_INTAKES_OUTCOMES.parquet
 
-csv_file_path = 'C:/Users/julia/Documents/UFRPE/PROJETOS3/projetos3-julia/pisi3-grupo8/data/ACC_INTAKES_OUTCOMES_1.csv'
+SNIFF_BYTES = 64 * 1024          # prefixo usado para detectar o separador e o cabeçalho
+BLOCK_SIZE = 16 * 1024 * 1024    # tamanho de cada bloco lido do CSV
+ROW_GROUP_SIZE = 128 * 1024      # linhas por row group no Parquet final
+SORT_COLUMN = 'intake_datetime'
+DATETIME_FORMAT = '%d/%m/%Y %H:%M'
+DELIMITERS = ',;\t|'              # separadores aceitos na detecção
+MAX_EXAMPLES = 5                 # exemplos de linhas rejeitadas guardados por motivo
 
-parquet_file_path = 'C:/Users/julia/Documents/UFRPE/PROJETOS3/projetos3-julia/pisi3-grupo8/data/ACC_INTAKES_OUTCOMES.parquet'
+# Tipos conhecidos do dataset ACC_INTAKES_OUTCOMES; as demais colunas ficam como texto
+INT_COLUMNS = [
+    'age_upon_outcome_(days)', 'outcome_month', 'outcome_year', 'outcome_hour', 'outcome_number',
+    'dob_year', 'dob_month', 'count', 'age_upon_intake_(days)', 'intake_month', 'intake_year',
+    'intake_hour', 'intake_number'
+]
+FLOAT_COLUMNS = ['age_upon_outcome_(years)', 'age_upon_intake_(years)', 'time_in_shelter_days']
+# Colunas categóricas (ver utils.labels) são gravadas como dicionário, sem os espaços de preenchimento
+DICTIONARY_TYPE = pa.dictionary(pa.int32(), pa.string())
 
-df = pd.read_csv(csv_file_path, encoding='utf-8', on_bad_lines='skip')
+_SORT_KEY = '__sort_key'
 
+def csv_to_parquet(csv_path, parquet_path, encoding='utf-8', block_size=BLOCK_SIZE, row_group_size=ROW_GROUP_SIZE):
+    sep, header = sniff_csv(csv_path, encoding=encoding)
+    schema = _schema(header)
+    spill_schema = schema.append(pa.field(_SORT_KEY, pa.timestamp('ns')))
+    report = {'rows_read': 0, 'rows_written': 0, 'rejected': Counter(), 'examples': {}}
 
-df.to_parquet(parquet_file_path, engine='pyarrow')
+    def invalid_row(row):
+        _reject(report, f'esperadas {row.expected_columns} colunas, encontradas {row.actual_columns}',
+                row.number, row.text)
+        return 'skip'
 
+    reader = pv.open_csv(
+        csv_path,
+        read_options=pv.ReadOptions(encoding=encoding, block_size=block_size),
+        parse_options=pv.ParseOptions(delimiter=sep, invalid_row_handler=invalid_row),
+        # Tudo é lido como texto; a conversão é feita por bloco para poder rejeitar linhas inválidas
+        convert_options=pv.ConvertOptions(column_types={name: pa.string() for name in header}),
+    )
 
+    out_dir = os.path.dirname(os.path.abspath(parquet_path))
+    spill_dir = tempfile.mkdtemp(prefix='.ingest-', dir=out_dir)
+    tmp_path = os.path.join(out_dir, f'.{os.path.basename(parquet_path)}.{uuid.uuid4().hex}.tmp')
+    try:
+        # 1ª passada: cada bloco é convertido e distribuído em arquivos temporários por mês de entrada
+        buckets = {}
+        for batch in reader:
+            chunk = _convert(batch.to_pandas(), report)
+            for bucket, part in chunk.groupby(_bucket(chunk[_SORT_KEY]), sort=False, dropna=False):
+                if bucket not in buckets:
+                    spill_path = os.path.join(spill_dir, f'{len(buckets)}.parquet')
+                    buckets[bucket] = (spill_path, pq.ParquetWriter(spill_path, spill_schema))
+                writer = buckets[bucket][1]
+                writer.write_table(pa.Table.from_pandas(part, schema=writer.schema, preserve_index=False))
+        for _, writer in buckets.values():
+            writer.close()
+
+        # 2ª passada: cada mês é ordenado em memória e anexado ao Parquet final, em ordem cronológica.
+        # As linhas são acumuladas até completar um row group, para não gerar row groups pequenos por mês.
+        with pq.ParquetWriter(tmp_path, schema) as writer:
+            pending = []
+            pending_rows = 0
+            for bucket in sorted(buckets, key=lambda b: (b < 0, b)):
+                table = pq.read_table(buckets[bucket][0])
+                table = table.sort_by([(_SORT_KEY, 'ascending')]).drop_columns([_SORT_KEY])
+                pending.append(table)
+                pending_rows += table.num_rows
+                report['rows_written'] += table.num_rows
+                if pending_rows >= row_group_size:
+                    table = pa.concat_tables(pending)
+                    full = (pending_rows // row_group_size) * row_group_size
+                    writer.write_table(table.slice(0, full), row_group_size=row_group_size)
+                    pending = [table.slice(full)]
+                    pending_rows -= full
+            if pending_rows:
+                writer.write_table(pa.concat_tables(pending), row_group_size=row_group_size)
+
+        # Gravação atômica: o arquivo final só aparece completo
+        os.replace(tmp_path, parquet_path)
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    report['rows_read'] = report['rows_written'] + sum(report['rejected'].values())
+    return report
+
+def sniff_csv(csv_path, encoding='utf-8'):
+    # Detecta separador e cabeçalho lendo apenas um prefixo do arquivo
+    with open(csv_path, 'rb') as f:
+        prefix = f.read(SNIFF_BYTES).decode(encoding, errors='replace')
+    if '\n' in prefix:
+        prefix = prefix[:prefix.rindex('\n')]
+    prefix = prefix.lstrip('\ufeff')
+    try:
+        sep = csv.Sniffer().sniff(prefix, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        # O Sniffer exige o mesmo número de colunas em todas as linhas: com linhas malformadas no prefixo, usa o
+        # separador mais frequente no cabeçalho
+        first_line = prefix.split('\n', 1)[0]
+        sep = max(DELIMITERS, key=first_line.count) if any(d in first_line for d in DELIMITERS) else ','
+    header = next(csv.reader(io.StringIO(prefix), delimiter=sep))
+    return sep, header
+
+def print_report(report, file=sys.stdout):
+    print(f"Linhas lidas: {report['rows_read']}", file=file)
+    print(f"Linhas gravadas: {report['rows_written']}", file=file)
+    print(f"Linhas rejeitadas: {sum(report['rejected'].values())}", file=file)
+    for reason, count in report['rejected'].most_common():
+        print(f"  {count:>8}  {reason}", file=file)
+        for number, text in report['examples'].get(reason, []):
+            where = f'linha {number}' if number is not None else 'valor'
+            print(f"            {where}: {text[:120]}", file=file)
+
+def _schema(header):
+    fields = []
+    for name in header:
+        if name in INT_COLUMNS:
+            fields.append(pa.field(name, pa.int64()))
+        elif name in FLOAT_COLUMNS:
+            fields.append(pa.field(name, pa.float64()))
+        elif name in CATEGORICAL_COLUMNS:
+            fields.append(pa.field(name, DICTIONARY_TYPE))
+        else:
+            fields.append(pa.field(name, pa.string()))
+    return pa.schema(fields)
+
+def _convert(chunk, report):
+    invalid = pd.Series(False, index=chunk.index)
+    for col in chunk.columns:
+        if col not in INT_COLUMNS and col not in FLOAT_COLUMNS:
+            continue
+        values = pd.to_numeric(chunk[col], errors='coerce')
+        # Campo vazio é valor ausente, não inválido
+        bad = values.isna() & chunk[col].notna() & (chunk[col].str.strip() != '')
+        if col in INT_COLUMNS:
+            bad |= values.notna() & (values % 1 != 0)
+        for idx in chunk.index[bad & ~invalid]:
+            _reject(report, f"valor inválido em '{col}'", None, str(chunk.at[idx, col]))
+        invalid |= bad
+        chunk[col] = values.astype('Int64') if col in INT_COLUMNS else values.astype('float64')
+
+    if invalid.any():
+        chunk = chunk[~invalid].copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col in chunk.columns:
+            chunk[col] = chunk[col].str.strip().astype('category')
+    if SORT_COLUMN in chunk.columns:
+        chunk[_SORT_KEY] = _parse_datetime(chunk[SORT_COLUMN])
+    else:
+        chunk[_SORT_KEY] = pd.NaT
+    return chunk
+
+def _parse_datetime(values):
+    parsed = pd.to_datetime(values, format=DATETIME_FORMAT, errors='coerce')
+    missing = parsed.isna() & values.notna()
+    if missing.any():
+        parsed[missing] = pd.to_datetime(values[missing], format='ISO8601', errors='coerce')
+    return parsed
+
+def _bucket(keys):
+    # Ano*12 + mês; datas ausentes vão para o balde -1 (gravado por último)
+    return (keys.dt.year * 12 + keys.dt.month - 1).fillna(-1).astype('int64')
+
+def _reject(report, reason, number, text):
+    report['rejected'][reason] += 1
+    examples = report['examples'].setdefault(reason, [])
+    if len(examples) < MAX_EXAMPLES:
+        examples.append((number, text))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Converte um CSV (de qualquer tamanho) para Parquet ordenado por intake_datetime.')
+    parser.add_argument('csv_path')
+    parser.add_argument('parquet_path', nargs='?')
+    parser.add_argument('--encoding', default='utf-8')
+    parser.add_argument('--block-size', type=int, default=BLOCK_SIZE, help='bytes lidos do CSV por bloco')
+    parser.add_argument('--row-group-size', type=int, default=ROW_GROUP_SIZE, help='linhas por row group')
+    parser.add_argument('--no-cube', action='store_true', help='não constrói o cubo de contagens das páginas de EDA')
+    args = parser.parse_args(argv)
+
+    parquet_path = args.parquet_path or os.path.splitext(args.csv_path)[0] + '.parquet'
+    report = csv_to_parquet(args.csv_path, parquet_path, encoding=args.encoding,
+                            block_size=args.block_size, row_group_size=args.row_group_size)
+    print_report(report)
+
+    if not args.no_cube:
+        # Importado aqui para evitar import circular (utils.cube -> utils.data_utils -> este módulo)
+        from utils.cube import cube_name, write_cube
+        name = os.path.splitext(os.path.basename(parquet_path))[0]
+        cube_path = os.path.join(os.path.dirname(os.path.abspath(parquet_path)), f'{cube_name(name)}.parquet')
+        cube = write_cube(parquet_path, cube_path)
+        print(f"Cubo gravado em {cube_path}: {len(cube)} células")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from utils.data_utils import atomic_write, dataset_path, read_df
+from utils.labels import CATEGORICAL_COLUMNS, prepare_categoricals
+from utils.spans import traced
+
+# Cubo de contagens pré-calculado a partir do ACC_INTAKES_OUTCOMES. As páginas de EDA respondem seus
+# agrupamentos somando o cubo (rollup), com custo proporcional ao tamanho do cubo e não ao número de registros.
+#   python -m utils.cube ACC_INTAKES_OUTCOMES
+
+CUBE_DIMENSIONS = [
+    'animal_type',
+    'intake_type',
+    'outcome_type',
+    'intake_condition',
+    'sex_upon_intake',
+    'sex_upon_outcome',
+    'age_upon_intake_age_group',
+    'age_upon_outcome_age_group',
+    'intake_year',
+    'intake_month',
+    'outcome_year',
+    'outcome_month',
+]
+BATCH_SIZE = 256 * 1024
+_SOURCE_KEY = b'cube_source'
+
+def cube_name(df_name):
+    return f'{df_name}_cube'
+
+def cube_path(df_name):
+    return os.path.join(os.path.dirname(dataset_path(df_name)), f'{cube_name(df_name)}.parquet')
+
+@traced
+def read_cube(df_name='ACC_INTAKES_OUTCOMES'):
+    # (Re)constrói o cubo se ele não existir ou se o dataset de origem mudou desde a última construção
+    source_path = dataset_path(df_name)
+    path = cube_path(df_name)
+    if _cube_source(path) != _source_signature(source_path):
+        write_cube(source_path, path)
+    return read_df(cube_name(df_name))
+
+@traced
+def rollup(cube, dimensions, observed=True):
+    # Equivalente a df.groupby(dimensions).size(), somando as contagens do cubo
+    return cube.groupby(dimensions, observed=observed)['count'].sum().reset_index()
+
+def build_cube(source_path, batch_size=BATCH_SIZE):
+    # Agregação em fluxo: cada lote é agregado parcialmente e os parciais são combinados no final
+    source = pq.ParquetFile(source_path)
+    dimensions = [col for col in CUBE_DIMENSIONS if col in source.schema_arrow.names]
+    partials = []
+    for batch in source.iter_batches(batch_size=batch_size, columns=dimensions):
+        chunk = batch.to_pandas()
+        for col in dimensions:
+            if col in CATEGORICAL_COLUMNS:
+                chunk[col] = chunk[col].astype('category')
+        chunk = prepare_categoricals(chunk)
+        partials.append(chunk.groupby(dimensions, observed=True, dropna=False).size().rename('count').reset_index())
+        if len(partials) > 1:
+            partials = [_combine(partials, dimensions)]
+    if not partials:
+        return pd.DataFrame(columns=dimensions + ['count'])
+    return _combine(partials, dimensions)
+
+@traced
+def write_cube(source_path, path):
+    cube = build_cube(source_path)
+    table = pa.Table.from_pandas(cube, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_SOURCE_KEY] = json.dumps(_source_signature(source_path)).encode()
+    table = table.replace_schema_metadata(metadata)
+    with atomic_write(path) as tmp_path:
+        pq.write_table(table, tmp_path)
+    return cube
+
+def _combine(partials, dimensions):
+    combined = pd.concat(partials, ignore_index=True)
+    for col in dimensions:
+        if col in CATEGORICAL_COLUMNS:
+            # Os lotes podem ter categorias diferentes; após o concat a coluna é recategorizada
+            combined[col] = combined[col].astype('category')
+    return combined.groupby(dimensions, observed=True, dropna=False)['count'].sum().reset_index()
+
+def _source_signature(source_path):
+    # Inclui as dimensões: o cubo é reconstruído também quando CUBE_DIMENSIONS muda
+    stat = os.stat(source_path)
+    return [os.path.basename(source_path), stat.st_mtime_ns, stat.st_size, CUBE_DIMENSIONS]
+
+def _cube_source(path):
+    if not os.path.exists(path):
+        return None
+    metadata = pq.read_schema(path).metadata or {}
+    if _SOURCE_KEY not in metadata:
+        return None
+    return json.loads(metadata[_SOURCE_KEY])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Constrói o cubo de contagens usado pelas páginas de EDA.')
+    parser.add_argument('df_name', nargs='?', default='ACC_INTAKES_OUTCOMES')
+    args = parser.parse_args(argv)
+
+    path = cube_path(args.df_name)
+    cube = write_cube(dataset_path(args.df_name), path)
+    print(f"Cubo gravado em {path}: {len(cube)} células, {int(cube['count'].sum())} registros")
+
+if __name__ == '__main__':
+    main()
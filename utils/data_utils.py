@@ -1,5 +1,31 @@
+import hashlib
 import os
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from utils.csv_to_parquet import csv_to_parquet, print_report
+from utils.labels import CATEGORICAL_COLUMNS, prepare_categoricals
+from utils.spans import traced
+
+# Orçamento de memória do cache de datasets, em bytes (padrão: 1 GiB).
+# Pode ser ajustado pela variável de ambiente DATA_CACHE_MAX_BYTES ou por set_cache_budget().
+CACHE_MAX_BYTES = int(os.environ.get('DATA_CACHE_MAX_BYTES', 1024 ** 3))
+
+# Diretório dos caches em disco (modelos, resultados de clusterização, ...)
+CACHE_DIR = os.environ.get('CACHE_DIR', '.cache')
+FINGERPRINT_BYTES = 1024 * 1024
+
+# Cache compartilhado por todas as sessões do processo: chave -> (DataFrame, bytes)
+_cache = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+_loading_locks = {}
 
 def df_names():
     result = []
@@ -9,27 +35,210 @@ def df_names():
             result.append(f.name[0:-4])
     return sorted(result)
 
-def read_df(df_name, extension='parquet', encoding='utf-8', low_memory=False):
+@traced
+def read_df(df_name, extension='parquet', encoding='utf-8', columns=None, filters=None):
+    parquet_path = dataset_path(df_name, encoding=encoding)
+
+    # Projeção de colunas e filtros (ex.: [('intake_year', 'in', [2014, 2015])]) são repassados ao pyarrow,
+    # que lê apenas as colunas pedidas e descarta row groups cujas estatísticas não atendem ao filtro
+    columns = list(columns) if columns is not None else None
+
+    # Lê o arquivo Parquet (ou reaproveita a cópia em cache, se o arquivo não mudou)
+    df = cached(parquet_path,
+                 lambda: _load_parquet(parquet_path, columns, filters),
+                 tuple(columns) if columns is not None else None, repr(filters))
+    # Cópia rasa: as colunas são compartilhadas (somente leitura), mas a página pode
+    # adicionar, substituir ou remover colunas sem afetar as outras sessões
+    return df.copy(deep=False)
+
+@traced
+def read_table(df_name, columns=None):
+    # Dataset como tabela Arrow (sem conversão para pandas), para fatiar, filtrar e ordenar sem copiar as linhas
+    parquet_path = dataset_path(df_name)
+    columns = list(columns) if columns is not None else None
+    return cached(parquet_path, lambda: _load_table(parquet_path, columns),
+                  'arrow', tuple(columns) if columns is not None else None)
+
+def read_schema(df_name):
+    # Lê apenas o rodapé (footer) do Parquet, sem carregar nenhuma linha
+    return pq.read_schema(dataset_path(df_name))
+
+def read_columns(df_name):
+    return _columns_at(dataset_path(df_name))
+
+@traced
+def _load_parquet(parquet_path, columns, filters):
+    # As colunas categóricas são lidas como dicionário (pd.Categorical) e têm o preenchimento removido
+    names = columns if columns is not None else pq.read_schema(parquet_path).names
+    dictionary_columns = [col for col in CATEGORICAL_COLUMNS if col in names]
+    df = pd.read_parquet(parquet_path, engine='pyarrow', columns=columns, filters=filters,
+                         read_dictionary=dictionary_columns)
+    return prepare_categoricals(df)
+
+@traced
+def _load_table(parquet_path, columns):
+    names = columns if columns is not None else _columns_at(parquet_path)
+    dictionary_columns = [col for col in CATEGORICAL_COLUMNS if col in names]
+    table = pq.read_table(parquet_path, columns=names, read_dictionary=dictionary_columns)
+    # Remove o preenchimento apenas do dicionário das colunas categóricas (custo O(categorias))
+    for col in dictionary_columns:
+        chunks = [
+            pa.DictionaryArray.from_arrays(chunk.indices, pc.utf8_rtrim_whitespace(chunk.dictionary))
+            for chunk in table[col].chunks
+        ]
+        table = table.set_column(table.schema.get_field_index(col), col, pa.chunked_array(chunks, table[col].type))
+    return table
+
+def _columns_at(parquet_path):
+    return [name for name in pq.read_schema(parquet_path).names if not name.startswith('__index_level_')]
+
+def dataset_fingerprint(df_name):
+    # Identifica o conteúdo do dataset pelo tamanho e pelo final do arquivo (rodapé do Parquet, com esquema,
+    # número de linhas e estatísticas dos row groups), sem depender do mtime nem ler o arquivo inteiro
+    path = dataset_path(df_name)
+
+    def fingerprint():
+        size = os.path.getsize(path)
+        digest = hashlib.sha1(str(size).encode())
+        with open(path, 'rb') as f:
+            f.seek(max(0, size - FINGERPRINT_BYTES))
+            digest.update(f.read())
+        return digest.hexdigest()
+
+    return cached(path, fingerprint, 'fingerprint')
+
+def cache_path(*parts):
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+@contextmanager
+def atomic_write(path):
+    # Escreve em um arquivo temporário no mesmo diretório e renomeia ao final: leitores nunca veem um arquivo parcial
+    tmp_path = os.path.join(os.path.dirname(os.path.abspath(path)), f'.{os.path.basename(path)}.{uuid.uuid4().hex}.tmp')
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def dataset_path(df_name, encoding='utf-8'):
     data_dir = 'data'  # Diretório onde o CSV está localizado
     parquet_path = os.path.join(data_dir, f'{df_name}.parquet')
     csv_path = os.path.join(data_dir, f'{df_name}.csv')
-    
+
     # Verifica se o arquivo Parquet existe
     if not os.path.exists(parquet_path):
         # Se o arquivo Parquet não existir, converte o CSV para Parquet
         if os.path.exists(csv_path):
-            df = __read_csv(csv_path, encoding=encoding, low_memory=low_memory)
-            df.to_parquet(parquet_path, engine='pyarrow')
+            report = csv_to_parquet(csv_path, parquet_path, encoding=encoding)
+            print_report(report)
         else:
             raise FileNotFoundError(f"Arquivo CSV '{csv_path}' não encontrado.")
-    
-    # Lê o arquivo Parquet
-    return pd.read_parquet(parquet_path)
+    return parquet_path
 
-def __read_csv(path, encoding, low_memory=False):
-    try:
-        df = pd.read_csv(path, sep=',', encoding=encoding, low_memory=low_memory)
-    except Exception as e:
-        print(f"Erro ao ler CSV: {e}. Tentando com separador ';'.")
-        df = pd.read_csv(path, sep=';', encoding=encoding, low_memory=low_memory)
-    return df
+def set_cache_budget(max_bytes):
+    global CACHE_MAX_BYTES
+    with _cache_lock:
+        CACHE_MAX_BYTES = int(max_bytes)
+        _evict()
+
+def clear_cache():
+    global _cache_bytes
+    with _cache_lock:
+        _cache.clear()
+        _cache_bytes = 0
+
+def cache_info():
+    with _cache_lock:
+        return {
+            'entries': len(_cache),
+            'bytes': _cache_bytes,
+            'max_bytes': CACHE_MAX_BYTES,
+        }
+
+def cached(path, loader, *variant):
+    # Guarda no cache compartilhado o resultado de loader(), derivado do arquivo em path (um dataset ou um
+    # artefato calculado a partir dele). A chave inclui o mtime e o tamanho do arquivo: se o arquivo for regravado, a entrada antiga deixa de ser usada
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size) + variant
+
+    value = _cache_get(key)
+    if value is not None:
+        return value
+
+    # Garante que sessões concorrentes carreguem o mesmo arquivo uma única vez
+    with _cache_lock:
+        loading_lock = _loading_locks.setdefault(key, threading.Lock())
+    with loading_lock:
+        value = _cache_get(key)
+        if value is None:
+            value = loader()
+            # Congela antes de medir: memory_usage() cria as Series das colunas, que ficam guardadas no DataFrame
+            # e, criadas antes, seriam visões graváveis dos arrays
+            _freeze(value)
+            nbytes = _nbytes(value)
+            _cache_put(key, value, nbytes)
+    with _cache_lock:
+        _loading_locks.pop(key, None)
+    return value
+
+def _cache_get(key):
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        _cache.move_to_end(key)
+        return entry[0]
+
+def _cache_put(key, value, nbytes):
+    global _cache_bytes
+    with _cache_lock:
+        # Remove versões antigas do mesmo arquivo (mtime/tamanho diferentes)
+        for old_key in [k for k in _cache if k[0] == key[0] and k[1:3] != key[1:3]]:
+            _cache_bytes -= _cache.pop(old_key)[1]
+        if nbytes > CACHE_MAX_BYTES:
+            return
+        _cache[key] = (value, nbytes)
+        _cache_bytes += nbytes
+        _evict()
+
+def _evict():
+    # Remove as entradas usadas há mais tempo até caber no orçamento (LRU)
+    global _cache_bytes
+    while _cache and _cache_bytes > CACHE_MAX_BYTES:
+        _, (_, nbytes) = _cache.popitem(last=False)
+        _cache_bytes -= nbytes
+
+def _nbytes(value):
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, dict):
+        return sum(_nbytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(item) for item in value)
+    return int(getattr(value, 'nbytes', 0))
+
+def _freeze(value):
+    # Marca os arrays como somente leitura: escritas in-place (ex.: df.loc[...] = ...) falham em vez de corromper o cache.
+    # Arrays de objetos (texto) ficam de fora, pois várias rotinas do pandas não aceitam buffers somente leitura.
+    if isinstance(value, dict):
+        for item in value.values():
+            _freeze(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _freeze(item)
+    elif isinstance(value, pd.DataFrame):
+        # Os arrays por coluna da API pública (to_numpy(), .array) podem ser cópias ou visões dos blocos do
+        # DataFrame, e marcar uma visão não protege o bloco: os blocos vêm do gerenciador interno do pandas
+        # (_mgr.arrays, pandas 2.2, fixado em requirements.txt). Sem ele, o DataFrame fica no cache sem a proteção
+        for arr in getattr(getattr(value, '_mgr', None), 'arrays', []):
+            if isinstance(arr, pd.Categorical):
+                arr = arr.codes
+            _freeze(arr)
+    elif isinstance(value, np.ndarray) and value.dtype != object:
+        value.flags.writeable = False
+    return value
@@ -0,0 +1,83 @@
+import numpy as np
+from utils.spans import traced
+
+# Resumos de distribuição calculados no servidor para os gráficos de caixa (boxplot) e de violino. O tamanho de
+# cada resumo é fixo (quantis, GRID_POINTS pontos de densidade e no máximo MAX_OUTLIERS pontos discrepantes),
+# independentemente do número de registros.
+
+GRID_POINTS = 200
+# Densidade estimada sobre um histograma fino (binned KDE): custo O(n + BINS), em vez de O(n x GRID_POINTS)
+BINS = 2048
+MAX_OUTLIERS = 200
+RANDOM_STATE = 42
+
+def box_summary(values, max_outliers=MAX_OUTLIERS, random_state=RANDOM_STATE):
+    # Quartis, média e limites de Tukey (1,5 x IQR, ajustados ao dado mais extremo dentro do limite)
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return None
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    outliers = values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)]
+    if len(outliers) > max_outliers:
+        # Amostra dos pontos discrepantes, sempre mantendo os extremos
+        rng = np.random.default_rng(random_state)
+        sample = rng.choice(len(outliers), max_outliers - 2, replace=False)
+        outliers = np.concatenate([[outliers.min(), outliers.max()], outliers[sample]])
+    return {
+        'count': len(values),
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'mean': values.mean(),
+        'lowerfence': inside.min(),
+        'upperfence': inside.max(),
+        'outliers': outliers,
+        'outlier_count': int(((values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)).sum()),
+    }
+
+def kde(values, grid_points=GRID_POINTS, bins=BINS):
+    # Densidade gaussiana (largura de banda pela regra de Silverman) sobre uma grade limitada a 2 larguras
+    # de banda além dos extremos, como o 'spanmode' padrão do violino do Plotly
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.array([]), np.array([])
+    bandwidth = _silverman(values)
+    low, high = values.min() - 2 * bandwidth, values.max() + 2 * bandwidth
+    if high == low:
+        return np.array([low]), np.array([1.0])
+
+    counts, edges = np.histogram(values, bins=bins, range=(low, high))
+    centers = (edges[:-1] + edges[1:]) / 2
+    step = edges[1] - edges[0]
+    # Convolução do histograma com o núcleo gaussiano (em unidades de bins). O núcleo não pode ter mais pontos que
+    # o histograma: com mode='same', o resultado teria o tamanho do núcleo (grupos com poucos pontos ou pouca dispersão)
+    radius = min((bins - 1) // 2, int(np.ceil(4 * bandwidth / step)))
+    offsets = np.arange(-radius, radius + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    density = np.convolve(counts, kernel, mode='same') / (len(values) * bandwidth * np.sqrt(2 * np.pi))
+
+    grid = np.linspace(low, high, grid_points)
+    return grid, np.interp(grid, centers, density)
+
+@traced
+def summarize_by_group(values, groups, n_groups):
+    # Resumo de caixa e densidade de cada grupo (ex.: cluster)
+    values = np.asarray(values)
+    groups = np.asarray(groups)
+    summaries = []
+    for group in range(n_groups):
+        group_values = values[groups == group]
+        summaries.append({'box': box_summary(group_values), 'kde': kde(group_values)})
+    return summaries
+
+def _silverman(values):
+    std = values.std(ddof=1) if len(values) > 1 else 0.0
+    iqr = np.subtract(*np.percentile(values, [75, 25]))
+    spread = min(std, iqr / 1.34) if iqr > 0 else std
+    if spread == 0:
+        spread = abs(values.mean()) or 1.0
+    return 0.9 * spread * len(values) ** (-1 / 5)
@@ -0,0 +1,54 @@
+from utils.cube import read_cube, rollup
+from utils.labels import translate
+from utils.normalization import gender
+from utils.spans import traced
+from utils.timeseries import year_row
+
+# Transformações das páginas de EDA (grafico1 a grafico4 e exploratory_analisys), separadas da exibição para que
+# também rodem fora do Streamlit (benchmarks/suite.py). Todas partem do cubo de contagens.
+
+@traced
+def population_pyramid(df_name, age_group_col):
+    # grafico1: contagem por faixa etária e gênero
+    df_pyramid = rollup(read_cube(df_name), ['sex_upon_intake', age_group_col])
+    df_pyramid['sex_upon_intake'] = gender(df_pyramid['sex_upon_intake'])
+    df_pyramid = df_pyramid[df_pyramid['sex_upon_intake'].isin(['Fêmea', 'Macho', 'Desconhecido'])]
+
+    # Rótulos de exibição das faixas etárias (as categorias já vêm ordenadas da leitura)
+    df_pyramid[age_group_col] = translate(df_pyramid[age_group_col])
+
+    return rollup(df_pyramid, [age_group_col, 'sex_upon_intake'], observed=False)
+
+@traced
+def type_distribution(df_name, type_col):
+    # grafico2: contagem por tipo de entrada ou de saída (type_col) e tipo de animal
+    df = rollup(read_cube(df_name), ['animal_type', 'outcome_type', 'intake_type'])
+    for col in ['animal_type', 'outcome_type', 'intake_type']:
+        df[col] = translate(df[col])
+    return rollup(df, [type_col, 'animal_type'])
+
+@traced
+def outcome_sex_distribution(df_name):
+    # exploratory_analisys: contagem por tipo de saída, gênero na saída e tipo de animal
+    df_bubble = rollup(read_cube(df_name), ['sex_upon_outcome', 'animal_type', 'outcome_type'])
+    df_bubble['sex_upon_outcome'] = gender(df_bubble['sex_upon_outcome'])
+    df_bubble['animal_type'] = translate(df_bubble['animal_type'])
+    df_bubble['outcome_type'] = translate(df_bubble['outcome_type'])
+    return rollup(df_bubble, ['outcome_type', 'sex_upon_outcome', 'animal_type'])
+
+@traced
+def intake_conditions(df_name):
+    # grafico3: contagem por tipo de animal e condição de entrada
+    df_bar = rollup(read_cube(df_name), ['animal_type', 'intake_condition'])
+    df_bar['animal_type'] = translate(df_bar['animal_type'])
+    df_bar['intake_condition'] = translate(df_bar['intake_condition'])
+    return rollup(df_bar, ['animal_type', 'intake_condition'])
+
+@traced
+def monthly_series(index, years, outcomes_key):
+    # grafico4: entradas e saídas por mês de cada ano, a partir do índice mensal (outcomes_key: 'outcomes' ou
+    # 'outcomes_by_intake_year')
+    return [(year,
+             index['intakes'][year_row(index, year)].tolist(),
+             index[outcomes_key][year_row(index, year)].tolist())
+            for year in years]
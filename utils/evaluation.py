@@ -0,0 +1,162 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from utils.classification import LABEL_MAPPING, RANDOM_STATE, TARGET_COLUMNS, balanced_split, make_estimator, split, train_model
+from utils.data_utils import atomic_write, dataset_fingerprint
+from utils.spans import traced
+
+# Avaliação dos modelos exibidos em pages/classificacao.py: relatório e matriz de confusão no conjunto de teste e
+# validação cruzada estratificada (k folds) no conjunto de treino. Todas as tarefas (cada fold de cada modelo e o
+# treino final de cada modelo) rodam em paralelo, em processos separados, e as métricas são gravadas em um artefato
+# JSON lido pela página (que só lê o artefato: scikit-learn e imbalanced-learn são importados apenas na execução):
+#   python -m utils.evaluation
+#   python -m utils.evaluation --models "Random Forest,XGBoost" --folds 5 --jobs 4
+
+DATASET = 'scaled_ACC_INTAKES_OUTCOMES'
+MODELS = ['Random Forest', 'SVM', 'XGBoost']
+N_FOLDS = 5
+METRICS_PATH = os.path.join('data', 'metrics', 'classification.json')
+# Incrementar quando o formato do artefato mudar
+METRICS_VERSION = 1
+
+# Características usadas em utils/classificacao.ipynb
+FEATURES = [
+    'dob_year_scaled', 'age_upon_intake_(days)_scaled', 'age_upon_intake_(years)_scaled', 'intake_month_scaled',
+    'intake_year_scaled', 'age_upon_outcome_(days)_scaled', 'age_upon_outcome_(years)_scaled',
+    'outcome_month_scaled', 'outcome_year_scaled', 'time_in_shelter_days_scaled',
+    'sex_upon_outcome_Intact Female', 'sex_upon_outcome_Intact Male  ', 'sex_upon_outcome_Neutered Male',
+    'sex_upon_outcome_Spayed Female', 'sex_upon_outcome_Unknown      ', 'animal_type_Bir', 'animal_type_Cat',
+    'animal_type_Dog', 'animal_type_Oth', 'intake_condition_Aged   ', 'intake_condition_Feral  ',
+    'intake_condition_Injured', 'intake_condition_Normal ', 'intake_condition_Nursing', 'intake_condition_Other  ',
+    'intake_condition_Pregnan', 'intake_condition_Sick   ', 'intake_type_Euthanasia Request',
+    'intake_type_Owner Surrender   ', 'intake_type_Public Assist     ', 'intake_type_Stray             ',
+    'intake_type_Wildlife          ', 'sex_upon_intake_Intact Female', 'sex_upon_intake_Intact Male  ',
+    'sex_upon_intake_Neutered Male', 'sex_upon_intake_Spayed Female', 'sex_upon_intake_Unknown      ',
+    'age_upon_outcome_age_group_encoded', 'age_upon_intake_age_group_encoded', 'is_mix_breed', 'color_Black',
+    'color_Brown/Chocolate', 'color_Gray/Blue', 'color_Other_Colors', 'color_Patterned', 'color_Red/Orange',
+    'color_White', 'color_Yellow/Gold/Cream',
+]
+
+LABELS = [LABEL_MAPPING[col] for col in TARGET_COLUMNS]
+
+@traced
+def run(df_name=DATASET, models=MODELS, n_folds=N_FOLDS, n_jobs=-1):
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import StratifiedKFold
+    start = time.perf_counter()
+    # O conjunto balanceado do treino final é montado uma única vez, antes de distribuir as tarefas
+    balanced_split(df_name, FEATURES)
+    X_train, _, y_train, _ = split(df_name, FEATURES)
+    folds = list(StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=RANDOM_STATE).split(X_train, y_train))
+
+    tasks = [delayed(_holdout)(df_name, model) for model in models]
+    tasks += [delayed(_fold)(model, X_train, y_train, train_index, test_index)
+              for model in models for train_index, test_index in folds]
+    # O backend loky limita as threads de cada processo, evitando que os modelos disputem os núcleos
+    results = Parallel(n_jobs=n_jobs, backend='loky')(tasks)
+
+    metrics = {
+        'version': METRICS_VERSION,
+        'dataset': df_name,
+        'fingerprint': dataset_fingerprint(df_name),
+        'created_at': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'features': FEATURES,
+        'n_folds': n_folds,
+        'random_state': RANDOM_STATE,
+        'models': {},
+    }
+    for i, model in enumerate(models):
+        fold_results = results[len(models) + i * n_folds:len(models) + (i + 1) * n_folds]
+        accuracies = [result['accuracy'] for result in fold_results]
+        metrics['models'][model] = dict(results[i], cross_validation={
+            'accuracy': accuracies,
+            'f1_macro': [result['f1_macro'] for result in fold_results],
+            'fit_seconds': [result['fit_seconds'] for result in fold_results],
+            'mean_accuracy': float(np.mean(accuracies)),
+            'std_accuracy': float(np.std(accuracies)),
+        })
+    metrics['elapsed_seconds'] = time.perf_counter() - start
+    return metrics
+
+def save(metrics, path=METRICS_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with atomic_write(path) as tmp_path:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(metrics, f, ensure_ascii=False, indent=2)
+
+@traced
+def load(path=METRICS_PATH):
+    # Métricas gravadas pela última execução, ou None se ainda não houver uma na versão atual
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        metrics = json.load(f)
+    return metrics if metrics.get('version') == METRICS_VERSION else None
+
+def report_frame(model_metrics):
+    # Precisão, recall, F1 e suporte por classe, como na página
+    report = model_metrics['classification_report']
+    return pd.DataFrame({
+        'Precisão': [report[label]['precision'] for label in LABELS],
+        'Recall': [report[label]['recall'] for label in LABELS],
+        'F1-Score': [report[label]['f1-score'] for label in LABELS],
+        'Support': [int(report[label]['support']) for label in LABELS],
+    }, index=LABELS)
+
+def confusion_frame(model_metrics):
+    return pd.DataFrame(model_metrics['confusion_matrix'], index=LABELS, columns=LABELS)
+
+def _holdout(df_name, model):
+    # Treino final (conjunto balanceado, salvo no cache de utils.classification) e avaliação no conjunto de teste
+    from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+    split_data = balanced_split(df_name, FEATURES)
+    estimator = train_model(df_name, FEATURES, model)
+    y_test = split_data['y_test'].to_numpy()
+    y_pred = estimator.predict(split_data['X_test'])
+    return {
+        'test_accuracy': accuracy_score(y_test, y_pred),
+        'classification_report': classification_report(
+            y_test, y_pred, labels=list(range(len(LABELS))), target_names=LABELS, output_dict=True, zero_division=0),
+        'confusion_matrix': confusion_matrix(y_test, y_pred, labels=list(range(len(LABELS)))).tolist(),
+        'fit_seconds': getattr(estimator, 'fit_seconds_', None),
+    }
+
+def _fold(model, X, y, train_index, test_index):
+    # O SMOTE é aplicado só na parte de treino do fold, para que a validação não veja registros sintéticos
+    from imblearn.over_sampling import SMOTE
+    from sklearn.metrics import accuracy_score, f1_score
+    X_fold, y_fold = SMOTE(random_state=RANDOM_STATE).fit_resample(X.iloc[train_index], y.iloc[train_index])
+    estimator = make_estimator(model)
+    start = time.perf_counter()
+    fitted = estimator.fit(X_fold, y_fold)
+    fit_seconds = time.perf_counter() - start
+    y_pred = fitted.predict(X.iloc[test_index])
+    y_true = y.iloc[test_index].to_numpy()
+    return {
+        'accuracy': accuracy_score(y_true, y_pred),
+        'f1_macro': f1_score(y_true, y_pred, average='macro'),
+        'fit_seconds': fit_seconds,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validação cruzada e relatórios dos modelos de classificação.')
+    parser.add_argument('--dataset', default=DATASET)
+    parser.add_argument('--models', default=','.join(MODELS), help='modelos separados por vírgula')
+    parser.add_argument('--folds', type=int, default=N_FOLDS)
+    parser.add_argument('--jobs', type=int, default=-1, help='processos em paralelo (-1: todos os núcleos)')
+    parser.add_argument('--output', default=METRICS_PATH)
+    args = parser.parse_args(argv)
+
+    metrics = run(args.dataset, args.models.split(','), args.folds, args.jobs)
+    save(metrics, args.output)
+    for model, model_metrics in metrics['models'].items():
+        cv = model_metrics['cross_validation']
+        print(f"{model}: acerto no teste {model_metrics['test_accuracy']:.4f}; "
+              f"validação cruzada {cv['mean_accuracy']:.4f} ± {cv['std_accuracy']:.4f}")
+    print(f"Métricas gravadas em {args.output} ({metrics['elapsed_seconds']:.0f}s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+import argparse
+import json
+import os
+from contextlib import ExitStack
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from utils.data_utils import atomic_write, dataset_path
+from utils.spans import traced
+
+# Construção dos datasets derivados (data_cleaned, scaled_ e normalized_ACC_INTAKES_OUTCOMES) a partir do
+# ACC_INTAKES_OUTCOMES, seguindo a receita de utils/preprocess.ipynb. Os parâmetros ajustados (limites de outliers,
+# estatísticas dos scalers e vocabulários das colunas categóricas) ficam salvos em data/features_state.json, de modo
+# que novas linhas são transformadas com os mesmos parâmetros, sem reajustar nem recodificar o histórico. O estado
+# guarda também o número de linhas de cada dataset: se os arquivos não baterem com ele (gravação interrompida),
+# o append reconstrói os derivados antes de acrescentar as novas linhas.
+#   python -m utils.features build
+#   python -m utils.features append novas_linhas.parquet
+
+SOURCE = 'ACC_INTAKES_OUTCOMES'
+OUTPUTS = {
+    'cleaned': 'data_cleaned',
+    'scaled': f'scaled_{SOURCE}',
+    'normalized': f'normalized_{SOURCE}',
+}
+STATE_PATH = os.path.join('data', 'features_state.json')
+
+# Outliers (1,5 x IQR) removidos apenas destas colunas, na ordem
+OUTLIER_COLUMNS = ['outcome_hour', 'intake_hour']
+
+SCALE_COLUMNS = [
+    'dob_year',
+    'age_upon_intake_(days)',
+    'age_upon_intake_(years)',
+    'intake_month',
+    'intake_year',
+    'intake_number',
+    'age_upon_outcome_(days)',
+    'age_upon_outcome_(years)',
+    'outcome_month',
+    'outcome_year',
+    'outcome_number',
+    'time_in_shelter_days',
+]
+
+ONE_HOT_COLUMNS = [
+    'outcome_subtype',
+    'outcome_type',
+    'sex_upon_outcome',
+    'outcome_weekday',
+    'animal_type',
+    'intake_condition',
+    'intake_type',
+    'sex_upon_intake',
+    'intake_weekday',
+]
+
+LABEL_COLUMNS = ['age_upon_outcome_age_group', 'age_upon_intake_age_group']
+
+COLOR_GROUPS = {
+    'Black': ['Black', 'Black Smoke', 'Black Brindle', 'Black Tabby'],
+    'White': ['White', 'Cream', 'Cream Tabby', 'Silver', 'Silver Tabby', 'Silver Lynx Point'],
+    'Gray/Blue': ['Gray', 'Blue', 'Blue Tabby', 'Blue Smoke', 'Gray Tabby', 'Blue Cream', 'Blue Merle', 'Blue Point', 'Blue Tick'],
+    'Brown/Chocolate': ['Brown', 'Brown Tabby', 'Brown Brindle', 'Brown Merle', 'Brown Tiger', 'Chocolate', 'Chocolate Point', 'Liver Tick'],
+    'Yellow/Gold/Cream': ['Yellow', 'Yellow Brindle', 'Gold', 'Buff', 'Apricot', 'Tan', 'Fawn'],
+    'Red/Orange': ['Red', 'Red Merle', 'Red Tick', 'Flame Point', 'Orange', 'Orange Tabby', 'Orange Tiger'],
+    'Patterned': ['Tricolor', 'Torbie', 'Tortie', 'Tortie Point', 'Calico', 'Calico Point'],
+}
+OTHER_COLORS = 'Other_Colors'
+
+@traced
+def fit(raw):
+    # Ajusta todos os parâmetros da receita sobre o histórico completo
+    fences = {}
+    data = raw
+    for col in OUTLIER_COLUMNS:
+        # Como no notebook: os limites de cada coluna são calculados após filtrar as anteriores
+        q1, q3 = data[col].quantile(0.25), data[col].quantile(0.75)
+        fences[col] = [q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)]
+        data = data[data[col].between(*fences[col])]
+
+    return {
+        'fences': fences,
+        'standard': {col: [float(data[col].mean()), float(data[col].std(ddof=0))] for col in SCALE_COLUMNS},
+        'minmax': {col: [float(data[col].min()), float(data[col].max())] for col in SCALE_COLUMNS},
+        # Vocabulários sem o preenchimento; a largura reconstrói os nomes originais das colunas one-hot
+        'one_hot': {col: _vocabulary(data[col]) for col in ONE_HOT_COLUMNS},
+        'labels': {col: sorted(data[col].dropna().str.rstrip().unique().tolist()) for col in LABEL_COLUMNS},
+        'color_width': int(data['color'].str.len().max()),
+        'colors': sorted(color_category(processed_color(data['color'], int(data['color'].str.len().max()))).unique().tolist()),
+        'next_index': int(raw.index.max()) + 1 if len(raw) else 0,
+    }
+
+@traced
+def transform(raw, state):
+    # Aplica os parâmetros salvos às linhas dadas (o histórico completo ou apenas as novas)
+    cleaned = raw
+    for col, (low, high) in state['fences'].items():
+        cleaned = cleaned[cleaned[col].between(low, high)]
+    return {
+        'cleaned': cleaned,
+        'scaled': scaled(cleaned, state),
+        'normalized': _features(cleaned, state, 'normalized', _min_max, state['minmax']),
+    }
+
+def scaled(raw, state):
+    # Colunas do dataset padronizado para as linhas dadas, sem remover outliers (usado também para pontuar novos
+    # registros com os modelos de classificação)
+    return _features(raw, state, 'scaled', _standardize, state['standard'])
+
+def source_columns(columns):
+    # Colunas do dataset de origem necessárias para calcular as colunas derivadas dadas
+    sources = set()
+    for col in columns:
+        if col.endswith('_scaled') or col.endswith('_normalized'):
+            sources.add(col.rsplit('_', 1)[0])
+        elif col.endswith('_encoded'):
+            sources.add(col[:-len('_encoded')])
+        elif col == 'is_mix_breed':
+            sources.add('breed')
+        elif col == 'processed_color' or col.startswith('color_'):
+            sources.add('color')
+        else:
+            sources.update(source for source in ONE_HOT_COLUMNS if col.startswith(f'{source}_'))
+    return sorted(sources)
+
+def processed_color(color, width):
+    # 'A/A' -> 'A', 'A/B' -> 'multi'; calculado por valor distinto. O texto é comparado com o preenchimento
+    # original (width), como no notebook
+    def process(value):
+        value = value.ljust(width)
+        if '/' in value:
+            colors = value.split('/')
+            return colors[0].strip() if colors[0] == colors[1] else 'multi'
+        return value.strip()
+
+    return _per_value(color, process)
+
+def color_category(processed):
+    groups = {color: group for group, colors in COLOR_GROUPS.items() for color in colors}
+    return _per_value(processed, lambda value: groups.get(value.strip(), OTHER_COLORS))
+
+def build(source=SOURCE):
+    raw = pd.read_parquet(dataset_path(source))
+    state = fit(raw)
+    outputs = transform(raw, state)
+    state['rows'] = {source: len(raw), **{OUTPUTS[kind]: len(df) for kind, df in outputs.items()}}
+    with ExitStack() as stack:
+        state_tmp = stack.enter_context(atomic_write(STATE_PATH))
+        for kind, df in outputs.items():
+            _write(df, stack.enter_context(atomic_write(_output_path(OUTPUTS[kind]))))
+        _write_state(state, state_tmp)
+    return state
+
+def append(rows_path, source=SOURCE):
+    # Acrescenta novas linhas ao dataset de origem e aos derivados, transformando apenas essas linhas
+    state = load_state()
+    mismatched = _mismatched(state, source)
+    if mismatched:
+        print(f"Número de linhas diferente do registrado em {STATE_PATH} ({', '.join(mismatched)}): "
+              'reconstruindo os datasets derivados', flush=True)
+        state = build(source)
+    source_path = dataset_path(source)
+    rows = _read_rows(rows_path, pq.read_schema(source_path))
+    rows.index = pd.RangeIndex(state['next_index'], state['next_index'] + len(rows))
+    outputs = transform(rows, state)
+
+    state['next_index'] += len(rows)
+    state['rows'] = {source: _num_rows(source) + len(rows),
+                     **{OUTPUTS[kind]: _num_rows(OUTPUTS[kind]) + len(df) for kind, df in outputs.items()}}
+    # Todos os arquivos são gravados em temporários e só então renomeados, na ordem inversa da abertura: o
+    # estado, aberto primeiro, é o último a ser substituído. Uma falha em qualquer gravação não altera nenhum arquivo
+    with ExitStack() as stack:
+        state_tmp = stack.enter_context(atomic_write(STATE_PATH))
+        _append(source_path, rows, stack.enter_context(atomic_write(source_path)))
+        for kind, df in outputs.items():
+            path = dataset_path(OUTPUTS[kind])
+            _append(path, df, stack.enter_context(atomic_write(path)))
+        _write_state(state, state_tmp)
+    return len(rows), len(outputs['cleaned'])
+
+def load_state():
+    with open(STATE_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+def _features(cleaned, state, suffix, scale, stats):
+    columns = {f'{col}_{suffix}': scale(cleaned[col].astype('float64'), *stats[col]) for col in SCALE_COLUMNS}
+    df = pd.concat([cleaned, pd.DataFrame(columns, index=cleaned.index)], axis=1)
+
+    # One-hot na ordem do pd.get_dummies: as colunas originais saem e as indicadoras entram no final
+    dummies = {}
+    for col in ONE_HOT_COLUMNS:
+        vocabulary = state['one_hot'][col]
+        values = _per_value(cleaned[col], str.rstrip).to_numpy()
+        for value in vocabulary['values']:
+            dummies[f"{col}_{value.ljust(vocabulary['width'])}"] = values == value
+    df = pd.concat([df.drop(columns=ONE_HOT_COLUMNS), pd.DataFrame(dummies, index=cleaned.index)], axis=1)
+
+    for col in LABEL_COLUMNS:
+        # Valores fora do vocabulário salvo recebem -1
+        df[f'{col}_encoded'] = pd.Index(state['labels'][col]).get_indexer(_per_value(cleaned[col], str.rstrip)).astype('int32')
+    mix_breed = _per_value(cleaned['breed'], lambda value: 'mix' in value.lower() or '/' in value)
+    df['is_mix_breed'] = mix_breed.eq(True).astype('int32')
+    df['processed_color'] = processed_color(cleaned['color'], state['color_width'])
+
+    category = color_category(df['processed_color']).to_numpy()
+    colors = pd.DataFrame({f'color_{value}': category == value for value in state['colors']}, index=cleaned.index)
+    return pd.concat([df, colors], axis=1)
+
+def _standardize(x, mean, std):
+    return (x - mean) / (std or 1.0)
+
+def _min_max(x, low, high):
+    return (x - low) / ((high - low) or 1.0)
+
+def _output_path(df_name):
+    return os.path.join('data', f'{df_name}.parquet')
+
+def _vocabulary(series):
+    values = series.dropna()
+    return {
+        'values': sorted(values.str.rstrip().unique().tolist()),
+        'width': int(values.str.len().max()) if len(values) else 0,
+    }
+
+def _per_value(series, func):
+    # Aplica func uma vez por valor distinto e propaga para as linhas (as colunas de texto têm poucos valores
+    # distintos; aplicar por linha domina o custo da transformação)
+    codes, uniques = pd.factorize(series)
+    mapped = pd.Series([func(value) for value in uniques], dtype=object)
+    # O código -1 (valor ausente) não existe no índice e continua ausente
+    return pd.Series(mapped.reindex(codes).to_numpy(), index=series.index, name=series.name)
+
+def _read_rows(path, schema):
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    # CSV: as colunas numéricas seguem os tipos do dataset de origem
+    numeric = {field.name for field in schema if pa.types.is_integer(field.type) or pa.types.is_floating(field.type)}
+    rows = pd.read_csv(path, dtype=str, keep_default_na=False)
+    for col in numeric & set(rows.columns):
+        rows[col] = pd.to_numeric(rows[col])
+    return rows
+
+def _write(df, path):
+    df.to_parquet(path, engine='pyarrow')
+
+def _append(path, df, tmp_path):
+    # Grava em tmp_path o arquivo com os row groups existentes, copiados sem decodificá-los em pandas, e as novas
+    # linhas como um novo row group, no esquema do arquivo
+    existing = pq.ParquetFile(path)
+    schema = existing.schema_arrow
+    table = pa.Table.from_pandas(df, preserve_index=True).select(schema.names).cast(schema)
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        for i in range(existing.num_row_groups):
+            writer.write_table(existing.read_row_group(i))
+        writer.write_table(table)
+
+def _num_rows(df_name):
+    return pq.ParquetFile(dataset_path(df_name)).metadata.num_rows
+
+def _mismatched(state, source):
+    # Datasets cujo número de linhas difere do registrado no estado (estados antigos, sem o registro, não são
+    # verificados)
+    return [name for name, rows in state.get('rows', {}).items()
+            if name in (source, *OUTPUTS.values()) and (not os.path.exists(_output_path(name)) or _num_rows(name) != rows)]
+
+def _write_state(state, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Constrói os datasets derivados (limpo, padronizado e normalizado).')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help='ajusta a receita sobre todo o histórico e grava os três datasets')
+    build_parser.add_argument('--source', default=SOURCE)
+    append_parser = subparsers.add_parser('append', help='transforma apenas as novas linhas, com os parâmetros salvos')
+    append_parser.add_argument('rows', help='arquivo .parquet ou .csv com as novas linhas')
+    append_parser.add_argument('--source', default=SOURCE)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        state = build(args.source)
+        print(f"Datasets derivados gravados; parâmetros salvos em {STATE_PATH} ({state['next_index']} linhas de origem)")
+    else:
+        added, kept = append(args.rows, args.source)
+        print(f'{added} linhas acrescentadas ao dataset de origem; {kept} mantidas após a remoção de outliers')
+
+if __name__ == '__main__':
+    main()
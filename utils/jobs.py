@@ -0,0 +1,164 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from utils.classification import balanced_split, evaluate, train_model
+
+# Fila de treinos da página de classificação, compartilhada por todas as sessões do servidor. Cada treino roda em
+# um processo próprio (python -m utils.jobs; no máximo TRAINING_WORKERS ao mesmo tempo), fora da thread do script do
+# Streamlit, e informa as etapas concluídas pela saída padrão; o resultado fica no cache em disco de
+# utils.classification. Pedidos idênticos de sessões diferentes usam o mesmo
+# treino, que só é cancelado quando nenhuma sessão o aguarda mais.
+
+MAX_WORKERS = int(os.environ.get('TRAINING_WORKERS', 2))
+# Sessões que param de consultar o treino (aba fechada) deixam de contar depois deste intervalo
+STALE_SECONDS = 30
+
+STAGES = [
+    'Na fila',
+    'Dividindo os dados e balanceando o treino (SMOTE)',
+    'Treinando o modelo',
+    'Avaliando o modelo',
+    'Concluído',
+]
+
+PENDING, RUNNING, DONE, FAILED, CANCELLED = 'pending', 'running', 'done', 'failed', 'cancelled'
+
+_lock = threading.Lock()
+_jobs = {}
+
+def job_key(df_name, columns, algorithm):
+    return (df_name, tuple(columns), algorithm)
+
+def submit(df_name, columns, algorithm, session):
+    # Enfileira o treino, ou inscreve a sessão no treino idêntico que já está na fila ou rodando
+    key = job_key(df_name, columns, algorithm)
+    with _lock:
+        job = _jobs.get(key)
+        if job is None or job['state'] in (FAILED, CANCELLED):
+            job = {
+                'state': PENDING,
+                'stage': 0,
+                'sessions': {},
+                'submitted': time.time(),
+                'started': None,
+                'error': None,
+                'process': None,
+            }
+            _jobs[key] = job
+        job['sessions'][session] = time.time()
+        _update()
+    return key
+
+def status(key, session=None):
+    # Consulta feita pela página a cada segundo; também renova a inscrição da sessão
+    with _lock:
+        job = _jobs.get(key)
+        if job is None:
+            return None
+        if session in job['sessions']:
+            job['sessions'][session] = time.time()
+        _update()
+        pending = [k for k, j in _jobs.items() if j['state'] == PENDING]
+        return {
+            'state': job['state'],
+            'stage': job['stage'],
+            'progress': job['stage'] / (len(STAGES) - 1),
+            'description': STAGES[job['stage']],
+            'position': pending.index(key) + 1 if key in pending else None,
+            'elapsed': time.time() - (job['started'] or job['submitted']),
+            'sessions': len(job['sessions']),
+            'error': job['error'],
+        }
+
+def release(key, session):
+    # A sessão não aguarda mais o treino (entradas alteradas ou cancelamento); sem sessões, o treino é cancelado
+    with _lock:
+        job = _jobs.get(key)
+        if job is None:
+            return
+        job['sessions'].pop(session, None)
+        _update()
+
+def _update():
+    # Chamado com _lock: cancela treinos sem sessões e inicia os da fila
+    now = time.time()
+    for key, job in list(_jobs.items()):
+        if job['state'] in (PENDING, RUNNING):
+            job['sessions'] = {s: seen for s, seen in job['sessions'].items() if now - seen < STALE_SECONDS}
+            if not job['sessions']:
+                _cancel(job)
+        if job['state'] in (DONE, FAILED, CANCELLED):
+            # O resultado está no cache em disco; a entrada só é mantida enquanto alguma sessão a consulta
+            job['sessions'] = {s: seen for s, seen in job['sessions'].items() if now - seen < STALE_SECONDS}
+            if not job['sessions']:
+                del _jobs[key]
+
+    running = sum(job['state'] == RUNNING for job in _jobs.values())
+    for key, job in sorted(_jobs.items(), key=lambda item: item[1]['submitted']):
+        if running >= MAX_WORKERS:
+            break
+        if job['state'] == PENDING:
+            _start(key, job)
+            running += 1
+
+def _start(key, job):
+    df_name, columns, algorithm = key
+    process = subprocess.Popen([sys.executable, '-m', 'utils.jobs', json.dumps([df_name, list(columns), algorithm])],
+                               stdout=subprocess.PIPE, text=True)
+    job.update(state=RUNNING, stage=1, started=time.time(), process=process)
+    threading.Thread(target=_follow, args=(job, process), daemon=True).start()
+
+def _follow(job, process):
+    # Lê as etapas informadas pelo processo de treino até ele terminar
+    for line in process.stdout:
+        kind, _, value = line.rstrip('\n').partition(' ')
+        with _lock:
+            if kind == 'stage':
+                job['stage'] = int(value)
+            elif kind == 'error':
+                job['error'] = value
+    process.wait()
+    with _lock:
+        if job['state'] == RUNNING:
+            if job['stage'] == len(STAGES) - 1:
+                job['state'] = DONE
+            else:
+                job['state'] = FAILED
+                job['error'] = job['error'] or f'O processo de treino terminou inesperadamente (código {process.returncode}).'
+        job['process'] = None
+        _update()
+
+def _cancel(job):
+    if job['process'] is not None:
+        job['process'].terminate()
+    job.update(state=CANCELLED, process=None)
+
+def _run(df_name, columns, algorithm):
+    # Processo de treino: cada etapa grava seu resultado no cache em disco, e a página carrega o relatório de lá
+    try:
+        balanced_split(df_name, columns)
+        _report('stage', 2)
+        train_model(df_name, columns, algorithm)
+        _report('stage', 3)
+        evaluate(df_name, columns, algorithm)
+        _report('stage', len(STAGES) - 1)
+    except Exception as error:
+        # A mensagem vai para a página; o traceback fica no log do servidor (stderr)
+        traceback.print_exc()
+        _report('error', f'{type(error).__name__}: {error}')
+        sys.exit(1)
+
+def _report(kind, value):
+    try:
+        print(kind, value, flush=True)
+    except BrokenPipeError:
+        # Ninguém lê mais a saída (servidor encerrado): termina sem outro erro ao fechar a saída padrão
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+
+if __name__ == '__main__':
+    _run(*json.loads(sys.argv[1]))
@@ -0,0 +1,99 @@
+import pandas as pd
+
+# Colunas categóricas do dataset ACC_INTAKES_OUTCOMES. São armazenadas (e lidas) como colunas de dicionário,
+# com as categorias sem os espaços de preenchimento do dado original ('Adoption       ' -> 'Adoption').
+CATEGORICAL_COLUMNS = [
+    'animal_type',
+    'outcome_type',
+    'intake_type',
+    'intake_condition',
+    'sex_upon_intake',
+    'sex_upon_outcome',
+    'age_upon_intake_age_group',
+    'age_upon_outcome_age_group',
+]
+
+AGE_GROUP_ORDER = [
+    '(-0.025, 2.5', '(2.5, 5.0]', '(5.0, 7.5]', '(7.5, 10.0]', '(10.0, 12.5]',
+    '(12.5, 15.0]', '(15.0, 17.5]', '(17.5, 20.0]', '(20.0, 22.5]', '(22.5, 25.0]'
+]
+
+# Ordem das categorias, para colunas ordinais
+ORDERS = {
+    'age_upon_intake_age_group': AGE_GROUP_ORDER,
+    'age_upon_outcome_age_group': AGE_GROUP_ORDER,
+}
+
+AGE_GROUP_LABELS = {
+    '(-0.025, 2.5': '0 - 2.5',
+    '(2.5, 5.0]': '2.5 - 5.0',
+    '(5.0, 7.5]': '5.0 - 7.5',
+    '(7.5, 10.0]': '7.5 - 10.0',
+    '(10.0, 12.5]': '10.0 - 12.5',
+    '(12.5, 15.0]': '12.5 - 15.0',
+    '(15.0, 17.5]': '15.0 - 17.5',
+    '(17.5, 20.0]': '17.5 - 20.0',
+    '(20.0, 22.5]': '20.0 - 22.5',
+    '(22.5, 25.0]': '22.5 - 25.0'
+}
+
+# Tabela única de tradução dos rótulos para exibição
+LABELS = {
+    'animal_type': {
+        'Bir': 'Pássaro', 'Cat': 'Gato', 'Dog': 'Cachorro', 'Oth': 'Outros'
+    },
+    'outcome_type': {
+        'Adoption': 'Adoção', 'Died': 'Morto', 'Euthanasia': 'Eutanásia',
+        'Missing': 'Desaparecido', 'Return to Owner': 'Devolvido ao tutor(a)', 'Transfer': 'Transferido'
+    },
+    'intake_type': {
+        'Euthanasia Request': 'Pedido de Eutanásia', 'Owner Surrender': 'Entrega Voluntária',
+        'Public Assist': 'Assistência Pública', 'Stray': 'Animal de Rua', 'Wildlife': 'Vida Selvagem'
+    },
+    'intake_condition': {
+        'Aged': 'Idoso', 'Feral': 'Feroz', 'Injured': 'Machucado', 'Normal': 'Normal',
+        'Nursing': 'Amamentando', 'Other': 'Outros', 'Pregnan': 'Grávida', 'Sick': 'Doente'
+    },
+    'age_upon_intake_age_group': AGE_GROUP_LABELS,
+    'age_upon_outcome_age_group': AGE_GROUP_LABELS,
+}
+
+def translate(series, column=None):
+    # Traduz as categorias, e não as linhas: o custo é proporcional ao número de categorias
+    mapping = LABELS.get(column or series.name, {})
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype('category')
+    series = series.cat.rename_categories(mapping)
+    if not series.cat.ordered:
+        # Mantém a ordem alfabética dos rótulos traduzidos (a mesma de um groupby sobre o texto)
+        series = series.cat.reorder_categories(sorted(series.cat.categories))
+    return series
+
+def prepare_categoricals(df):
+    # Remove o preenchimento das categorias e aplica a ordem das colunas ordinais (custo O(categorias))
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = _ordered(_trimmed(df[col]), ORDERS.get(col))
+    return df
+
+def _trimmed(series):
+    categories = series.cat.categories
+    if not pd.api.types.is_string_dtype(categories):
+        return series
+    stripped = categories.str.strip()
+    if stripped.equals(categories):
+        return series
+    if stripped.is_unique:
+        return series.cat.rename_categories(stripped)
+    # Categorias que ficam iguais após remover o preenchimento são unificadas
+    new_categories = pd.Index(stripped.unique())
+    codes = new_categories.get_indexer(stripped)[series.cat.codes.to_numpy()]
+    codes[series.cat.codes.to_numpy() < 0] = -1
+    return pd.Series(pd.Categorical.from_codes(codes, new_categories), index=series.index, name=series.name)
+
+def _ordered(series, order):
+    if order is None:
+        return series
+    categories = list(series.cat.categories)
+    new_order = [c for c in order if c in categories] + [c for c in categories if c not in order]
+    return series.cat.reorder_categories(new_order, ordered=True)
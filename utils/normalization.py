@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+# Normalização de rótulos derivados (gênero, castração, ...) calculada uma vez por valor distinto
+# e propagada para as linhas pelos códigos da coluna categórica, sem laços Python por registro.
+
+GENDER_FEMALE = 'Fêmea'
+GENDER_MALE = 'Macho'
+UNKNOWN = 'Desconhecido'
+
+NEUTERED = 'Castrado(a)'
+INTACT = 'Não castrado(a)'
+
+def gender_of(value):
+    value = value.lower()
+    if 'female' in value:
+        return GENDER_FEMALE
+    if 'male' in value:
+        return GENDER_MALE
+    return UNKNOWN
+
+def neuter_status_of(value):
+    value = value.lower()
+    if 'neutered' in value or 'spayed' in value:
+        return NEUTERED
+    if 'intact' in value:
+        return INTACT
+    return UNKNOWN
+
+def derive(series, func):
+    # Aplica func a cada categoria distinta (O(categorias)) e remapeia os códigos das linhas (vetorizado)
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype('category')
+    derived = [func(value) for value in series.cat.categories]
+    categories = pd.Index(sorted(set(derived)))
+    remap = np.append(categories.get_indexer(derived), -1)  # o código -1 (valor ausente) continua ausente
+    new_codes = remap[series.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(new_codes, categories), index=series.index, name=series.name)
+
+def gender(series):
+    return derive(series, gender_of)
+
+def neuter_status(series):
+    return derive(series, neuter_status_of)
+
+def sex_dimensions(series):
+    # Todas as dimensões derivadas de uma coluna sex_upon_*
+    return pd.DataFrame({
+        'gender': gender(series),
+        'neuter_status': neuter_status(series),
+    }, index=series.index)
@@ -1,6 +1,8 @@
 import pandas as pd
 import streamlit as st
-from utils.data_utils import read_df
+from utils.data_utils import read_df, read_table
+from utils.spans import span
+from utils.table_view import PAGE_SIZES, categories, column_kind, page_count, page_frame, value_range, view_indices
 from st_pages import Page, show_pages, add_page_title
 
 
@@ -19,9 +21,52 @@ show_pages(
         Page("pages/grafico4.py", "EDA - Radar de Entradas e Saídas por meses", "📊"),
     ]
 )
-def build_dataframe_section(df:pd.DataFrame):
+def build_dataframe_section(df_name='ACC_INTAKES_OUTCOMES'):
     st.write('<h2>Dados do Centro de Animal de Austin</h2>', unsafe_allow_html=True)
-    st.dataframe(df)
+
+    # Filtro, ordenação e paginação são feitos no servidor: só a página exibida é enviada ao navegador
+    table = read_table(df_name)
+    names = table.column_names
+    none = '(nenhuma)'
+
+    with st.expander('Filtrar, ordenar e escolher colunas'):
+        filter_column = st.selectbox('Filtrar pela coluna', [none] + names, key='viewer_filter_column')
+        condition = None
+        if filter_column != none:
+            kind = column_kind(table, filter_column)
+            if kind == 'category':
+                selected = st.multiselect('Valores', categories(table, filter_column), key='viewer_filter_values')
+                condition = {'values': selected} if selected else None
+            elif kind == 'number':
+                low, high = value_range(table, filter_column)
+                if low is not None and low < high:
+                    condition = {'range': st.slider('Intervalo', low, high, (low, high), key='viewer_filter_range')}
+            else:
+                text = st.text_input('Contém', key='viewer_filter_text')
+                condition = {'contains': text} if text else None
+
+        sort_column = st.selectbox('Ordenar por', [none] + names, key='viewer_sort_column')
+        descending = st.checkbox('Ordem decrescente', key='viewer_sort_descending')
+        columns = st.multiselect('Colunas exibidas', names, default=names, key='viewer_columns') or names
+
+    indices = view_indices(df_name, table,
+                           sort_column=None if sort_column == none else sort_column, descending=descending,
+                           filter_column=None if filter_column == none else filter_column, condition=condition)
+    total = len(indices)
+
+    col_size, col_page = st.columns(2)
+    page_size = col_size.selectbox('Linhas por página', PAGE_SIZES, key='viewer_page_size')
+    pages = page_count(total, page_size)
+    # Um filtro ou tamanho de página novo pode reduzir o número de páginas: a página guardada na sessão volta para
+    # o intervalo válido antes de o campo ser criado
+    if st.session_state.get('viewer_page', 1) > pages:
+        st.session_state['viewer_page'] = pages
+    page_number = col_page.number_input(f'Página (de {pages})', min_value=1, max_value=pages, key='viewer_page')
+
+    df_page = page_frame(table, indices, min(page_number, pages), page_size, columns)
+    with span('dataframe'):
+        st.dataframe(df_page)
+    st.write(f'{total} registros')
 
 
 def read_ACC_df() -> pd.DataFrame:
@@ -0,0 +1,108 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from utils.classification import FEATURE_GROUPS, LABEL_MAPPING, TARGET_COLUMNS, selected_columns, train_model
+from utils.data_utils import dataset_path
+from utils.features import LABEL_COLUMNS, ONE_HOT_COLUMNS, SCALE_COLUMNS, SOURCE, load_state, scaled, source_columns
+from utils.spans import traced
+
+# Pontuação em lote de novos registros com um modelo salvo da página de classificação. As linhas de entrada
+# (.parquet ou .csv, no formato do ACC_INTAKES_OUTCOMES) são lidas em blocos, transformadas com os parâmetros de
+# data/features_state.json e gravadas com a classe prevista e as probabilidades de cada classe:
+#   python -m utils.scoring novas_entradas.parquet previsoes.parquet --algorithm "Random Forest"
+
+DATASET = 'scaled_ACC_INTAKES_OUTCOMES'
+CHUNK_SIZE = 50_000
+LABELS = [LABEL_MAPPING[col] for col in TARGET_COLUMNS]
+# Colunas de identificação copiadas da entrada para a saída, quando existirem
+ID_COLUMNS = ['animal_id_intake', 'intake_datetime']
+# Colunas de origem lidas pela transformação (as que o modelo não usa podem faltar na entrada)
+TRANSFORM_COLUMNS = SCALE_COLUMNS + ONE_HOT_COLUMNS + LABEL_COLUMNS + ['breed', 'color']
+# Grupos que só são conhecidos na saída do animal: um registro novo (na entrada) não tem esses valores, e usá-los
+# vazaria o desfecho. Ficam fora do padrão; passados em `groups`, a entrada precisa trazer as colunas de saída
+OUTCOME_GROUPS = ['Idade no momento de saída', 'Ano de saída', 'Dias no abrigo', 'Sexo do animal na saída',
+                  'Dia da semana na saída']
+INTAKE_GROUPS = [group for group in FEATURE_GROUPS if group not in OUTCOME_GROUPS]
+
+def load_model(algorithm, groups=None):
+    # Modelo do cache em disco de utils.classification (treinado e salvo na primeira vez); por padrão, com as
+    # características conhecidas na entrada do animal
+    columns = selected_columns(FEATURE_GROUPS, groups or INTAKE_GROUPS)
+    return train_model(DATASET, columns, algorithm), columns
+
+@traced
+def feature_frame(rows, columns, state):
+    # Colunas do modelo calculadas a partir das linhas no formato do dataset de origem
+    missing = [col for col in source_columns(columns) if col not in rows.columns]
+    if missing:
+        raise ValueError(f'Colunas ausentes na entrada: {missing}')
+    rows = rows.copy()
+    for col in TRANSFORM_COLUMNS:
+        if col not in rows.columns:
+            rows[col] = pd.Series(None, index=rows.index, dtype=object)
+    return scaled(rows, state)[columns]
+
+@traced
+def predict_frame(model, columns, rows, state):
+    # Classe prevista (e probabilidades, se o modelo as fornecer) para as linhas do dataset de origem
+    X = feature_frame(rows, columns, state)
+    result = pd.DataFrame({col: rows[col].to_numpy() for col in ID_COLUMNS if col in rows.columns}, index=rows.index)
+    result['predicted_outcome'] = np.asarray(LABELS)[model.predict(X)]
+    if hasattr(model, 'predict_proba'):
+        probabilities = model.predict_proba(X).astype(np.float32)
+        for code, column in zip(model.classes_, probabilities.T):
+            result[f'probability_{LABELS[code]}'] = column
+    return result
+
+def score(input_path, output_path, algorithm, groups=None, chunk_size=CHUNK_SIZE):
+    model, columns = load_model(algorithm, groups)
+    state = load_state()
+    schema = pq.read_schema(dataset_path(SOURCE))
+    rows = 0
+    writer = None
+    start = time.perf_counter()
+    try:
+        for chunk in _chunks(input_path, chunk_size, schema):
+            table = pa.Table.from_pandas(predict_frame(model, columns, chunk, state), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, table.schema)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    elapsed = time.perf_counter() - start
+    return {'rows': rows, 'seconds': elapsed, 'rows_per_second': rows / elapsed if elapsed > 0 else 0.0}
+
+def _chunks(path, chunk_size, schema):
+    if path.endswith('.parquet'):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+        return
+    # CSV: as colunas numéricas seguem os tipos do dataset de origem
+    numeric = {field.name for field in schema if pa.types.is_integer(field.type) or pa.types.is_floating(field.type)}
+    for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_size):
+        for col in numeric & set(chunk.columns):
+            chunk[col] = pd.to_numeric(chunk[col])
+        yield chunk
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Prevê o desfecho (outcome_type) de novos registros com um modelo salvo.')
+    parser.add_argument('input', help='arquivo .parquet ou .csv no formato do ACC_INTAKES_OUTCOMES')
+    parser.add_argument('output', help='arquivo .parquet com as previsões')
+    parser.add_argument('--algorithm', default='Random Forest')
+    parser.add_argument('--groups', help='grupos de características separados por vírgula (padrão: os conhecidos na '
+                                         'entrada; grupos da saída exigem as colunas de saída na entrada)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='linhas por bloco')
+    args = parser.parse_args(argv)
+
+    groups = args.groups.split(',') if args.groups else None
+    result = score(args.input, args.output, args.algorithm, groups, args.chunk_size)
+    print(f"{result['rows']} linhas pontuadas em {result['seconds']:.1f}s ({result['rows_per_second']:.0f} linhas/s); "
+          f"previsões gravadas em {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from utils.classification import ALGORITHMS
+from utils.data_utils import dataset_path
+from utils.features import SOURCE, load_state, source_columns
+from utils.scoring import LABELS, feature_frame, load_model
+
+# Serviço HTTP local de previsão do desfecho de um animal, com os modelos da página de classificação carregados na
+# inicialização. Requisições simultâneas ao mesmo modelo são agrupadas (micro-lotes de até MAX_BATCH registros,
+# esperando no máximo MAX_WAIT_SECONDS) em uma única chamada a predict_proba, e as características já calculadas
+# de um registro ficam em cache:
+#   python -m utils.service --algorithms "Random Forest,XGBoost"
+#   curl -X POST localhost:8502/predict -d '{"algorithm": "Random Forest", "record": {"animal_type": "Dog", ...}}'
+
+HOST = '127.0.0.1'
+PORT = 8502
+MAX_BATCH = 64
+MAX_WAIT_SECONDS = 0.002
+TRANSFORM_CACHE_SIZE = 10_000
+
+_models = {}
+
+def load(algorithms, groups=None, max_batch=MAX_BATCH):
+    # Carrega os modelos e inicia, para cada um, a thread que agrupa as requisições
+    state = load_state()
+    for algorithm in algorithms:
+        model, columns = load_model(algorithm, groups)
+        entry = {
+            'model': model,
+            'columns': columns,
+            'fields': source_columns(columns),
+            'state': state,
+            'requests': queue.Queue(),
+            'max_batch': max_batch,
+            'cache': OrderedDict(),
+        }
+        # Primeira previsão feita na carga, com um registro do dataset de origem, para aquecer o modelo
+        _predict(entry, _features(entry, example_records(entry['fields'], 1)))
+        threading.Thread(target=_batch_loop, args=(entry,), daemon=True).start()
+        _models[algorithm] = entry
+
+def example_records(fields, n):
+    # Primeiros n registros do dataset de origem, só com os campos dados
+    batch = next(pq.ParquetFile(dataset_path(SOURCE)).iter_batches(batch_size=n, columns=fields))
+    return batch.to_pylist()
+
+def predict(algorithm, record):
+    # Enfileira o registro no micro-lote do modelo e espera a resposta
+    entry = _models[algorithm]
+    missing = [field for field in entry['fields'] if field not in record]
+    if missing:
+        raise ValueError(f'Campos ausentes: {missing}')
+    request = {'record': record, 'done': threading.Event(), 'result': None, 'error': None}
+    entry['requests'].put(request)
+    request['done'].wait()
+    if request['error'] is not None:
+        raise request['error']
+    return request['result']
+
+def _batch_loop(entry):
+    while True:
+        batch = [entry['requests'].get()]
+        deadline = time.perf_counter() + MAX_WAIT_SECONDS
+        while len(batch) < entry['max_batch']:
+            try:
+                batch.append(entry['requests'].get(timeout=max(0.0, deadline - time.perf_counter())))
+            except queue.Empty:
+                break
+        try:
+            _answer(entry, batch)
+        except Exception:
+            # Um registro inválido não pode derrubar os demais do lote: cada requisição é refeita sozinha e só as
+            # que falharem recebem o erro
+            for request in batch:
+                try:
+                    _answer(entry, [request])
+                except Exception as error:
+                    request['error'] = error
+        for request in batch:
+            request['done'].set()
+
+def _answer(entry, batch):
+    X = _features(entry, [request['record'] for request in batch])
+    for request, result in zip(batch, _predict(entry, X)):
+        request['result'] = result
+
+def _features(entry, records):
+    # Linhas já calculadas vêm do cache (chave: valores dos campos usados pelo modelo); as demais são transformadas
+    # juntas, em uma única chamada
+    keys = [tuple(_hashable(record.get(field)) for field in entry['fields']) for record in records]
+    cache = entry['cache']
+    missing = [i for i, key in enumerate(keys) if key not in cache]
+    if missing:
+        X = feature_frame(pd.DataFrame([records[i] for i in missing]), entry['columns'], entry['state'])
+        for i, row in zip(missing, X.to_numpy(dtype=np.float64)):
+            cache[keys[i]] = row
+            if len(cache) > TRANSFORM_CACHE_SIZE:
+                cache.popitem(last=False)
+    for key in keys:
+        cache.move_to_end(key)
+    # Tudo em float64: os modelos dão as mesmas probabilidades que com as colunas booleanas originais, e o
+    # DataFrame é montado com um único bloco
+    return pd.DataFrame(np.vstack([cache[key] for key in keys]), columns=entry['columns'])
+
+def _predict(entry, X):
+    model = entry['model']
+    if hasattr(model, 'predict_proba'):
+        probabilities = model.predict_proba(X)
+        return [{
+            'predicted_outcome': LABELS[model.classes_[row.argmax()]],
+            'probabilities': {LABELS[code]: float(p) for code, p in zip(model.classes_, row)},
+        } for row in probabilities]
+    return [{'predicted_outcome': LABELS[code], 'probabilities': None} for code in model.predict(X)]
+
+def _hashable(value):
+    return json.dumps(value) if isinstance(value, (list, dict)) else value
+
+class Server(ThreadingHTTPServer):
+    # Fila de conexões maior que o padrão (5), para rajadas de clientes simultâneos
+    request_queue_size = 128
+    daemon_threads = True
+
+class Handler(BaseHTTPRequestHandler):
+    # Conexões persistentes (keep-alive) entre requisições do mesmo cliente
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path != '/info':
+            return self._send(404, {'error': 'Rota não encontrada'})
+        self._send(200, {algorithm: {'fields': entry['fields'], 'columns': entry['columns']}
+                         for algorithm, entry in _models.items()})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            return self._send(404, {'error': 'Rota não encontrada'})
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            # Corpo e registro precisam ser objetos JSON; outros tipos seriam erros do cliente, não do serviço
+            if not isinstance(body, dict):
+                return self._send(400, {'error': 'O corpo da requisição deve ser um objeto JSON'})
+            if not isinstance(body.get('record'), dict):
+                return self._send(400, {'error': "O campo 'record' deve ser um objeto JSON com as colunas do registro"})
+            algorithm = body.get('algorithm', next(iter(_models)))
+            if algorithm not in _models:
+                return self._send(400, {'error': f'Modelo não carregado: {algorithm}'})
+            self._send(200, predict(algorithm, body['record']))
+        except (ValueError, KeyError, TypeError) as error:
+            self._send(400, {'error': str(error)})
+        except Exception as error:
+            self._send(500, {'error': f'{type(error).__name__}: {error}'})
+
+    def log_message(self, format, *args):
+        # Sem um registro por requisição
+        pass
+
+    def _send(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serviço HTTP local de previsão do desfecho (outcome_type).')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--algorithms', default='Random Forest', help=f"separados por vírgula, entre: {', '.join(ALGORITHMS)}")
+    parser.add_argument('--groups', help='grupos de características separados por vírgula (padrão: os conhecidos na '
+                                         'entrada; grupos da saída exigem as colunas de saída no registro)')
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH, help='registros por micro-lote (1: sem agrupamento)')
+    args = parser.parse_args(argv)
+
+    groups = args.groups.split(',') if args.groups else None
+    load(args.algorithms.split(','), groups, args.max_batch)
+    server = Server((args.host, args.port), Handler)
+    print(f'Servindo {args.algorithms} em http://{args.host}:{args.port} (POST /predict, GET /info)', flush=True)
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import numpy as np
+from utils.spans import traced
+
+# Silhueta a partir de rótulos já calculados. As distâncias são calculadas em blocos de linhas, de modo que a
+# memória fica limitada a CHUNK_BYTES independentemente do número de registros. No modo por amostragem, só uma
+# amostra estratificada por cluster é avaliada (cada valor ainda é exato, contra o dataset inteiro) e a média
+# é reportada com intervalo de confiança.
+
+CHUNK_BYTES = 64 * 1024 * 1024
+SAMPLE_SIZE = 2000
+CURVE_POINTS = 200
+Z_95 = 1.959963984540054
+RANDOM_STATE = 42
+
+def silhouette_values(X, labels, rows=None, chunk_bytes=CHUNK_BYTES):
+    # Silhueta exata das linhas `rows` (por padrão, todas) em relação a todos os pontos de X
+    from sklearn.metrics.pairwise import euclidean_distances
+    clusters, labels = np.unique(np.asarray(labels), return_inverse=True)
+    counts = np.bincount(labels, minlength=len(clusters))
+    rows = np.arange(len(X)) if rows is None else np.asarray(rows)
+
+    one_hot = np.zeros((len(X), len(clusters)))
+    one_hot[np.arange(len(X)), labels] = 1
+
+    chunk_size = max(1, chunk_bytes // (8 * max(len(X), 1)))
+    values = np.empty(len(rows))
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        positions = np.arange(len(chunk))
+        distances = euclidean_distances(X[chunk], X)
+        distances[positions, chunk] = 0
+        # Soma das distâncias de cada linha do bloco a cada cluster
+        sums = distances @ one_hot
+        own = labels[chunk]
+        a = sums[positions, own] / np.maximum(counts[own] - 1, 1)
+        sums[positions, own] = np.inf
+        b = (sums / counts).min(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            s = np.nan_to_num((b - a) / np.maximum(a, b))
+        # Convenção usual: pontos sozinhos no cluster têm silhueta 0
+        s[counts[own] == 1] = 0
+        values[start:start + chunk_size] = s
+    return values
+
+@traced
+def silhouette_exact(X, labels, chunk_bytes=CHUNK_BYTES):
+    labels = np.asarray(labels)
+    values = silhouette_values(X, labels, chunk_bytes=chunk_bytes)
+    clusters = np.unique(labels)
+    average = float(values.mean())
+    return {
+        'average': average,
+        'ci': (average, average),
+        'evaluated': len(values),
+        'clusters': clusters,
+        'sizes': np.array([np.count_nonzero(labels == c) for c in clusters]),
+        'values': [values[labels == c] for c in clusters],
+    }
+
+@traced
+def silhouette_estimate(X, labels, sample_size=SAMPLE_SIZE, z=Z_95, chunk_bytes=CHUNK_BYTES, random_state=RANDOM_STATE):
+    # Amostragem estratificada com alocação proporcional ao tamanho de cada cluster (no mínimo 2 pontos por cluster)
+    labels = np.asarray(labels)
+    clusters, sizes = np.unique(labels, return_counts=True)
+    allocation = np.minimum(sizes, np.maximum(2, np.round(sample_size * sizes / sizes.sum()).astype(int)))
+    rng = np.random.default_rng(random_state)
+    samples = [rng.choice(np.flatnonzero(labels == c), m, replace=False) for c, m in zip(clusters, allocation)]
+
+    rows = np.concatenate(samples)
+    values = silhouette_values(X, labels, rows=rows, chunk_bytes=chunk_bytes)
+    values = np.split(values, np.cumsum(allocation)[:-1])
+
+    # Média estratificada e sua variância, com correção para população finita
+    weights = sizes / sizes.sum()
+    average = float(sum(w * v.mean() for w, v in zip(weights, values)))
+    variance = sum(
+        w ** 2 * (1 - m / n) * v.var(ddof=1) / m
+        for w, v, m, n in zip(weights, values, allocation, sizes) if m > 1
+    )
+    margin = z * float(np.sqrt(variance))
+    return {
+        'average': average,
+        'ci': (average - margin, average + margin),
+        'evaluated': len(rows),
+        'clusters': clusters,
+        'sizes': sizes,
+        'values': values,
+    }
+
+def silhouette_curve(values, size, points=CURVE_POINTS):
+    # Curva ordenada da silhueta de um cluster, reduzida a no máximo `points` quantis e posicionada
+    # na escala do tamanho do cluster (size), para que a altura de cada faixa continue proporcional
+    values = np.sort(values)
+    if len(values) <= points:
+        quantiles = np.linspace(0, 1, len(values))
+        x = values
+    else:
+        quantiles = np.linspace(0, 1, points)
+        x = np.quantile(values, quantiles)
+    return x, quantiles * max(size - 1, 0)
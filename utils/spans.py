@@ -0,0 +1,257 @@
+import atexit
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager, nullcontext
+
+# Medição das etapas das páginas e dos utilitários (leitura dos dados, transformações, KMeans, SMOTE, ajuste dos
+# modelos, serialização dos gráficos): tempo de relógio, tempo de CPU da thread e bytes alocados por etapa.
+#   with span('plotly_chart'):
+#       st.plotly_chart(fig)
+#
+#   @traced
+#   def read_df(...):
+#
+# Desligada por padrão. Com SPANS_FILE, as etapas são gravadas em JSON lines (um registro por etapa, com rotação
+# do arquivo) ou, se o arquivo terminar em .prom, em texto do Prometheus (totais acumulados por página e etapa).
+# Com SPANS_PANEL=1, a barra lateral mostra as etapas da execução atual da página. Desligada, span() devolve um
+# contexto vazio e traced devolve a própria função.
+
+SPANS_FILE = os.environ.get('SPANS_FILE')
+PANEL = os.environ.get('SPANS_PANEL', '0') == '1'
+ENABLED = bool(SPANS_FILE) or PANEL
+# Bytes alocados medidos pelo tracemalloc (inclui os arrays do numpy); SPANS_MEMORY=0 mede só os tempos
+TRACE_MEMORY = ENABLED and os.environ.get('SPANS_MEMORY', '1') == '1'
+# Tamanho a partir do qual o arquivo JSON lines é rotacionado (arquivo.1, arquivo.2, ...)
+MAX_BYTES = int(os.environ.get('SPANS_MAX_BYTES', 10 * 1024 ** 2))
+BACKUPS = 3
+FLUSH_RECORDS = 100
+PROMETHEUS_PREFIX = 'pisi3_span'
+# Métricas do formato Prometheus: campo somado de cada registro (None: contagem)
+METRICS = {
+    'seconds_total': ('wall_s', 'Tempo de relógio acumulado por etapa, em segundos'),
+    'cpu_seconds_total': ('cpu_s', 'Tempo de CPU acumulado por etapa, em segundos'),
+    'allocated_bytes_total': ('alloc_bytes', 'Pico de bytes alocados acumulado por etapa'),
+    'runs_total': (None, 'Número de execuções da etapa'),
+}
+_SAMPLE = re.compile(r'^(\w+)\{page="((?:[^"\\]|\\.)*)",span="((?:[^"\\]|\\.)*)"\} (\S+)$')
+
+_DISABLED = nullcontext()
+_local = threading.local()
+_lock = threading.Lock()
+_pending = []
+# Página atribuída às etapas medidas fora das páginas (linha de comando, processo de treino): o nome do script
+_process = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else 'python'
+
+if TRACE_MEMORY and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+def span(name):
+    # Etapa medida do início ao fim do bloco with
+    if not ENABLED:
+        return _DISABLED
+    return _span(name)
+
+def traced(func):
+    # Decorador: a chamada inteira da função é uma etapa, com o nome da função
+    if not ENABLED:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _span(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+def page_start(page):
+    # Início de uma execução da página: as etapas seguintes (nesta thread) ficam associadas a ela
+    if not ENABLED:
+        return
+    _local.stack = []
+    _local.rerun = {'page': page, 'id': uuid.uuid4().hex[:12], 'records': []}
+    _local.stack.append(_enter('página'))
+
+def page_end():
+    # Fim da execução (chamar também antes de st.stop()): grava as etapas e exibe o painel, se ativado
+    rerun = getattr(_local, 'rerun', None) if ENABLED else None
+    if rerun is None:
+        return
+    while _local.stack:
+        _exit(_local.stack.pop())
+    _local.rerun = None
+    flush()
+    if PANEL:
+        _panel(rerun)
+
+def flush():
+    with _lock:
+        records = _pending[:]
+        _pending.clear()
+        if not records or not SPANS_FILE:
+            return
+        directory = os.path.dirname(os.path.abspath(SPANS_FILE))
+        os.makedirs(directory, exist_ok=True)
+        # O app, os processos de treino, o serviço e a linha de comando gravam no mesmo arquivo: a rotação e a
+        # leitura-soma-gravação dos totais são feitas com a trava entre processos
+        with _file_lock(SPANS_FILE):
+            if SPANS_FILE.endswith('.prom'):
+                _write_prometheus(SPANS_FILE, records)
+            else:
+                _write_jsonl(SPANS_FILE, records)
+
+@contextmanager
+def _span(name):
+    stack = _stack()
+    stack.append(_enter(name))
+    try:
+        yield
+    finally:
+        _exit(stack.pop())
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+def _enter(name):
+    stack = _stack()
+    memory = 0
+    if TRACE_MEMORY:
+        # O pico do tracemalloc é reiniciado a cada etapa; o pico da etapa externa até aqui fica guardado nela.
+        # O tracemalloc é global: com várias sessões ao mesmo tempo, os bytes alocados são aproximados
+        memory, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+        tracemalloc.reset_peak()
+    return {
+        'name': name,
+        'depth': len(stack),
+        'parent': stack[-1]['name'] if stack else None,
+        'ts': time.time(),
+        'start': time.perf_counter(),
+        # Tempo de CPU só da thread: não inclui as outras sessões do Streamlit (nem processos auxiliares)
+        'cpu': time.thread_time(),
+        'memory': memory,
+        'peak': memory,
+    }
+
+def _exit(frame):
+    wall = time.perf_counter() - frame['start']
+    cpu = time.thread_time() - frame['cpu']
+    allocated = 0
+    if TRACE_MEMORY:
+        # Pico de memória da etapa acima do que já estava alocado no início
+        allocated = max(frame['peak'], tracemalloc.get_traced_memory()[1]) - frame['memory']
+    rerun = getattr(_local, 'rerun', None)
+    record = {
+        'ts': frame['ts'],
+        'pid': os.getpid(),
+        'page': rerun['page'] if rerun else _process,
+        'rerun': rerun['id'] if rerun else None,
+        'span': frame['name'],
+        'parent': frame['parent'],
+        'depth': frame['depth'],
+        'wall_s': wall,
+        'cpu_s': cpu,
+        'alloc_bytes': allocated,
+    }
+    if rerun:
+        rerun['records'].append(record)
+    with _lock:
+        _pending.append(record)
+        full = len(_pending) >= FLUSH_RECORDS
+    if full:
+        flush()
+
+@contextmanager
+def _file_lock(path):
+    # Trava exclusiva em um arquivo auxiliar (path.lock), que nunca é substituído nem removido
+    with open(f'{path}.lock', 'a+b') as f:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def _write_jsonl(path, records):
+    if os.path.exists(path) and os.path.getsize(path) >= MAX_BYTES:
+        for i in range(BACKUPS - 1, 0, -1):
+            if os.path.exists(f'{path}.{i}'):
+                os.replace(f'{path}.{i}', f'{path}.{i + 1}')
+        os.replace(path, f'{path}.1')
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records))
+
+def _write_prometheus(path, records):
+    # Os totais do arquivo são somados aos desta gravação (com a trava de flush()), para que vários processos
+    # (servidor, treinos em segundo plano, linha de comando) acumulem no mesmo arquivo
+    totals = {}
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                match = _SAMPLE.match(line.strip())
+                if match:
+                    metric, page, name, value = match.groups()
+                    totals[(metric, _unescape(page), _unescape(name))] = float(value)
+    for record in records:
+        for metric, (field, _) in METRICS.items():
+            key = (f'{PROMETHEUS_PREFIX}_{metric}', record['page'], record['span'])
+            totals[key] = totals.get(key, 0.0) + (record[field] if field else 1)
+
+    lines = []
+    for metric, (_, description) in METRICS.items():
+        name = f'{PROMETHEUS_PREFIX}_{metric}'
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+        lines += [f'{name}{{page="{_escape(page)}",span="{_escape(span_name)}"}} {value:.12g}'
+                  for (metric_name, page, span_name), value in sorted(totals.items()) if metric_name == name]
+
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp_path = os.path.join(directory, f'.{os.path.basename(path)}.{uuid.uuid4().hex}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_path, path)
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _unescape(value):
+    return re.sub(r'\\(.)', lambda match: '\n' if match.group(1) == 'n' else match.group(1), value)
+
+def _panel(rerun):
+    import pandas as pd
+    import streamlit as st
+    # Na ordem de início, com a etapa indentada pela profundidade
+    records = sorted(rerun['records'], key=lambda record: (record['ts'], record['depth']))
+    frame = pd.DataFrame({
+        'Etapa': ['· ' * record['depth'] + record['span'] for record in records],
+        'Tempo (ms)': [record['wall_s'] * 1000 for record in records],
+        'CPU (ms)': [record['cpu_s'] * 1000 for record in records],
+        'Alocado (MB)': [record['alloc_bytes'] / 1024 ** 2 for record in records],
+    })
+    with st.sidebar.expander('Tempo por etapa (esta execução)', expanded=True):
+        st.dataframe(frame, hide_index=True, column_config={
+            'Tempo (ms)': st.column_config.NumberColumn(format='%.1f'),
+            'CPU (ms)': st.column_config.NumberColumn(format='%.1f'),
+            'Alocado (MB)': st.column_config.NumberColumn(format='%.2f'),
+        })
+
+if ENABLED:
+    atexit.register(flush)
@@ -0,0 +1,259 @@
+import argparse
+import calendar
+import os
+import time
+from contextlib import ExitStack
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from utils.data_utils import atomic_write, dataset_path
+from utils.features import OUTPUTS, SOURCE, load_state, transform
+
+# Gerador de dados sintéticos no formato do ACC_INTAKES_OUTCOMES, para testar as páginas e a suíte de benchmarks
+# em escalas maiores que a do dataset real. As distribuições são aprendidas do dataset de origem: a distribuição
+# conjunta de tipo de animal, tipo de entrada, desfecho, condição e sexo na entrada, e as demais colunas condicionadas
+# a elas (idades, tempo no abrigo, mês e hora de entrada e de saída, raça, cor, ...). As colunas derivadas (datas em
+# texto, ano, mês, dia da semana, faixas etárias) são recalculadas a partir dos valores sorteados, e os datasets
+# derivados (data_cleaned, scaled_ e normalized_) são gerados com os parâmetros de data/features_state.json. As linhas
+# são geradas e gravadas em blocos, com memória limitada independentemente do total:
+#   python -m utils.synthetic 10000000 --output-dir sinteticos
+#   cd sinteticos && streamlit run ../Home.py
+
+BATCH_SIZE = 250_000
+RANDOM_STATE = 42
+MONTHYEAR_FORMAT = '%Y-%m'
+
+# Distribuição conjunta principal
+KEY_COLUMNS = ['animal_type', 'intake_type', 'outcome_type', 'intake_condition', 'sex_upon_intake']
+
+# Coluna(s) sorteadas juntas -> colunas das quais dependem (já sorteadas antes)
+CONDITIONALS = [
+    (['sex_upon_outcome'], ['sex_upon_intake', 'outcome_type']),
+    (['outcome_subtype'], ['outcome_type']),
+    (['breed'], ['animal_type']),
+    (['color'], ['animal_type']),
+    (['found_location'], []),
+    (['intake_number'], ['animal_type']),
+    (['age_upon_intake_(days)', 'age_upon_outcome_(days)'], ['animal_type', 'intake_condition']),
+    (['intake_monthyear'], ['animal_type']),
+    (['intake_weekday'], ['intake_type']),
+    (['intake_hour'], ['intake_type']),
+    (['outcome_hour'], ['outcome_type']),
+]
+# Tempo no abrigo (contínuo), por desfecho e tipo de animal
+SHELTER_GIVEN = ['outcome_type', 'animal_type']
+
+def fit(raw):
+    # Distribuições empíricas do dataset de origem
+    return {
+        'rows': len(raw),
+        'key': _distribution(raw, KEY_COLUMNS, []),
+        'conditionals': [_distribution(raw, columns, given) for columns, given in CONDITIONALS],
+        'shelter_days': {key: np.sort(raw['time_in_shelter_days'].to_numpy()[positions])
+                         for key, positions in _groups(raw, SHELTER_GIVEN).items()},
+        # Texto da idade, idade em anos e faixa etária de cada idade em dias (o texto mais frequente)
+        'ages': {prefix: raw.groupby(f'{prefix}_(days)')[[prefix, f'{prefix}_(years)', f'{prefix}_age_group']]
+                            .agg(lambda values: values.mode().iloc[0])
+                 for prefix in ['age_upon_intake', 'age_upon_outcome']},
+        'schema': pq.read_schema(dataset_path(SOURCE)).remove_metadata(),
+        # Largura do texto de cada coluna (nas categóricas, a das categorias)
+        'widths': {col: int(values.str.len().max()) for col, values in _text_values(raw).items()},
+    }
+
+def generate(model, rows, batch_size=BATCH_SIZE, seed=RANDOM_STATE, start=0):
+    # Blocos (DataFrames no formato do dataset de origem) somando `rows` linhas, com índice a partir de `start`
+    rng = np.random.default_rng(seed)
+    for offset in range(start, start + rows, batch_size):
+        yield _batch(model, min(batch_size, start + rows - offset), offset, rng)
+
+def write(model, rows, output_dir, state=None, batch_size=BATCH_SIZE, seed=RANDOM_STATE):
+    # Grava o dataset de origem em output_dir/data e, com os parâmetros da receita (state), os derivados
+    data_dir = os.path.join(output_dir, 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    names = {'source': SOURCE}
+    if state is not None:
+        names.update(OUTPUTS)
+    # Derivados no esquema dos arquivos em data/ (as colunas one-hot vêm dos vocabulários salvos)
+    schemas = {kind: pq.read_schema(dataset_path(name)) for kind, name in names.items() if kind != 'source'}
+    schemas['source'] = model['schema']
+    paths = {kind: os.path.join(data_dir, f'{name}.parquet') for kind, name in names.items()}
+
+    counts = dict.fromkeys(names, 0)
+    # Todos os arquivos são gravados em temporários e aparecem juntos, ao final (ou nenhum, em caso de erro)
+    with ExitStack() as stack:
+        writers = {}
+        for kind, path in paths.items():
+            tmp_path = stack.enter_context(atomic_write(path))
+            writers[kind] = stack.enter_context(pq.ParquetWriter(tmp_path, schemas[kind]))
+        for batch in generate(model, rows, batch_size, seed):
+            frames = {'source': batch}
+            if state is not None:
+                frames.update(transform(batch, state))
+            for kind, df in frames.items():
+                # Os derivados guardam o índice (número da linha de origem), como os arquivos em data/
+                table = pa.Table.from_pandas(df, preserve_index=kind != 'source')
+                writers[kind].write_table(table.select(schemas[kind].names).cast(schemas[kind]))
+                counts[kind] += len(df)
+    return {names[kind]: count for kind, count in counts.items()}
+
+def _batch(model, n, offset, rng):
+    df = pd.DataFrame(_sample(model['key'], None, n, rng))
+    for distribution in model['conditionals']:
+        for col, values in _sample(distribution, df, n, rng).items():
+            df[col] = values
+
+    # Entrada: mês e dia da semana sorteados, um dos dias do mês com esse dia da semana (uniforme), hora sorteada e
+    # minuto uniforme
+    month_start = pd.to_datetime(df['intake_monthyear'].str.rstrip(), format=MONTHYEAR_FORMAT)
+    weekday = df['intake_weekday'].str.rstrip().map({name: i for i, name in enumerate(calendar.day_name)}).to_numpy()
+    first = (weekday - month_start.dt.dayofweek.to_numpy()) % 7
+    occurrences = (month_start.dt.days_in_month.to_numpy() - first + 6) // 7
+    day = first + 7 * np.floor(rng.random(n) * occurrences).astype('int64')
+    intake = (month_start + pd.to_timedelta(day, unit='D') + pd.to_timedelta(df['intake_hour'], unit='h')
+              + pd.to_timedelta(rng.integers(0, 60, n), unit='m'))
+
+    # Saída: dias inteiros do tempo no abrigo sorteado, com a hora de saída sorteada (as saídas seguem o horário
+    # de funcionamento do abrigo); uma saída antes da entrada passa para o dia seguinte
+    shelter_days = _sample_continuous(model['shelter_days'], df, SHELTER_GIVEN, rng)
+    outcome = (intake.dt.normalize() + pd.to_timedelta(np.floor(shelter_days), unit='D')
+               + pd.to_timedelta(df['outcome_hour'], unit='h') + pd.to_timedelta(rng.integers(0, 60, n), unit='m'))
+    outcome = outcome.where(outcome > intake, outcome + pd.Timedelta(days=1))
+    elapsed = outcome - intake
+
+    ids = pd.Series([f'S{i:06d}' for i in range(offset, offset + n)])
+    df['animal_id_intake'] = ids
+    df['animal_id_outcome'] = ids
+    df['outcome_number'] = df['intake_number']
+    df['count'] = 1
+    weekdays = np.array([day.ljust(model['widths']['intake_weekday']) for day in calendar.day_name], dtype=object)
+    for prefix, moment in [('intake', intake), ('outcome', outcome)]:
+        df[f'{prefix}_datetime'] = _datetime_text(moment)
+        df[f'{prefix}_month'] = moment.dt.month
+        df[f'{prefix}_year'] = moment.dt.year
+        df[f'{prefix}_monthyear'] = _monthyear_text(moment)
+        df[f'{prefix}_weekday'] = weekdays[moment.dt.dayofweek.to_numpy()]
+        df[f'{prefix}_hour'] = moment.dt.hour
+    for prefix, ages in model['ages'].items():
+        labels = ages.reindex(df[f'{prefix}_(days)'])
+        for col in labels.columns:
+            df[col] = labels[col].array
+
+    birth = intake.dt.normalize() - pd.to_timedelta(df['age_upon_intake_(days)'], unit='D')
+    df['date_of_birth'] = _datetime_text(birth)
+    df['dob_year'] = birth.dt.year
+    df['dob_month'] = birth.dt.month
+    # Como no dataset de origem, dob_monthyear repete o mês/ano da saída
+    df['dob_monthyear'] = df['outcome_monthyear']
+
+    # Tempo no abrigo em texto, no formato do dataset de origem, formatado uma vez por valor distinto (em minutos)
+    minutes, uniques = pd.factorize(elapsed.to_numpy() // np.timedelta64(1, 'm'))
+    width = model['widths']['time_in_shelter']
+    texts = np.array([f'{m // 1440} days {m % 1440 // 60:02d}:{m % 60:02d}:00.000000000'.ljust(width) for m in uniques],
+                     dtype=object)
+    df['time_in_shelter'] = texts[minutes]
+    df['time_in_shelter_days'] = (elapsed.dt.total_seconds() / 86400).round(1)
+
+    df.index = pd.RangeIndex(offset, offset + n)
+    return df[model['schema'].names]
+
+def _datetime_text(moment):
+    # 'dd/mm/aaaa hh:mm', montado com as operações de texto do pyarrow (bem mais rápido que Series.dt.strftime)
+    def text(values, width=2):
+        return pc.utf8_lpad(pc.cast(pa.array(values.to_numpy()), pa.string()), width, '0')
+
+    date = pc.binary_join_element_wise(text(moment.dt.day), text(moment.dt.month), text(moment.dt.year, 4), '/')
+    clock = pc.binary_join_element_wise(text(moment.dt.hour), text(moment.dt.minute), ':')
+    return pc.binary_join_element_wise(date, clock, ' ').to_numpy(zero_copy_only=False)
+
+def _monthyear_text(moment):
+    # 'aaaa-mm', formatado uma vez por mês distinto
+    codes, uniques = pd.factorize(moment.dt.year * 100 + moment.dt.month)
+    return np.array([f'{value // 100}-{value % 100:02d}' for value in uniques], dtype=object)[codes]
+
+def _groups(df, given):
+    # Posições das linhas de cada combinação de valores de `given` (chaves sempre em tuplas)
+    if not given:
+        return {(): np.arange(len(df))}
+    return {key if isinstance(key, tuple) else (key,): positions
+            for key, positions in df.groupby(given, sort=False, observed=True).indices.items()}
+
+def _text_values(raw):
+    # Valores de texto de cada coluna de texto: as próprias linhas ou, nas colunas categóricas (dicionários, como
+    # gravadas por utils.csv_to_parquet), as categorias
+    result = {}
+    for col in raw.columns:
+        values = raw[col].cat.categories.to_series() if isinstance(raw[col].dtype, pd.CategoricalDtype) else raw[col]
+        if values.dtype == object:
+            result[col] = values
+    return result
+
+def _distribution(raw, columns, given):
+    # Valores distintos de `columns` e suas frequências em cada combinação de `given`. Nas colunas categóricas
+    # são guardados os códigos, e a coluna é remontada com as mesmas categorias no sorteio
+    distribution = {'columns': columns, 'given': given, 'groups': {}}
+    for key, positions in _groups(raw, given).items():
+        counts = raw.iloc[positions].groupby(columns, sort=False, observed=True).size()
+        values = counts.index.to_frame(index=False)
+        distribution['groups'][key] = (
+            {col: _codes(values[col], raw[col].dtype) for col in columns},
+            counts.to_numpy() / counts.sum(),
+        )
+    distribution['dtypes'] = {col: raw[col].dtype for col in columns}
+    return distribution
+
+def _codes(values, dtype):
+    if isinstance(dtype, pd.CategoricalDtype):
+        return pd.Categorical(values, dtype=dtype).codes
+    return values.to_numpy(dtype=dtype)
+
+def _sample(distribution, df, n, rng):
+    # Sorteio de cada grupo de linhas de df pela distribuição condicional aos seus valores de `given`
+    result = {col: np.empty(n, dtype=_storage_dtype(dtype)) for col, dtype in distribution['dtypes'].items()}
+    groups = _groups(df, distribution['given']) if df is not None else {(): np.arange(n)}
+    for key, positions in groups.items():
+        values, probabilities = distribution['groups'][key]
+        picks = rng.choice(len(probabilities), size=len(positions), p=probabilities)
+        for col, column_values in values.items():
+            result[col][positions] = column_values[picks]
+    for col, dtype in distribution['dtypes'].items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            result[col] = pd.Categorical.from_codes(result[col], dtype=dtype)
+    return result
+
+def _storage_dtype(dtype):
+    # Categóricas são sorteadas pelos códigos
+    return np.int32 if isinstance(dtype, pd.CategoricalDtype) else dtype
+
+def _sample_continuous(distributions, df, given, rng):
+    # Quantis interpolados entre os valores observados de cada grupo (sorteio suave, sem repetir só os observados)
+    result = np.empty(len(df))
+    for key, positions in _groups(df, given).items():
+        values = distributions[key]
+        position = rng.random(len(positions)) * (len(values) - 1)
+        low = np.floor(position).astype('int64')
+        high = np.minimum(low + 1, len(values) - 1)
+        result[positions] = values[low] + (values[high] - values[low]) * (position - low)
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gera datasets sintéticos com as distribuições do ACC_INTAKES_OUTCOMES.')
+    parser.add_argument('rows', type=int, help='linhas do dataset de origem sintético')
+    parser.add_argument('--output-dir', default='sinteticos', help='os datasets são gravados em <output-dir>/data')
+    parser.add_argument('--source-only', action='store_true', help='não gera os datasets derivados')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='linhas por bloco')
+    parser.add_argument('--seed', type=int, default=RANDOM_STATE)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    model = fit(pd.read_parquet(dataset_path(SOURCE)))
+    state = None if args.source_only else load_state()
+    counts = write(model, args.rows, args.output_dir, state, args.batch_size, args.seed)
+    elapsed = time.perf_counter() - start
+    for name, count in counts.items():
+        print(f'{name}: {count} linhas')
+    print(f"Gravado em {os.path.join(args.output_dir, 'data')} em {elapsed:.1f}s ({args.rows / elapsed:.0f} linhas/s)")
+
+if __name__ == '__main__':
+    main()
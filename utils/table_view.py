@@ -0,0 +1,75 @@
+import math
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from utils.data_utils import cached, dataset_path, read_table
+from utils.spans import traced
+
+# Visualização paginada de um dataset sobre a tabela Arrow: filtro e ordenação são resolvidos no servidor
+# (pyarrow.compute) como uma lista de índices de linhas, e apenas as linhas da página exibida são convertidas
+# para pandas e enviadas ao navegador.
+
+PAGE_SIZES = [25, 50, 100, 500]
+
+def column_kind(table, column):
+    field_type = table.schema.field(column).type
+    if pa.types.is_dictionary(field_type):
+        return 'category'
+    if pa.types.is_integer(field_type) or pa.types.is_floating(field_type):
+        return 'number'
+    return 'text'
+
+def categories(table, column):
+    # Valores distintos de uma coluna categórica, lidos do dicionário (sem percorrer as linhas)
+    values = set()
+    for chunk in table[column].chunks:
+        values.update(chunk.dictionary.to_pylist())
+    return sorted(value for value in values if value is not None)
+
+def value_range(table, column):
+    result = pc.min_max(table[column])
+    return result['min'].as_py(), result['max'].as_py()
+
+def filter_mask(table, column, condition):
+    # condition: {'values': [...]} (categórica), {'contains': texto} ou {'range': (mínimo, máximo)}
+    values = table[column]
+    if 'values' in condition:
+        return pc.is_in(pc.cast(values, values.type.value_type), value_set=pa.array(condition['values'], pa.string()))
+    if 'contains' in condition:
+        return pc.match_substring(values, condition['contains'], ignore_case=True)
+    low, high = condition['range']
+    return pc.and_(pc.greater_equal(values, low), pc.less_equal(values, high))
+
+@traced
+def view_indices(df_name, table, sort_column=None, descending=False, filter_column=None, condition=None):
+    # Índices (na tabela) das linhas que passam no filtro, na ordem pedida; guardados no cache compartilhado
+    def build():
+        if sort_column is None:
+            indices = pa.array(np.arange(table.num_rows, dtype=np.int64))
+        else:
+            values = table[sort_column]
+            if pa.types.is_dictionary(values.type):
+                # Colunas categóricas são ordenadas pelo texto
+                values = pc.cast(values, values.type.value_type)
+            indices = pc.sort_indices(pa.table({'key': values}),
+                                      sort_keys=[('key', 'descending' if descending else 'ascending')],
+                                      null_placement='at_end')
+        if filter_column is None or not condition:
+            return indices
+        mask = pc.fill_null(filter_mask(table, filter_column, condition), False)
+        return pc.filter(indices, pc.take(mask, indices))
+
+    return cached(dataset_path(df_name), build, 'view', sort_column, descending, filter_column, repr(condition))
+
+def page_count(total, page_size):
+    return max(1, math.ceil(total / page_size))
+
+@traced
+def page_frame(table, indices, page_number, page_size, columns=None):
+    # Converte para pandas só as linhas da página; o índice do DataFrame é a posição da linha no dataset
+    start = (page_number - 1) * page_size
+    page_indices = indices[start:start + page_size]
+    page = table.select(columns) if columns is not None else table
+    df = page.take(page_indices).to_pandas()
+    df.index = page_indices.to_numpy()
+    return df
@@ -0,0 +1,45 @@
+import numpy as np
+from utils.cube import cube_path, read_cube, rollup
+from utils.data_utils import cached
+from utils.spans import traced
+
+# Índice mensal de entradas e saídas: matrizes densas ano x mês calculadas a partir do cubo de contagens.
+# Consultar um conjunto de anos é apenas um fatiamento das matrizes.
+
+MONTHS = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+
+@traced
+def monthly_index(df_name='ACC_INTAKES_OUTCOMES'):
+    cube = read_cube(df_name)
+    # Guardado no cache compartilhado, invalidado junto com o arquivo do cubo
+    return cached(cube_path(df_name), lambda: build_monthly_index(cube), 'monthly_index')
+
+def build_monthly_index(cube):
+    years = np.concatenate([cube['intake_year'].dropna().unique(), cube['outcome_year'].dropna().unique()])
+    if len(years) == 0:
+        years = np.array([], dtype=np.int64)
+    else:
+        years = np.arange(int(years.min()), int(years.max()) + 1)
+
+    def dense(year_col, month_col):
+        counts = rollup(cube, [year_col, month_col])
+        matrix = np.zeros((len(years), 12), dtype=np.int64)
+        np.add.at(matrix,
+                  (counts[year_col].to_numpy(dtype=np.int64) - (years[0] if len(years) else 0),
+                   counts[month_col].to_numpy(dtype=np.int64) - 1),
+                  counts['count'].to_numpy())
+        return matrix
+
+    return {
+        'years': years,
+        # Entradas por ano e mês de entrada
+        'intakes': dense('intake_year', 'intake_month'),
+        # Saídas por ano e mês de saída
+        'outcomes': dense('outcome_year', 'outcome_month'),
+        # Saídas (por mês de saída) dos animais que entraram em cada ano
+        'outcomes_by_intake_year': dense('intake_year', 'outcome_month'),
+    }
+
+def year_row(index, year):
+    # Posição do ano nas matrizes do índice
+    return int(year) - int(index['years'][0])